@@ -6,6 +6,8 @@ from .scores import router as scores_router
 from .checkin import router as checkin_router
 from .statistics import router as statistics_router
 from .admin import router as admin_router
+from .realtime import router as realtime_router
+from .jobs import router as jobs_router
 
 # 创建主路由
 api_router = APIRouter(prefix="/api")
@@ -18,5 +20,7 @@ api_router.include_router(scores_router, prefix="/scores", tags=["scores"])
 api_router.include_router(checkin_router, prefix="/checkin", tags=["checkin"])
 api_router.include_router(statistics_router, prefix="/statistics", tags=["statistics"])
 api_router.include_router(admin_router, prefix="/admin", tags=["admin"])
+api_router.include_router(realtime_router, prefix="/realtime", tags=["realtime"])
+api_router.include_router(jobs_router, prefix="/jobs", tags=["jobs"])
 
 __all__ = ["api_router"]
\ No newline at end of file
@@ -1,274 +1,225 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List
-from ..database import get_db
+from typing import Callable, Iterable, Iterator, List, Optional
+from ..database import DBRunner, ReadSessionLocal, get_db_runner
+from ..database import backup_database as backup_sqlite_database
 from ..services.participant_service import ParticipantService
 from ..services.judge_service import JudgeService
 from ..services.group_service import GroupService
 from ..services.checkin_service import CheckinService
 from ..services.score_service import ScoreService
-from ..utils.qr_generator import create_qr_code_sheet
-import openpyxl
-import io
+from ..services.import_service import ImportService
+from ..services.job_service import job_registry
+from ..utils.file_handler import save_upload_to_temp
+from ..utils.qr_generator import QRSheetLayout, create_qr_code_sheet
+from ..utils.export_writer import CSV_MEDIA_TYPE, XLSX_MEDIA_TYPE, iter_csv, iter_file, write_xlsx, write_xlsx_sheets
+import os
 
 router = APIRouter()
 
-class ImportResult(BaseModel):
-    success_count: int
-    error_count: int
-    errors: List[dict]
+EXPORT_FORMATS = ("xlsx", "csv")
+
+PARTICIPANT_EXPORT_HEADERS = ["ID", "姓名", "单位", "手机号", "组别", "是否签到", "签到时间", "平均分", "二维码ID"]
+
+def _participant_export_rows(db: Session) -> Iterator[list]:
+    for (participant_id, name, organization, phone, group_name,
+         is_checked_in, checkin_time, average_score, qr_code_id) in ParticipantService.iter_export_rows(db):
+        yield [
+            participant_id,
+            name,
+            organization,
+            phone,
+            group_name or "未分组",
+            "是" if is_checked_in else "否",
+            checkin_time.strftime('%Y-%m-%d %H:%M:%S') if checkin_time else "",
+            average_score,
+            qr_code_id
+        ]
+
+def _stream_rows(fn: Callable, *args) -> Iterator:
+    """在独立的只读会话中执行 fn(db, *args) 并逐行产出（响应开始发送后请求的会话可能已关闭）"""
+    db = ReadSessionLocal()
+    try:
+        yield from fn(db, *args)
+    finally:
+        db.close()
+
+def _attachment_headers(filename: str, path: str = None) -> dict:
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if path is not None:
+        headers["Content-Length"] = str(os.path.getsize(path))
+    return headers
+
+async def _export_response(format: str, filename: str, title: str, headers: list, rows: Iterable) -> StreamingResponse:
+    """
+    把数据以流式响应返回
+    
+    csv：边读取边编码输出；xlsx：以 write-only 模式写入临时文件后分块发送，发送完删除
+    """
+    if format == "csv":
+        return StreamingResponse(
+            iter_csv(headers, rows), media_type=CSV_MEDIA_TYPE,
+            headers=_attachment_headers(f"{filename}.csv")
+        )
+    
+    path = await run_in_threadpool(write_xlsx, title, headers, rows)
+    return StreamingResponse(
+        iter_file(path, delete=True), media_type=XLSX_MEDIA_TYPE,
+        headers=_attachment_headers(f"{filename}.xlsx", path)
+    )
+
+def _reset_all_checkins(db: Session) -> int:
+    participants = ParticipantService.get_all_participants(db)
+    
+    reset_count = 0
+    for participant in participants:
+        if participant.is_checked_in:
+            ParticipantService.update_participant(db, participant.id, {
+                "is_checked_in": False,
+                "checkin_time": None
+            })
+            reset_count += 1
+    return reset_count
 
 @router.post("/import/participants")
-async def import_participants_excel(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
-    """从Excel导入参赛者数据"""
+async def import_participants_excel(file: UploadFile = File(...)):
+    """
+    从Excel导入参赛者数据（后台任务）
+    
+    返回任务ID，通过 /api/jobs/{job_id} 查询进度；任务结果为 {"success_count", "error_count", "errors"}。
+    """
     if not file.filename.endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="请上传Excel文件")
     
-    try:
-        # 读取Excel文件
-        content = await file.read()
-        workbook = openpyxl.load_workbook(io.BytesIO(content))
-        sheet = workbook.active
-        
-        participants_data = []
-        errors = []
-        
-        # 跳过标题行，从第2行开始读取
-        for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-            try:
-                if not any(row):  # 跳过空行
-                    continue
-                
-                name, organization, phone, group_name, photo_filename = row[:5]
-                
-                if not all([name, organization, phone]):
-                    errors.append({
-                        "row": row_num,
-                        "error": "姓名、单位、手机号不能为空"
-                    })
-                    continue
-                
-                # 查找组别ID
-                group_id = None
-                if group_name:
-                    # 这里可以根据组名查找组ID，或者创建新组
-                    pass
-                
-                participants_data.append({
-                    "name": str(name).strip(),
-                    "organization": str(organization).strip(),
-                    "phone": str(phone).strip(),
-                    "group_id": group_id,
-                    "photo_path": f"data/photos/{photo_filename}" if photo_filename else None
-                })
-                
-            except Exception as e:
-                errors.append({
-                    "row": row_num,
-                    "error": f"数据解析错误: {str(e)}"
-                })
-        
-        # 批量创建参赛者
-        created_participants = []
-        if participants_data:
-            try:
-                created_participants = ParticipantService.batch_create_participants(db, participants_data)
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"批量创建失败: {str(e)}")
-        
-        return ImportResult(
-            success_count=len(created_participants),
-            error_count=len(errors),
-            errors=errors
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"文件处理失败: {str(e)}")
+    file_path = await save_upload_to_temp(file)
+    job = job_registry.submit("import_participants", ImportService.import_participants, file_path)
+    return {
+        "message": "参赛者导入任务已开始",
+        "job_id": job.id,
+        "status_url": f"/api/jobs/{job.id}"
+    }
 
 @router.post("/import/judges")
-async def import_judges_excel(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
-    """从Excel导入评委数据"""
+async def import_judges_excel(file: UploadFile = File(...)):
+    """
+    从Excel导入评委数据（后台任务）
+    
+    返回任务ID，通过 /api/jobs/{job_id} 查询进度；
+    任务结果为 {"success_count", "skipped_count", "error_count", "errors"}，已存在的用户名计入 skipped_count。
+    """
     if not file.filename.endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="请上传Excel文件")
     
-    try:
-        # 读取Excel文件
-        content = await file.read()
-        workbook = openpyxl.load_workbook(io.BytesIO(content))
-        sheet = workbook.active
-        
-        judges_data = []
-        errors = []
-        
-        # 跳过标题行，从第2行开始读取
-        for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-            try:
-                if not any(row):  # 跳过空行
-                    continue
-                
-                name, username, password, organization = row[:4]
-                
-                if not all([name, username, password]):
-                    errors.append({
-                        "row": row_num,
-                        "error": "姓名、用户名、密码不能为空"
-                    })
-                    continue
-                
-                judges_data.append({
-                    "name": str(name).strip(),
-                    "username": str(username).strip(),
-                    "password": str(password).strip(),
-                    "organization": str(organization).strip() if organization else None
-                })
-                
-            except Exception as e:
-                errors.append({
-                    "row": row_num,
-                    "error": f"数据解析错误: {str(e)}"
-                })
-        
-        # 批量创建评委
-        created_judges = []
-        if judges_data:
-            try:
-                created_judges = JudgeService.batch_create_judges(db, judges_data)
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"批量创建失败: {str(e)}")
-        
-        return ImportResult(
-            success_count=len(created_judges),
-            error_count=len(errors),
-            errors=errors
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"文件处理失败: {str(e)}")
+    file_path = await save_upload_to_temp(file)
+    job = job_registry.submit("import_judges", ImportService.import_judges, file_path)
+    return {
+        "message": "评委导入任务已开始",
+        "job_id": job.id,
+        "status_url": f"/api/jobs/{job.id}"
+    }
 
 @router.post("/generate/qr-sheet")
-async def generate_qr_code_sheet(db: Session = Depends(get_db)):
-    """生成二维码打印表格"""
+async def generate_qr_code_sheet(
+    format: str = "pdf",
+    columns: int = 4,
+    rows: int = 5,
+    db: DBRunner = Depends(get_db_runner)
+):
+    """
+    生成二维码打印表格（A4 分页）
+    
+    format: pdf（默认，多页PDF）/ zip（每页一张PNG）
+    columns / rows: 每页列数、行数
+    """
+    if format not in ("pdf", "zip"):
+        raise HTTPException(status_code=400, detail="format 只支持 pdf、zip")
     try:
-        participants = ParticipantService.get_all_participants(db)
-        
-        if not participants:
-            raise HTTPException(status_code=400, detail="没有参赛者数据")
-        
-        file_path = create_qr_code_sheet(participants)
-        
-        return {
-            "message": "二维码表格生成成功",
-            "file_path": file_path,
-            "participant_count": len(participants)
-        }
-        
+        layout = QRSheetLayout(columns=columns, rows=rows)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    participants = await db.run(ParticipantService.get_qr_sheet_items)
+    if not participants:
+        raise HTTPException(status_code=400, detail="没有参赛者数据")
+    
+    try:
+        file_path = await run_in_threadpool(
+            create_qr_code_sheet, participants, output_format=format, layout=layout
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"生成失败: {str(e)}")
+    
+    return {
+        "message": "二维码表格生成成功",
+        "file_path": file_path,
+        "download_url": f"/static/{os.path.relpath(file_path, 'data')}",
+        "participant_count": len(participants),
+        "page_count": layout.page_count(len(participants))
+    }
 
 @router.get("/export/participants")
-async def export_participants_excel(db: Session = Depends(get_db)):
-    """导出参赛者数据到Excel"""
+async def export_participants_excel(format: str = "xlsx"):
+    """
+    导出参赛者数据（文件下载）
+    
+    format: xlsx（默认）/ csv
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format 只支持 xlsx 或 csv")
+    
     try:
-        participants = ParticipantService.get_all_participants(db)
-        
-        # 创建Excel工作簿
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.title = "参赛者名单"
-        
-        # 设置标题行
-        headers = ["ID", "姓名", "单位", "手机号", "组别", "是否签到", "签到时间", "平均分", "二维码ID"]
-        for col, header in enumerate(headers, 1):
-            sheet.cell(row=1, column=col, value=header)
-        
-        # 填充数据
-        for row, participant in enumerate(participants, 2):
-            sheet.cell(row=row, column=1, value=participant.id)
-            sheet.cell(row=row, column=2, value=participant.name)
-            sheet.cell(row=row, column=3, value=participant.organization)
-            sheet.cell(row=row, column=4, value=participant.phone)
-            sheet.cell(row=row, column=5, value=participant.group.name if participant.group else "未分组")
-            sheet.cell(row=row, column=6, value="是" if participant.is_checked_in else "否")
-            sheet.cell(row=row, column=7, value=participant.checkin_time.strftime('%Y-%m-%d %H:%M:%S') if participant.checkin_time else "")
-            sheet.cell(row=row, column=8, value=participant.average_score)
-            sheet.cell(row=row, column=9, value=participant.qr_code_id)
-        
-        # 保存到内存
-        output = io.BytesIO()
-        workbook.save(output)
-        output.seek(0)
-        
-        return {
-            "message": "导出成功",
-            "filename": "participants.xlsx",
-            "data": output.getvalue().hex()  # 转换为十六进制字符串传输
-        }
-        
+        return await _export_response(
+            format, "participants", "参赛者名单",
+            PARTICIPANT_EXPORT_HEADERS, _stream_rows(_participant_export_rows)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"导出失败: {str(e)}")
 
 @router.get("/export/scores")
-async def export_scores_excel(round_number: int = 1, db: Session = Depends(get_db)):
-    """导出评分数据到Excel"""
+async def export_scores_excel(
+    round_number: int = 1,
+    rounds: Optional[List[int]] = Query(None),
+    format: str = "xlsx",
+    db: DBRunner = Depends(get_db_runner)
+):
+    """
+    导出评分数据（文件下载，参赛者 × 评委透视表）
+    
+    rounds: 同时导出多个轮次（?rounds=1&rounds=2），不传时导出 round_number
+    format: xlsx（默认，每轮一个工作表）/ csv（多轮时增加“轮次”列）
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format 只支持 xlsx 或 csv")
+    
+    round_numbers = sorted(set(rounds)) if rounds else [round_number]
+    headers, tables = await db.run(ScoreService.export_score_table, round_numbers)
+    if not any(tables.values()):
+        raise HTTPException(status_code=400, detail="没有评分数据")
+    
+    filename = "scores_round_" + "_".join(str(n) for n in round_numbers)
     try:
-        export_data = ScoreService.export_scores(db, round_number)
-        
-        # 创建Excel工作簿
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.title = f"第{round_number}轮评分结果"
-        
-        if not export_data["data"]:
-            raise HTTPException(status_code=400, detail="没有评分数据")
-        
-        # 获取所有列名
-        first_row = export_data["data"][0]
-        headers = list(first_row.keys())
-        
-        # 设置标题行
-        for col, header in enumerate(headers, 1):
-            sheet.cell(row=1, column=col, value=header)
-        
-        # 填充数据
-        for row, data in enumerate(export_data["data"], 2):
-            for col, header in enumerate(headers, 1):
-                sheet.cell(row=row, column=col, value=data.get(header, ""))
-        
-        # 保存到内存
-        output = io.BytesIO()
-        workbook.save(output)
-        output.seek(0)
-        
-        return {
-            "message": "导出成功",
-            "filename": f"scores_round_{round_number}.xlsx",
-            "data": output.getvalue().hex()
-        }
-        
+        if format == "csv":
+            if len(round_numbers) == 1:
+                return await _export_response(format, filename, "", headers, tables[round_numbers[0]])
+            rows = ([n, *row] for n in round_numbers for row in tables[n])
+            return await _export_response(format, filename, "", ["轮次", *headers], rows)
+        
+        sheets = [(f"第{n}轮评分结果", headers, tables[n]) for n in round_numbers]
+        path = await run_in_threadpool(write_xlsx_sheets, sheets)
+        return StreamingResponse(
+            iter_file(path, delete=True), media_type=XLSX_MEDIA_TYPE,
+            headers=_attachment_headers(f"{filename}.xlsx", path)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"导出失败: {str(e)}")
 
 @router.post("/reset/all-checkins")
-async def reset_all_checkins(db: Session = Depends(get_db)):
+async def reset_all_checkins(db: DBRunner = Depends(get_db_runner)):
     """重置所有签到状态（危险操作）"""
     try:
-        participants = ParticipantService.get_all_participants(db)
-        
-        reset_count = 0
-        for participant in participants:
-            if participant.is_checked_in:
-                ParticipantService.update_participant(db, participant.id, {
-                    "is_checked_in": False,
-                    "checkin_time": None
-                })
-                reset_count += 1
+        reset_count = await db.run(_reset_all_checkins)
         
         return {
             "message": f"已重置 {reset_count} 个参赛者的签到状态",
@@ -279,13 +230,13 @@ async def reset_all_checkins(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"重置失败: {str(e)}")
 
 @router.get("/system/status")
-async def get_system_status(db: Session = Depends(get_db)):
+async def get_system_status(db: DBRunner = Depends(get_db_runner)):
     """获取系统状态"""
     try:
         # 获取各种统计数据
-        participant_stats = ParticipantService.get_participants_statistics(db)
-        group_stats = GroupService.get_groups_statistics(db)
-        judge_stats = JudgeService.get_judge_statistics(db)
+        participant_stats = await db.run(ParticipantService.get_participants_statistics)
+        group_stats = await db.run(GroupService.get_groups_statistics)
+        judge_stats = await db.run(JudgeService.get_judge_statistics)
         
         return {
             "participants": participant_stats,
@@ -302,7 +253,6 @@ async def get_system_status(db: Session = Depends(get_db)):
 async def backup_database():
     """备份数据库"""
     try:
-        import shutil
         from datetime import datetime
         
         # 创建备份文件名
@@ -310,8 +260,9 @@ async def backup_database():
         backup_filename = f"database_backup_{timestamp}.db"
         backup_path = f"data/exports/{backup_filename}"
         
-        # 复制数据库文件
-        shutil.copy2("data/database.db", backup_path)
+        # 使用在线备份接口，WAL 中尚未检查点的数据也会包含在内
+        os.makedirs(os.path.dirname(backup_path), exist_ok=True)
+        await run_in_threadpool(backup_sqlite_database, backup_path)
         
         return {
             "message": "数据库备份成功",
@@ -1,8 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional
-from ..database import get_db
+from ..database import DBRunner, get_db_runner
 from ..services.checkin_service import CheckinService
 
 router = APIRouter()
@@ -18,10 +17,16 @@ class CheckinInfoResponse(BaseModel):
     is_checked_in: bool
     checkin_time: Optional[str] = None
 
+def _error_status(result: dict) -> int:
+    """签到失败时的HTTP状态码：写入队列繁忙返回503，其余返回400"""
+    if result.get("error_code") in ("CHECKIN_BUSY", "CHECKIN_PENDING"):
+        return 503
+    return 400
+
 @router.get("/info/{qr_code_id}", response_model=CheckinInfoResponse)
-async def get_checkin_info(qr_code_id: str, db: Session = Depends(get_db)):
+async def get_checkin_info(qr_code_id: str, db: DBRunner = Depends(get_db_runner)):
     """根据二维码ID获取签到信息"""
-    info = CheckinService.get_checkin_info(db, qr_code_id)
+    info = await db.run(CheckinService.get_checkin_info, qr_code_id)
     
     if not info:
         raise HTTPException(status_code=404, detail="二维码无效")
@@ -32,15 +37,16 @@ async def get_checkin_info(qr_code_id: str, db: Session = Depends(get_db)):
 async def verify_checkin(
     request: CheckinVerifyRequest, 
     client_request: Request,
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """验证身份并完成签到"""
     # 获取客户端信息
     ip_address = client_request.client.host if client_request.client else None
     user_agent = client_request.headers.get("user-agent", "")
     
-    result = CheckinService.process_checkin(
-        db=db,
+    # 并发签到各自在执行器中等待组提交确认，不阻塞事件循环
+    result = await db.run(
+        CheckinService.process_checkin,
         qr_code_id=request.qr_code_id,
         phone_last4=request.phone_last4,
         name=request.name,
@@ -49,14 +55,14 @@ async def verify_checkin(
     )
     
     if not result["success"]:
-        raise HTTPException(status_code=400, detail=result["message"])
+        raise HTTPException(status_code=_error_status(result), detail=result["message"])
     
     return result
 
 @router.get("/status/{participant_id}")
-async def get_participant_checkin_status(participant_id: int, db: Session = Depends(get_db)):
+async def get_participant_checkin_status(participant_id: int, db: DBRunner = Depends(get_db_runner)):
     """获取参赛者签到状态"""
-    status = CheckinService.get_participant_checkin_status(db, participant_id)
+    status = await db.run(CheckinService.get_participant_checkin_status, participant_id)
     
     if not status["exists"]:
         raise HTTPException(status_code=404, detail="参赛者不存在")
@@ -64,32 +70,32 @@ async def get_participant_checkin_status(participant_id: int, db: Session = Depe
     return status
 
 @router.get("/statistics")
-async def get_checkin_statistics(db: Session = Depends(get_db)):
+async def get_checkin_statistics(db: DBRunner = Depends(get_db_runner)):
     """获取签到统计信息"""
-    return CheckinService.get_checkin_statistics(db)
+    return await db.run(CheckinService.get_checkin_statistics)
 
 @router.get("/recent")
-async def get_recent_checkins(limit: int = 50, db: Session = Depends(get_db)):
+async def get_recent_checkins(limit: int = 50, db: DBRunner = Depends(get_db_runner)):
     """获取最近的签到记录"""
-    return CheckinService.get_recent_checkins(db, limit)
+    return await db.run(CheckinService.get_recent_checkins, limit)
 
 @router.get("/export")
-async def export_checkin_data(db: Session = Depends(get_db)):
+async def export_checkin_data(db: DBRunner = Depends(get_db_runner)):
     """导出签到数据"""
-    return CheckinService.export_checkin_data(db)
+    return await db.run(CheckinService.export_checkin_data)
 
 # 管理员功能
 @router.post("/manual/{participant_id}")
 async def manual_checkin(
     participant_id: int, 
     admin_note: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """管理员手动签到"""
-    result = CheckinService.manual_checkin(db, participant_id, admin_note)
+    result = await db.run(CheckinService.manual_checkin, participant_id, admin_note)
     
     if not result["success"]:
-        raise HTTPException(status_code=400, detail=result["message"])
+        raise HTTPException(status_code=_error_status(result), detail=result["message"])
     
     return result
 
@@ -97,10 +103,10 @@ async def manual_checkin(
 async def cancel_checkin(
     participant_id: int,
     admin_note: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """取消签到"""
-    result = CheckinService.cancel_checkin(db, participant_id, admin_note)
+    result = await db.run(CheckinService.cancel_checkin, participant_id, admin_note)
     
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
-from ..database import get_db
+from ..database import DBRunner, get_db_runner
 from ..services.group_service import GroupService
 
 router = APIRouter()
@@ -35,34 +35,34 @@ class MergeGroupRequest(BaseModel):
     max_group_size: int = 20
 
 @router.post("/", response_model=GroupResponse)
-async def create_group(group: GroupCreate, db: Session = Depends(get_db)):
+async def create_group(group: GroupCreate, db: DBRunner = Depends(get_db_runner)):
     """创建分组"""
     try:
-        new_group = GroupService.create_group(db, group.name, group.description)
-        return GroupResponse(**new_group.to_dict())
+        new_group = await db.run_dict(GroupService.create_group, group.name, group.description)
+        return GroupResponse(**new_group)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/", response_model=List[GroupResponse])
-async def get_groups(db: Session = Depends(get_db)):
+async def get_groups(db: DBRunner = Depends(get_db_runner)):
     """获取所有分组"""
-    groups = GroupService.get_all_groups(db)
-    return [GroupResponse(**group.to_dict()) for group in groups]
+    groups = await db.run_dicts(GroupService.get_all_groups)
+    return [GroupResponse(**group) for group in groups]
 
 @router.get("/{group_id}", response_model=GroupResponse)
-async def get_group(group_id: int, db: Session = Depends(get_db)):
+async def get_group(group_id: int, db: DBRunner = Depends(get_db_runner)):
     """获取单个分组信息"""
-    group = GroupService.get_group_by_id(db, group_id)
+    group = await db.run_dict(GroupService.get_group_by_id, group_id)
     if not group:
         raise HTTPException(status_code=404, detail="分组不存在")
     
-    return GroupResponse(**group.to_dict())
+    return GroupResponse(**group)
 
 @router.put("/{group_id}", response_model=GroupResponse)
 async def update_group(
     group_id: int, 
     group_update: GroupUpdate, 
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """更新分组信息"""
     # 过滤掉None值
@@ -72,33 +72,39 @@ async def update_group(
         raise HTTPException(status_code=400, detail="没有提供更新数据")
     
     try:
-        updated_group = GroupService.update_group(db, group_id, update_data)
+        updated_group = await db.run_dict(GroupService.update_group, group_id, update_data)
         if not updated_group:
             raise HTTPException(status_code=404, detail="分组不存在")
         
-        return GroupResponse(**updated_group.to_dict())
+        return GroupResponse(**updated_group)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{group_id}")
-async def delete_group(group_id: int, db: Session = Depends(get_db)):
+async def delete_group(group_id: int, db: DBRunner = Depends(get_db_runner)):
     """删除分组"""
-    success = GroupService.delete_group(db, group_id)
+    success = await db.run(GroupService.delete_group, group_id)
     if not success:
         raise HTTPException(status_code=404, detail="分组不存在")
     
     return {"message": "分组删除成功"}
 
 @router.get("/{group_id}/members")
-async def get_group_members(group_id: int, db: Session = Depends(get_db)):
+async def get_group_members(group_id: int, db: DBRunner = Depends(get_db_runner)):
     """获取组内成员"""
-    members = GroupService.get_group_members(db, group_id)
+    result = await db.run(_group_members, group_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="分组不存在")
     
+    return result
+
+def _group_members(db: Session, group_id: int) -> Optional[dict]:
     # 检查分组是否存在
     group = GroupService.get_group_by_id(db, group_id)
     if not group:
-        raise HTTPException(status_code=404, detail="分组不存在")
+        return None
     
+    members = GroupService.get_group_members(db, group_id)
     return {
         "group_id": group_id,
         "group_name": group.name,
@@ -110,45 +116,45 @@ async def get_group_members(group_id: int, db: Session = Depends(get_db)):
 async def assign_participant_to_group(
     group_id: int, 
     participant_id: int, 
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """将参赛者分配到指定组"""
-    success = GroupService.assign_participant_to_group(db, participant_id, group_id)
+    success = await db.run(GroupService.assign_participant_to_group, participant_id, group_id)
     if not success:
         raise HTTPException(status_code=400, detail="分配失败，请检查参赛者和分组是否存在")
     
     return {"message": "参赛者分配成功"}
 
 @router.delete("/remove/{participant_id}")
-async def remove_participant_from_group(participant_id: int, db: Session = Depends(get_db)):
+async def remove_participant_from_group(participant_id: int, db: DBRunner = Depends(get_db_runner)):
     """将参赛者从组中移除"""
-    success = GroupService.remove_participant_from_group(db, participant_id)
+    success = await db.run(GroupService.remove_participant_from_group, participant_id)
     if not success:
         raise HTTPException(status_code=404, detail="参赛者不存在")
     
     return {"message": "参赛者已从组中移除"}
 
 @router.get("/ungrouped/participants")
-async def get_ungrouped_participants(db: Session = Depends(get_db)):
+async def get_ungrouped_participants(db: DBRunner = Depends(get_db_runner)):
     """获取未分组的参赛者"""
-    participants = GroupService.get_ungrouped_participants(db)
+    participants = await db.run_dicts(GroupService.get_ungrouped_participants)
     return {
         "count": len(participants),
-        "participants": [p.to_dict() for p in participants]
+        "participants": participants
     }
 
 @router.post("/auto-group/by-organization")
 async def auto_group_by_organization(
     request: AutoGroupRequest, 
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """按单位自动分组"""
     try:
-        created_groups = GroupService.auto_group_by_organization(db, request.max_group_size)
+        created_groups = await db.run_dicts(GroupService.auto_group_by_organization, request.max_group_size)
         
         return {
             "message": f"自动分组完成，创建了 {len(created_groups)} 个组",
-            "groups": [GroupResponse(**group.to_dict()) for group in created_groups]
+            "groups": [GroupResponse(**group) for group in created_groups]
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -156,25 +162,25 @@ async def auto_group_by_organization(
 @router.post("/merge-small-organizations")
 async def merge_small_organizations(
     request: MergeGroupRequest, 
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """合并小单位到同一组"""
     try:
-        created_groups = GroupService.merge_small_organizations(
-            db, request.min_group_size, request.max_group_size
+        created_groups = await db.run_dicts(
+            GroupService.merge_small_organizations, request.min_group_size, request.max_group_size
         )
         
         return {
             "message": f"合并分组完成，创建了 {len(created_groups)} 个组",
-            "groups": [GroupResponse(**group.to_dict()) for group in created_groups]
+            "groups": [GroupResponse(**group) for group in created_groups]
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/draw-lots")
-async def draw_lots_for_groups(db: Session = Depends(get_db)):
+async def draw_lots_for_groups(db: DBRunner = Depends(get_db_runner)):
     """为所有组抽签确定出场顺序"""
-    result = GroupService.draw_lots_for_groups(db)
+    result = await db.run(GroupService.draw_lots_for_groups)
     
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
@@ -182,20 +188,23 @@ async def draw_lots_for_groups(db: Session = Depends(get_db)):
     return result
 
 @router.get("/statistics/overview")
-async def get_groups_statistics(db: Session = Depends(get_db)):
+async def get_groups_statistics(db: DBRunner = Depends(get_db_runner)):
     """获取分组统计信息"""
-    return GroupService.get_groups_statistics(db)
+    return await db.run(GroupService.get_groups_statistics)
 
 # 批量操作接口
 @router.post("/batch/assign")
 async def batch_assign_participants(
     assignments: List[dict], 
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """批量分配参赛者到组
     
     assignments格式: [{"participant_id": 1, "group_id": 1}, ...]
     """
+    return await db.run(_batch_assign, assignments)
+
+def _batch_assign(db: Session, assignments: List[dict]) -> dict:
     success_count = 0
     errors = []
     
@@ -224,8 +233,11 @@ async def batch_assign_participants(
     }
 
 @router.get("/draw-order/list")
-async def get_groups_by_draw_order(db: Session = Depends(get_db)):
+async def get_groups_by_draw_order(db: DBRunner = Depends(get_db_runner)):
     """按抽签顺序获取分组列表"""
+    return await db.run(_groups_by_draw_order)
+
+def _groups_by_draw_order(db: Session) -> List[dict]:
     groups = GroupService.get_all_groups(db)
     
     # 按抽签顺序排序
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+from ..services.job_service import job_registry
+
+router = APIRouter()
+
+@router.get("/")
+async def get_jobs(kind: Optional[str] = None):
+    """获取最近的后台任务"""
+    return [job.to_dict() for job in job_registry.list(kind)]
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """查询后台任务进度和结果"""
+    job = job_registry.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    return job.to_dict()
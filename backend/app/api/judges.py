@@ -1,8 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
-from ..database import get_db
+from ..database import DBRunner, get_db_runner
 from ..services.judge_service import JudgeService
 
 router = APIRouter()
@@ -38,22 +37,22 @@ class ChangePasswordRequest(BaseModel):
     new_password: str
 
 @router.post("/", response_model=JudgeResponse)
-async def create_judge(judge: JudgeCreate, db: Session = Depends(get_db)):
+async def create_judge(judge: JudgeCreate, db: DBRunner = Depends(get_db_runner)):
     """创建评委"""
     try:
-        new_judge = JudgeService.create_judge(
-            db, judge.name, judge.username, judge.password, judge.organization
+        new_judge = await db.run_dict(
+            JudgeService.create_judge, judge.name, judge.username, judge.password, judge.organization
         )
-        return JudgeResponse(**new_judge.to_dict())
+        return JudgeResponse(**new_judge)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/login")
-async def login_judge(login_data: JudgeLogin, db: Session = Depends(get_db)):
+async def login_judge(login_data: JudgeLogin, db: DBRunner = Depends(get_db_runner)):
     """评委登录"""
-    result = JudgeService.authenticate_judge(db, login_data.username, login_data.password)
+    result = await db.run(JudgeService.authenticate_judge, login_data.username, login_data.password)
     
     if not result:
         raise HTTPException(status_code=401, detail="用户名或密码错误")
@@ -61,25 +60,25 @@ async def login_judge(login_data: JudgeLogin, db: Session = Depends(get_db)):
     return result
 
 @router.get("/", response_model=List[JudgeResponse])
-async def get_judges(include_inactive: bool = False, db: Session = Depends(get_db)):
+async def get_judges(include_inactive: bool = False, db: DBRunner = Depends(get_db_runner)):
     """获取评委列表"""
-    judges = JudgeService.get_all_judges(db, include_inactive)
-    return [JudgeResponse(**judge.to_dict()) for judge in judges]
+    judges = await db.run_dicts(JudgeService.get_all_judges, include_inactive)
+    return [JudgeResponse(**judge) for judge in judges]
 
 @router.get("/{judge_id}", response_model=JudgeResponse)
-async def get_judge(judge_id: int, db: Session = Depends(get_db)):
+async def get_judge(judge_id: int, db: DBRunner = Depends(get_db_runner)):
     """获取单个评委信息"""
-    judge = JudgeService.get_judge_by_id(db, judge_id)
+    judge = await db.run_dict(JudgeService.get_judge_by_id, judge_id)
     if not judge:
         raise HTTPException(status_code=404, detail="评委不存在")
     
-    return JudgeResponse(**judge.to_dict())
+    return JudgeResponse(**judge)
 
 @router.put("/{judge_id}", response_model=JudgeResponse)
 async def update_judge(
     judge_id: int, 
     judge_update: JudgeUpdate, 
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """更新评委信息"""
     # 过滤掉None值
@@ -89,38 +88,38 @@ async def update_judge(
         raise HTTPException(status_code=400, detail="没有提供更新数据")
     
     try:
-        updated_judge = JudgeService.update_judge(db, judge_id, update_data)
+        updated_judge = await db.run_dict(JudgeService.update_judge, judge_id, update_data)
         if not updated_judge:
             raise HTTPException(status_code=404, detail="评委不存在")
         
-        return JudgeResponse(**updated_judge.to_dict())
+        return JudgeResponse(**updated_judge)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{judge_id}")
-async def delete_judge(judge_id: int, db: Session = Depends(get_db)):
+async def delete_judge(judge_id: int, db: DBRunner = Depends(get_db_runner)):
     """删除评委"""
-    success = JudgeService.delete_judge(db, judge_id)
+    success = await db.run(JudgeService.delete_judge, judge_id)
     if not success:
         raise HTTPException(status_code=404, detail="评委不存在")
     
     return {"message": "评委删除成功"}
 
 @router.post("/{judge_id}/deactivate")
-async def deactivate_judge(judge_id: int, db: Session = Depends(get_db)):
+async def deactivate_judge(judge_id: int, db: DBRunner = Depends(get_db_runner)):
     """停用评委"""
-    success = JudgeService.deactivate_judge(db, judge_id)
+    success = await db.run(JudgeService.deactivate_judge, judge_id)
     if not success:
         raise HTTPException(status_code=404, detail="评委不存在")
     
     return {"message": "评委已停用"}
 
 @router.post("/{judge_id}/activate")
-async def activate_judge(judge_id: int, db: Session = Depends(get_db)):
+async def activate_judge(judge_id: int, db: DBRunner = Depends(get_db_runner)):
     """激活评委"""
-    success = JudgeService.activate_judge(db, judge_id)
+    success = await db.run(JudgeService.activate_judge, judge_id)
     if not success:
         raise HTTPException(status_code=404, detail="评委不存在")
     
@@ -130,10 +129,10 @@ async def activate_judge(judge_id: int, db: Session = Depends(get_db)):
 async def reset_judge_password(
     judge_id: int, 
     new_password: str, 
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """重置评委密码（管理员功能）"""
-    success = JudgeService.reset_judge_password(db, judge_id, new_password)
+    success = await db.run(JudgeService.reset_judge_password, judge_id, new_password)
     if not success:
         raise HTTPException(status_code=404, detail="评委不存在")
     
@@ -143,11 +142,11 @@ async def reset_judge_password(
 async def change_judge_password(
     judge_id: int,
     password_data: ChangePasswordRequest,
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """评委修改密码"""
-    result = JudgeService.change_judge_password(
-        db, judge_id, password_data.old_password, password_data.new_password
+    result = await db.run(
+        JudgeService.change_judge_password, judge_id, password_data.old_password, password_data.new_password
     )
     
     if not result["success"]:
@@ -156,29 +155,29 @@ async def change_judge_password(
     return result
 
 @router.get("/{judge_id}/profile")
-async def get_judge_profile(judge_id: int, db: Session = Depends(get_db)):
+async def get_judge_profile(judge_id: int, db: DBRunner = Depends(get_db_runner)):
     """获取评委个人信息"""
-    profile = JudgeService.get_judge_profile(db, judge_id)
+    profile = await db.run(JudgeService.get_judge_profile, judge_id)
     if not profile:
         raise HTTPException(status_code=404, detail="评委不存在")
     
     return profile
 
 @router.post("/batch")
-async def batch_create_judges(judges_data: List[JudgeCreate], db: Session = Depends(get_db)):
+async def batch_create_judges(judges_data: List[JudgeCreate], db: DBRunner = Depends(get_db_runner)):
     """批量创建评委"""
     try:
         judges_dict = [j.dict() for j in judges_data]
-        created_judges = JudgeService.batch_create_judges(db, judges_dict)
+        created_judges = await db.run_dicts(JudgeService.batch_create_judges, judges_dict)
         
         return {
             "message": f"成功创建 {len(created_judges)} 个评委",
-            "judges": [JudgeResponse(**j.to_dict()) for j in created_judges]
+            "judges": [JudgeResponse(**j) for j in created_judges]
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/statistics/overview")
-async def get_judges_statistics(db: Session = Depends(get_db)):
+async def get_judges_statistics(db: DBRunner = Depends(get_db_runner)):
     """获取评委统计信息"""
-    return JudgeService.get_judge_statistics(db)
\ No newline at end of file
+    return await db.run(JudgeService.get_judge_statistics)
\ No newline at end of file
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
-from ..database import get_db
+from ..database import DBRunner, get_db_runner
 from ..services.participant_service import ParticipantService
+from ..services.job_service import job_registry
+from ..services.qr_batch import render_qr_codes_job
 from ..utils.file_handler import save_participant_photo
 
 router = APIRouter()
@@ -20,6 +22,14 @@ class ParticipantUpdate(BaseModel):
     phone: Optional[str] = None
     group_id: Optional[int] = None
 
+class RoundScoreResponse(BaseModel):
+    round_number: int
+    score_count: int
+    average_score: float
+    min_score: Optional[float] = None
+    max_score: Optional[float] = None
+    trimmed_mean: Optional[float] = None
+
 class ParticipantResponse(BaseModel):
     id: int
     name: str
@@ -33,37 +43,38 @@ class ParticipantResponse(BaseModel):
     is_checked_in: bool
     checkin_time: Optional[str] = None
     average_score: float
+    round_scores: List[RoundScoreResponse] = []
     created_at: Optional[str] = None
 
 @router.post("/", response_model=ParticipantResponse)
-async def create_participant(participant: ParticipantCreate, db: Session = Depends(get_db)):
+async def create_participant(participant: ParticipantCreate, db: DBRunner = Depends(get_db_runner)):
     """创建参赛者"""
     try:
-        new_participant = ParticipantService.create_participant(db, participant.dict())
-        return ParticipantResponse(**new_participant.to_dict())
+        new_participant = await db.run_dict(ParticipantService.create_participant, participant.dict())
+        return ParticipantResponse(**new_participant)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/", response_model=List[ParticipantResponse])
-async def get_participants(skip: int = 0, limit: int = 1000, db: Session = Depends(get_db)):
+async def get_participants(skip: int = 0, limit: int = 1000, db: DBRunner = Depends(get_db_runner)):
     """获取参赛者列表"""
-    participants = ParticipantService.get_all_participants(db, skip, limit)
-    return [ParticipantResponse(**p.to_dict()) for p in participants]
+    participants = await db.run_dicts(ParticipantService.get_all_participants, skip, limit)
+    return [ParticipantResponse(**p) for p in participants]
 
 @router.get("/{participant_id}", response_model=ParticipantResponse)
-async def get_participant(participant_id: int, db: Session = Depends(get_db)):
+async def get_participant(participant_id: int, db: DBRunner = Depends(get_db_runner)):
     """获取单个参赛者信息"""
-    participant = ParticipantService.get_participant_by_id(db, participant_id)
+    participant = await db.run_dict(ParticipantService.get_participant_by_id, participant_id)
     if not participant:
         raise HTTPException(status_code=404, detail="参赛者不存在")
     
-    return ParticipantResponse(**participant.to_dict())
+    return ParticipantResponse(**participant)
 
 @router.put("/{participant_id}", response_model=ParticipantResponse)
 async def update_participant(
     participant_id: int, 
     participant_update: ParticipantUpdate, 
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """更新参赛者信息"""
     # 过滤掉None值
@@ -73,71 +84,71 @@ async def update_participant(
         raise HTTPException(status_code=400, detail="没有提供更新数据")
     
     try:
-        updated_participant = ParticipantService.update_participant(db, participant_id, update_data)
+        updated_participant = await db.run_dict(ParticipantService.update_participant, participant_id, update_data)
         if not updated_participant:
             raise HTTPException(status_code=404, detail="参赛者不存在")
         
-        return ParticipantResponse(**updated_participant.to_dict())
+        return ParticipantResponse(**updated_participant)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{participant_id}")
-async def delete_participant(participant_id: int, db: Session = Depends(get_db)):
+async def delete_participant(participant_id: int, db: DBRunner = Depends(get_db_runner)):
     """删除参赛者"""
-    success = ParticipantService.delete_participant(db, participant_id)
+    success = await db.run(ParticipantService.delete_participant, participant_id)
     if not success:
         raise HTTPException(status_code=404, detail="参赛者不存在")
     
     return {"message": "参赛者删除成功"}
 
 @router.get("/search/{keyword}", response_model=List[ParticipantResponse])
-async def search_participants(keyword: str, db: Session = Depends(get_db)):
+async def search_participants(keyword: str, db: DBRunner = Depends(get_db_runner)):
     """搜索参赛者"""
-    participants = ParticipantService.search_participants(db, keyword)
-    return [ParticipantResponse(**p.to_dict()) for p in participants]
+    participants = await db.run_dicts(ParticipantService.search_participants, keyword)
+    return [ParticipantResponse(**p) for p in participants]
 
 @router.get("/organization/{organization}", response_model=List[ParticipantResponse])
-async def get_participants_by_organization(organization: str, db: Session = Depends(get_db)):
+async def get_participants_by_organization(organization: str, db: DBRunner = Depends(get_db_runner)):
     """根据单位获取参赛者"""
-    participants = ParticipantService.get_participants_by_organization(db, organization)
-    return [ParticipantResponse(**p.to_dict()) for p in participants]
+    participants = await db.run_dicts(ParticipantService.get_participants_by_organization, organization)
+    return [ParticipantResponse(**p) for p in participants]
 
 @router.get("/group/{group_id}", response_model=List[ParticipantResponse])
-async def get_participants_by_group(group_id: int, db: Session = Depends(get_db)):
+async def get_participants_by_group(group_id: int, db: DBRunner = Depends(get_db_runner)):
     """根据组别获取参赛者"""
-    participants = ParticipantService.get_participants_by_group(db, group_id)
-    return [ParticipantResponse(**p.to_dict()) for p in participants]
+    participants = await db.run_dicts(ParticipantService.get_participants_by_group, group_id)
+    return [ParticipantResponse(**p) for p in participants]
 
 @router.get("/status/checked-in", response_model=List[ParticipantResponse])
-async def get_checked_in_participants(db: Session = Depends(get_db)):
+async def get_checked_in_participants(db: DBRunner = Depends(get_db_runner)):
     """获取已签到的参赛者"""
-    participants = ParticipantService.get_checked_in_participants(db)
-    return [ParticipantResponse(**p.to_dict()) for p in participants]
+    participants = await db.run_dicts(ParticipantService.get_checked_in_participants)
+    return [ParticipantResponse(**p) for p in participants]
 
 @router.get("/status/not-checked-in", response_model=List[ParticipantResponse])
-async def get_not_checked_in_participants(db: Session = Depends(get_db)):
+async def get_not_checked_in_participants(db: DBRunner = Depends(get_db_runner)):
     """获取未签到的参赛者"""
-    participants = ParticipantService.get_not_checked_in_participants(db)
-    return [ParticipantResponse(**p.to_dict()) for p in participants]
+    participants = await db.run_dicts(ParticipantService.get_not_checked_in_participants)
+    return [ParticipantResponse(**p) for p in participants]
 
 @router.post("/{participant_id}/photo")
 async def upload_participant_photo(
     participant_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """上传参赛者照片"""
     # 检查参赛者是否存在
-    participant = ParticipantService.get_participant_by_id(db, participant_id)
+    participant = await db.run(ParticipantService.get_participant_by_id, participant_id)
     if not participant:
         raise HTTPException(status_code=404, detail="参赛者不存在")
     
     try:
         # 保存照片
-        photo_path = save_participant_photo(file, participant_id)
+        photo_path = await run_in_threadpool(save_participant_photo, file, participant_id)
         
         # 更新参赛者照片路径
-        ParticipantService.update_participant(db, participant_id, {"photo_path": photo_path})
+        await db.run(ParticipantService.update_participant, participant_id, {"photo_path": photo_path})
         
         return {"message": "照片上传成功", "photo_path": photo_path}
     except ValueError as e:
@@ -146,32 +157,40 @@ async def upload_participant_photo(
         raise HTTPException(status_code=500, detail=f"照片上传失败: {str(e)}")
 
 @router.post("/batch")
-async def batch_create_participants(participants_data: List[ParticipantCreate], db: Session = Depends(get_db)):
+async def batch_create_participants(participants_data: List[ParticipantCreate], db: DBRunner = Depends(get_db_runner)):
     """批量创建参赛者"""
     try:
         participants_dict = [p.dict() for p in participants_data]
-        created_participants = ParticipantService.batch_create_participants(db, participants_dict)
+        created_participants = await db.run_dicts(ParticipantService.batch_create_participants, participants_dict)
         
         return {
             "message": f"成功创建 {len(created_participants)} 个参赛者",
-            "participants": [ParticipantResponse(**p.to_dict()) for p in created_participants]
+            "participants": [ParticipantResponse(**p) for p in created_participants]
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/generate-qr-codes")
-async def generate_qr_codes(db: Session = Depends(get_db)):
-    """为所有参赛者生成二维码"""
-    try:
-        file_paths = ParticipantService.generate_qr_codes_for_all(db)
-        return {
-            "message": f"成功生成 {len(file_paths)} 个二维码",
-            "file_paths": file_paths
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"生成二维码失败: {str(e)}")
+async def generate_qr_codes(force: bool = False, db: DBRunner = Depends(get_db_runner)):
+    """
+    为所有参赛者生成二维码（后台任务）
+    
+    内容未变化的二维码会跳过，force=true 时全部重新生成。
+    返回任务ID，通过 /api/jobs/{job_id} 查询进度和结果。
+
+    兼容说明：该接口以前同步生成并直接返回 file_paths，现在只返回 job_id / status_url。
+    原来的 file_paths（全部参赛者的二维码文件路径）在任务完成后的 result.file_paths 中，
+    result 还包含 generated、skipped 和 failed。
+    """
+    items = await db.run(ParticipantService.get_qr_code_items)
+    job = job_registry.submit("qr_codes", render_qr_codes_job, items, force, total=len(items))
+    return {
+        "message": f"已开始为 {len(items)} 名参赛者生成二维码",
+        "job_id": job.id,
+        "status_url": f"/api/jobs/{job.id}"
+    }
 
 @router.get("/statistics/overview")
-async def get_participants_statistics(db: Session = Depends(get_db)):
+async def get_participants_statistics(db: DBRunner = Depends(get_db_runner)):
     """获取参赛者统计信息"""
-    return ParticipantService.get_participants_statistics(db)
\ No newline at end of file
+    return await db.run(ParticipantService.get_participants_statistics)
\ No newline at end of file
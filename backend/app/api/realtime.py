@@ -0,0 +1,123 @@
+from fastapi import APIRouter, Header, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+import json
+from ..services.event_hub import event_hub
+
+router = APIRouter()
+
+# 没有事件时的心跳间隔（秒），防止代理断开空闲连接
+HEARTBEAT_INTERVAL = 15
+
+def _resync_message() -> dict:
+    """通知客户端错过的事件已无法补发，需要重新拉取完整数据"""
+    return {"seq": event_hub.last_seq, "type": "resync", "data": None}
+
+@router.websocket("/ws")
+async def realtime_websocket(websocket: WebSocket, since: Optional[int] = None):
+    """
+    实时推送（WebSocket）
+
+    连接参数 since 为最后收到的事件序号，重连时据此补发错过的事件。
+    推送消息格式: {"seq": 序号, "type": 事件类型, "ts": 时间戳, "data": {...}}
+    事件类型: checkin / checkin_cancelled / score / rank / resync / ping
+    """
+    await websocket.accept()
+    subscription, backlog, resync = event_hub.subscribe(since)
+
+    # 推送和接收并行：客户端断开时立即结束推送，不必等到下一次发送失败
+    tasks = [
+        asyncio.create_task(_send_events(websocket, subscription, backlog, resync)),
+        asyncio.create_task(_receive_until_disconnect(websocket))
+    ]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_hub.unsubscribe(subscription)
+
+async def _send_events(websocket: WebSocket, subscription, backlog: list, resync: bool):
+    if resync:
+        await websocket.send_json(_resync_message())
+    for event in backlog:
+        subscription.last_seq = event["seq"]
+        await websocket.send_json(event)
+
+    while True:
+        event = await subscription.next_event(HEARTBEAT_INTERVAL)
+        if event is not None:
+            await websocket.send_json(event)
+        elif subscription.overflowed:
+            # 消费过慢被断开，客户端按序号重连补发
+            await websocket.send_json(_resync_message())
+            await websocket.close()
+            return
+        else:
+            await websocket.send_json({"seq": subscription.last_seq, "type": "ping", "data": None})
+
+async def _receive_until_disconnect(websocket: WebSocket):
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+@router.get("/events")
+async def realtime_events(
+    request: Request,
+    since: Optional[int] = Query(None),
+    last_event_id: Optional[int] = Header(None)
+):
+    """
+    实时推送（SSE，WebSocket 不可用时的后备方案）
+
+    浏览器 EventSource 断线重连时会自动带上 Last-Event-ID，
+    也可以用 since 参数指定最后收到的事件序号。
+    """
+    if since is None:
+        since = last_event_id
+
+    async def event_stream():
+        subscription, backlog, resync = event_hub.subscribe(since)
+        try:
+            if resync:
+                yield _format_sse(_resync_message())
+            for event in backlog:
+                subscription.last_seq = event["seq"]
+                yield _format_sse(event)
+
+            while not await request.is_disconnected():
+                event = await subscription.next_event(HEARTBEAT_INTERVAL)
+                if event is not None:
+                    yield _format_sse(event)
+                elif subscription.overflowed:
+                    yield _format_sse(_resync_message())
+                    break
+                else:
+                    yield ": ping\n\n"
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/status")
+async def realtime_status():
+    """实时推送状态"""
+    return {
+        "last_seq": event_hub.last_seq,
+        "subscribers": event_hub.subscriber_count
+    }
+
+def _format_sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import BaseModel, validator
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field, validator
 from typing import List, Optional
-from ..database import get_db
+from ..database import DBRunner, get_db_runner
 from ..services.score_service import ScoreService
+from ..services.worklist_service import WorklistService
+from ..services.score_sync_service import ScoreSyncService
 
 router = APIRouter()
 
@@ -15,8 +16,8 @@ class ScoreSubmit(BaseModel):
     
     @validator('score')
     def validate_score(cls, v):
-        if not (0 <= v <= 10):
-            raise ValueError('评分必须在0-10之间')
+        if not ScoreService.is_valid_score(v):
+            raise ValueError(ScoreService.INVALID_SCORE_MESSAGE)
         return v
 
 class ScoreResponse(BaseModel):
@@ -30,6 +31,18 @@ class ScoreResponse(BaseModel):
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
 
+class ScoreSyncOperation(BaseModel):
+    op_id: str = Field(..., min_length=1, max_length=64)
+    participant_id: int
+    round_number: int = 1
+    score: float
+    client_ts: int  # 客户端评分时间（毫秒时间戳）
+
+class ScoreSyncRequest(BaseModel):
+    judge_id: int
+    cursor: int = 0
+    ops: List[ScoreSyncOperation] = []
+
 class RankingItem(BaseModel):
     rank: int
     participant: dict
@@ -38,10 +51,10 @@ class RankingItem(BaseModel):
     total_judges: int
 
 @router.post("/submit")
-async def submit_score(score_data: ScoreSubmit, db: Session = Depends(get_db)):
+async def submit_score(score_data: ScoreSubmit, db: DBRunner = Depends(get_db_runner)):
     """提交评分"""
-    result = ScoreService.submit_score(
-        db=db,
+    result = await db.run(
+        ScoreService.submit_score,
         participant_id=score_data.participant_id,
         judge_id=score_data.judge_id,
         score=score_data.score,
@@ -57,30 +70,30 @@ async def submit_score(score_data: ScoreSubmit, db: Session = Depends(get_db)):
 async def get_participant_scores(
     participant_id: int, 
     round_number: int = 1, 
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """获取参赛者的所有评分"""
-    scores = ScoreService.get_participant_scores(db, participant_id, round_number)
-    return [ScoreResponse(**score.to_dict()) for score in scores]
+    scores = await db.run_dicts(ScoreService.get_participant_scores, participant_id, round_number)
+    return [ScoreResponse(**score) for score in scores]
 
 @router.get("/judge/{judge_id}", response_model=List[ScoreResponse])
 async def get_judge_scores(
     judge_id: int, 
     round_number: int = 1, 
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """获取评委的所有评分"""
-    scores = ScoreService.get_judge_scores(db, judge_id, round_number)
-    return [ScoreResponse(**score.to_dict()) for score in scores]
+    scores = await db.run_dicts(ScoreService.get_judge_scores, judge_id, round_number)
+    return [ScoreResponse(**score) for score in scores]
 
 @router.get("/participant/{participant_id}/average")
 async def get_participant_average(
     participant_id: int, 
     round_number: int = 1, 
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """获取参赛者平均分"""
-    average = ScoreService.calculate_participant_average(db, participant_id, round_number)
+    average = await db.run(ScoreService.calculate_participant_average, participant_id, round_number)
     
     if average is None:
         return {"participant_id": participant_id, "average_score": None, "message": "暂无评分"}
@@ -88,20 +101,38 @@ async def get_participant_average(
     return {"participant_id": participant_id, "average_score": average}
 
 @router.get("/ranking", response_model=List[RankingItem])
-async def get_ranking(round_number: int = 1, db: Session = Depends(get_db)):
-    """获取排行榜"""
-    ranking = ScoreService.get_ranking(db, round_number)
+async def get_ranking(
+    round_number: int = 1, 
+    limit: Optional[int] = None, 
+    db: DBRunner = Depends(get_db_runner)
+):
+    """获取排行榜（limit 为前N名）"""
+    ranking = await db.run(ScoreService.get_ranking, round_number, limit)
     return [RankingItem(**item) for item in ranking]
 
+@router.get("/ranking/participant/{participant_id}")
+async def get_participant_rank(
+    participant_id: int, 
+    round_number: int = 1, 
+    db: DBRunner = Depends(get_db_runner)
+):
+    """获取参赛者的当前名次"""
+    result = await db.run(ScoreService.get_participant_rank, participant_id, round_number)
+    
+    if result is None:
+        raise HTTPException(status_code=404, detail="该参赛者本轮暂无评分")
+    
+    return result
+
 @router.get("/progress")
-async def get_scoring_progress(round_number: int = 1, db: Session = Depends(get_db)):
+async def get_scoring_progress(round_number: int = 1, db: DBRunner = Depends(get_db_runner)):
     """获取评分进度"""
-    return ScoreService.get_scoring_progress(db, round_number)
+    return await db.run(ScoreService.get_scoring_progress, round_number)
 
 @router.delete("/{score_id}")
-async def delete_score(score_id: int, db: Session = Depends(get_db)):
+async def delete_score(score_id: int, db: DBRunner = Depends(get_db_runner)):
     """删除评分"""
-    success = ScoreService.delete_score(db, score_id)
+    success = await db.run(ScoreService.delete_score, score_id)
     if not success:
         raise HTTPException(status_code=404, detail="评分记录不存在")
     
@@ -111,10 +142,10 @@ async def delete_score(score_id: int, db: Session = Depends(get_db)):
 async def get_participant_detailed_scores(
     participant_id: int, 
     round_number: int = 1, 
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """获取参赛者详细评分信息"""
-    details = ScoreService.get_participant_detailed_scores(db, participant_id, round_number)
+    details = await db.run(ScoreService.get_participant_detailed_scores, participant_id, round_number)
     
     if not details:
         raise HTTPException(status_code=404, detail="参赛者不存在")
@@ -122,74 +153,79 @@ async def get_participant_detailed_scores(
     return details
 
 @router.get("/export")
-async def export_scores(round_number: int = 1, db: Session = Depends(get_db)):
+async def export_scores(round_number: int = 1, db: DBRunner = Depends(get_db_runner)):
     """导出评分数据"""
-    return ScoreService.export_scores(db, round_number)
+    return await db.run(ScoreService.export_scores, round_number)
 
 @router.get("/statistics")
-async def get_score_statistics(round_number: int = 1, db: Session = Depends(get_db)):
+async def get_score_statistics(round_number: int = 1, db: DBRunner = Depends(get_db_runner)):
     """获取评分统计信息"""
-    return ScoreService.get_score_statistics(db, round_number)
+    return await db.run(ScoreService.get_score_statistics, round_number)
 
 # 批量评分接口
 @router.post("/batch")
-async def batch_submit_scores(scores_data: List[ScoreSubmit], db: Session = Depends(get_db)):
-    """批量提交评分"""
-    results = []
-    errors = []
+async def batch_submit_scores(
+    scores_data: List[ScoreSubmit],
+    atomic: bool = False,
+    db: DBRunner = Depends(get_db_runner)
+):
+    """
+    批量提交评分（一个事务写入）
     
-    for i, score_data in enumerate(scores_data):
-        try:
-            result = ScoreService.submit_score(
-                db=db,
-                participant_id=score_data.participant_id,
-                judge_id=score_data.judge_id,
-                score=score_data.score,
-                round_number=score_data.round_number
-            )
-            
-            if result["success"]:
-                results.append(result)
-            else:
-                errors.append({"index": i, "error": result["message"]})
-                
-        except Exception as e:
-            errors.append({"index": i, "error": str(e)})
+    atomic=true 时任一条无效则整批不写入；默认写入有效条目，无效条目在 errors 中逐条报告。
+    results 与提交顺序一一对应。
+    """
+    items = [score_data.dict() for score_data in scores_data]
+    return await db.run(ScoreService.batch_submit_scores, items, atomic)
+
+# 评委离线评分同步
+@router.post("/sync")
+async def sync_scores(request: ScoreSyncRequest, db: DBRunner = Depends(get_db_runner)):
+    """
+    评委离线评分同步
     
-    return {
-        "success_count": len(results),
-        "error_count": len(errors),
-        "results": results,
-        "errors": errors
-    }
+    上传离线期间的评分操作，同时返回 cursor 之后服务端的评分变更和新的 cursor。
+    每条操作的结果：applied 已写入 / stale 已有更新的评分 / rejected 无效（见 error_code）；
+    duplicate 表示该 op_id 之前已处理过，返回的是当时的结果。
+    """
+    ops = [op.dict() for op in request.ops]
+    result = await db.run(ScoreSyncService.sync, request.judge_id, ops, request.cursor)
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["message"])
+    return result
 
 # 评委评分界面专用接口
+@router.get("/judge/{judge_id}/worklist")
+async def get_judge_worklist(
+    judge_id: int,
+    round_number: int = 1,
+    limit: int = Query(10, ge=1, le=200),
+    checked_in_only: bool = True,
+    db: DBRunner = Depends(get_db_runner)
+):
+    """获取评委接下来需要评分的参赛者（按出场顺序）及评分进度"""
+    return await db.run(WorklistService.get_worklist, judge_id, round_number, limit, checked_in_only)
+
 @router.get("/judge/{judge_id}/next-participant")
 async def get_next_participant_to_score(
     judge_id: int, 
     round_number: int = 1, 
-    db: Session = Depends(get_db)
+    checked_in_only: bool = False,
+    db: DBRunner = Depends(get_db_runner)
 ):
-    """获取评委下一个需要评分的参赛者"""
-    # 获取所有参赛者
-    from ..services.participant_service import ParticipantService
-    all_participants = ParticipantService.get_all_participants(db)
-    
-    # 获取该评委已评分的参赛者
-    judge_scores = ScoreService.get_judge_scores(db, judge_id, round_number)
-    scored_participant_ids = {score.participant_id for score in judge_scores}
-    
-    # 找到下一个未评分的参赛者
-    for participant in all_participants:
-        if participant.id not in scored_participant_ids:
-            return {
-                "participant": participant.to_dict(),
-                "has_next": True
-            }
+    """获取评委下一个需要评分的参赛者（默认包含全部参赛者，checked_in_only=true 时只看已签到的）"""
+    worklist = await db.run(WorklistService.get_worklist, judge_id, round_number, 1, checked_in_only)
+    if worklist["participants"]:
+        return {
+            "participant": worklist["participants"][0],
+            "has_next": True,
+            "remaining_participants": worklist["remaining_participants"]
+        }
     
     return {
         "participant": None,
         "has_next": False,
+        "remaining_participants": 0,
         "message": "所有参赛者已评分完成"
     }
 
@@ -197,19 +233,9 @@ async def get_next_participant_to_score(
 async def get_judge_scoring_progress(
     judge_id: int, 
     round_number: int = 1, 
-    db: Session = Depends(get_db)
+    checked_in_only: bool = False,
+    db: DBRunner = Depends(get_db_runner)
 ):
-    """获取评委评分进度"""
-    from ..services.participant_service import ParticipantService
-    
-    total_participants = len(ParticipantService.get_all_participants(db))
-    judge_scores = ScoreService.get_judge_scores(db, judge_id, round_number)
-    scored_count = len(judge_scores)
-    
-    return {
-        "judge_id": judge_id,
-        "total_participants": total_participants,
-        "scored_participants": scored_count,
-        "remaining_participants": total_participants - scored_count,
-        "completion_rate": round(scored_count / total_participants * 100, 2) if total_participants > 0 else 0
-    }
\ No newline at end of file
+    """获取评委评分进度（默认统计全部参赛者，checked_in_only=true 时只统计已签到的）"""
+    counts = await db.run(WorklistService.get_counts, judge_id, round_number, checked_in_only)
+    return {"judge_id": judge_id, **counts}
\ No newline at end of file
@@ -1,46 +1,92 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ..database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import Response
+from typing import Optional
+from ..database import DBRunner, get_read_db_runner
 from ..services.statistics_service import StatisticsService
 
 router = APIRouter()
+# 统计接口均为只读，统一使用只读执行器，不与签到、评分写入争用连接
+
+async def _snapshot_response(name: str, db: DBRunner, if_none_match: Optional[str]) -> Response:
+    """
+    返回物化的统计快照
+    
+    数据未变化时直接使用内存中已序列化的结果，不占用数据库线程；
+    客户端带上 If-None-Match 且内容未变时返回 304。
+    """
+    snapshot = StatisticsService.get_cached_snapshot(name)
+    if snapshot is None:
+        snapshot = await db.run(StatisticsService.get_snapshot, name)
+    
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if snapshot.matches(if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
 
 @router.get("/dashboard")
-async def get_dashboard_statistics(db: Session = Depends(get_db)):
+async def get_dashboard_statistics(
+    if_none_match: Optional[str] = Header(None),
+    db: DBRunner = Depends(get_read_db_runner)
+):
     """获取仪表板统计数据"""
-    return StatisticsService.get_dashboard_statistics(db)
+    return await _snapshot_response("dashboard", db, if_none_match)
 
 @router.get("/checkin/timeline")
-async def get_checkin_timeline(db: Session = Depends(get_db)):
+async def get_checkin_timeline(db: DBRunner = Depends(get_read_db_runner)):
     """获取签到时间线统计"""
-    return StatisticsService.get_checkin_timeline(db)
+    return await db.run(StatisticsService.get_checkin_timeline)
 
 @router.get("/organizations")
-async def get_organization_statistics(db: Session = Depends(get_db)):
+async def get_organization_statistics(
+    if_none_match: Optional[str] = Header(None),
+    db: DBRunner = Depends(get_read_db_runner)
+):
     """获取单位统计信息"""
-    return StatisticsService.get_organization_statistics(db)
+    return await _snapshot_response("organizations", db, if_none_match)
 
 @router.get("/groups")
-async def get_group_statistics(db: Session = Depends(get_db)):
+async def get_group_statistics(
+    if_none_match: Optional[str] = Header(None),
+    db: DBRunner = Depends(get_read_db_runner)
+):
     """获取分组统计信息"""
-    return StatisticsService.get_group_statistics(db)
+    return await _snapshot_response("groups", db, if_none_match)
 
 @router.get("/scoring/heatmap")
-async def get_scoring_heatmap(db: Session = Depends(get_db)):
-    """获取评分热力图数据"""
-    return StatisticsService.get_scoring_heatmap(db)
+async def get_scoring_heatmap(
+    round_number: Optional[int] = None,
+    format: str = "json",
+    db: DBRunner = Depends(get_read_db_runner)
+):
+    """
+    获取评分热力图数据
+    
+    format: json（默认，按参赛者分组）/ columnar（列式）/ binary（float32 矩阵，见 ScoringMatrix.to_binary）
+    """
+    if format == "json":
+        return await db.run(StatisticsService.get_scoring_heatmap, round_number)
+    if format not in ("columnar", "binary"):
+        raise HTTPException(status_code=400, detail="format 只支持 json、columnar、binary")
+    
+    matrix = await db.run(StatisticsService.build_scoring_matrix, round_number)
+    if format == "columnar":
+        return matrix.to_columnar()
+    return Response(content=matrix.to_binary(), media_type="application/octet-stream")
 
 @router.get("/performance/trends")
-async def get_performance_trends(db: Session = Depends(get_db)):
+async def get_performance_trends(db: DBRunner = Depends(get_read_db_runner)):
     """获取性能趋势数据"""
-    return StatisticsService.get_performance_trends(db)
+    return await db.run(StatisticsService.get_performance_trends)
 
 @router.get("/competition/summary")
-async def get_competition_summary(db: Session = Depends(get_db)):
+async def get_competition_summary(
+    if_none_match: Optional[str] = Header(None),
+    db: DBRunner = Depends(get_read_db_runner)
+):
     """获取比赛总结统计"""
-    return StatisticsService.get_competition_summary(db)
+    return await _snapshot_response("summary", db, if_none_match)
 
 @router.get("/export/full-report")
-async def export_full_report(db: Session = Depends(get_db)):
+async def export_full_report(db: DBRunner = Depends(get_read_db_runner)):
     """导出完整报告"""
-    return StatisticsService.export_full_report(db)
\ No newline at end of file
+    return await db.run(StatisticsService.export_full_report)
\ No newline at end of file
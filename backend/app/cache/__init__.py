@@ -0,0 +1,17 @@
+# 进程内缓存与索引
+# 本包不依赖数据库和第三方库，app_fixed / simple_app 也可以直接复用。
+# 注意：这里的结构都是单进程内的写穿缓存，多 worker 部署时每个进程各持一份。
+
+from .identity_index import IdentityEntry, CheckinIdentityIndex, checkin_index
+from .ranking import RoundRanking, LiveRanking, score_ranking
+from .data_version import DataVersion, data_version
+from .snapshot import Snapshot, SnapshotCache, statistics_snapshots, etag_matches
+from .qr_image import CachedImage, QRImageCache
+
+__all__ = [
+    "IdentityEntry", "CheckinIdentityIndex", "checkin_index",
+    "RoundRanking", "LiveRanking", "score_ranking",
+    "DataVersion", "data_version",
+    "Snapshot", "SnapshotCache", "statistics_snapshots", "etag_matches",
+    "CachedImage", "QRImageCache"
+]
@@ -0,0 +1,29 @@
+import threading
+
+
+class DataVersion:
+    """
+    数据版本号（进程内）
+
+    每次有写入的事务提交后加一，读缓存据此判断是否需要重算。
+    由 database 模块在引擎的 commit 事件中调用 bump。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+
+    @property
+    def value(self) -> int:
+        """当前版本号"""
+        return self._value
+
+    def bump(self) -> int:
+        """版本号加一并返回新值"""
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+# 全局数据版本号
+data_version = DataVersion()
@@ -0,0 +1,192 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class IdentityEntry:
+    """签到身份索引条目，只保存签到校验需要的字段"""
+
+    __slots__ = ("id", "qr_code_id", "name", "phone_last4", "is_checked_in", "checkin_time")
+
+    def __init__(self, id: int, qr_code_id: str, name: str, phone_last4: str,
+                 is_checked_in: bool = False, checkin_time: Any = None):
+        self.id = id
+        self.qr_code_id = qr_code_id
+        self.name = name
+        self.phone_last4 = phone_last4
+        self.is_checked_in = bool(is_checked_in)
+        self.checkin_time = checkin_time
+
+    @classmethod
+    def from_participant(cls, participant: Any) -> "IdentityEntry":
+        """从ORM对象（或任何带同名属性的对象）构建条目"""
+        return cls(
+            id=participant.id,
+            qr_code_id=participant.qr_code_id,
+            name=participant.name,
+            phone_last4=participant.phone_last4,
+            is_checked_in=participant.is_checked_in,
+            checkin_time=participant.checkin_time
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IdentityEntry":
+        """从字典数据（app_fixed / simple_app）构建条目"""
+        return cls(
+            id=data["id"],
+            qr_code_id=data["qr_code_id"],
+            name=data["name"],
+            phone_last4=data["phone_last4"],
+            is_checked_in=data.get("is_checked_in", False),
+            checkin_time=data.get("checkin_time")
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        checkin_time = self.checkin_time
+        if checkin_time is not None and hasattr(checkin_time, "isoformat"):
+            checkin_time = checkin_time.isoformat()
+        return {
+            "id": self.id,
+            "name": self.name,
+            "phone_last4": self.phone_last4,
+            "qr_code_id": self.qr_code_id,
+            "is_checked_in": self.is_checked_in,
+            "checkin_time": checkin_time
+        }
+
+    def __repr__(self):
+        return f"<IdentityEntry(id={self.id}, qr_code_id='{self.qr_code_id}', is_checked_in={self.is_checked_in})>"
+
+
+class CheckinIdentityIndex:
+    """
+    签到身份索引（进程内，写穿）
+
+    主索引按 qr_code_id，辅助索引按 (phone_last4, name)。
+    签到高峰时身份校验和"是否已签到"判断直接查内存，不再访问数据库；
+    参赛者新增、修改、删除、导入时由服务层同步调用 upsert / remove。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_id: Dict[int, IdentityEntry] = {}
+        self._by_qr: Dict[str, IdentityEntry] = {}
+        self._by_phone_name: Dict[Tuple[str, str], List[IdentityEntry]] = {}
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        """索引是否已完成预加载"""
+        return self._loaded
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def load(self, entries: Iterable[IdentityEntry]) -> int:
+        """
+        全量加载索引（覆盖已有内容）
+
+        Args:
+            entries: 索引条目
+
+        Returns:
+            加载的条目数量
+        """
+        with self._lock:
+            self._by_id.clear()
+            self._by_qr.clear()
+            self._by_phone_name.clear()
+            for entry in entries:
+                self._insert(entry)
+            self._loaded = True
+            return len(self._by_id)
+
+    def clear(self):
+        """清空索引并标记为未加载"""
+        with self._lock:
+            self._by_id.clear()
+            self._by_qr.clear()
+            self._by_phone_name.clear()
+            self._loaded = False
+
+    def upsert(self, entry: IdentityEntry):
+        """新增或替换条目（参赛者新增、修改、导入时调用）"""
+        with self._lock:
+            self._discard(entry.id)
+            self._insert(entry)
+
+    def remove(self, participant_id: int) -> bool:
+        """删除条目（参赛者删除时调用）"""
+        with self._lock:
+            return self._discard(participant_id) is not None
+
+    def get(self, qr_code_id: str) -> Optional[IdentityEntry]:
+        """根据二维码ID获取条目"""
+        return self._by_qr.get(qr_code_id)
+
+    def get_by_id(self, participant_id: int) -> Optional[IdentityEntry]:
+        """根据参赛者ID获取条目"""
+        return self._by_id.get(participant_id)
+
+    def find_by_phone_name(self, phone_last4: str, name: str) -> Optional[IdentityEntry]:
+        """根据手机后四位和姓名查找条目（移动端签到）"""
+        entries = self._by_phone_name.get((phone_last4, name))
+        return entries[0] if entries else None
+
+    def verify(self, qr_code_id: str, phone_last4: str, name: str) -> Optional[IdentityEntry]:
+        """
+        验证参赛者身份
+
+        Returns:
+            三个字段全部匹配时返回条目，否则返回None
+        """
+        entry = self._by_qr.get(qr_code_id)
+        if entry is None or entry.phone_last4 != phone_last4 or entry.name != name:
+            return None
+        return entry
+
+    def mark_checked_in(self, participant_id: int, checkin_time: Any) -> bool:
+        """
+        原子地把条目标记为已签到
+
+        Returns:
+            标记成功返回True；条目不存在或已签到返回False
+        """
+        with self._lock:
+            entry = self._by_id.get(participant_id)
+            if entry is None or entry.is_checked_in:
+                return False
+            entry.is_checked_in = True
+            entry.checkin_time = checkin_time
+            return True
+
+    def mark_not_checked_in(self, participant_id: int):
+        """把条目恢复为未签到（取消签到或写库失败回滚时调用）"""
+        with self._lock:
+            entry = self._by_id.get(participant_id)
+            if entry is not None:
+                entry.is_checked_in = False
+                entry.checkin_time = None
+
+    def _insert(self, entry: IdentityEntry):
+        self._by_id[entry.id] = entry
+        self._by_qr[entry.qr_code_id] = entry
+        self._by_phone_name.setdefault((entry.phone_last4, entry.name), []).append(entry)
+
+    def _discard(self, participant_id: int) -> Optional[IdentityEntry]:
+        entry = self._by_id.pop(participant_id, None)
+        if entry is None:
+            return None
+        if self._by_qr.get(entry.qr_code_id) is entry:
+            del self._by_qr[entry.qr_code_id]
+        key = (entry.phone_last4, entry.name)
+        bucket = self._by_phone_name.get(key)
+        if bucket:
+            bucket[:] = [e for e in bucket if e is not entry]
+            if not bucket:
+                del self._by_phone_name[key]
+        return entry
+
+
+# 全局签到身份索引
+checkin_index = CheckinIdentityIndex()
@@ -0,0 +1,116 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+from .snapshot import etag_matches
+
+
+class CachedImage:
+    """一张已渲染的二维码图片：PNG 内容、按内容计算的强 ETag，以及按需生成的 base64 data URL"""
+
+    __slots__ = ("body", "etag", "_data_url")
+
+    media_type = "image/png"
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self._data_url: Optional[str] = None
+
+    @property
+    def data_url(self) -> str:
+        """data:image/png;base64,... 形式（旧接口返回 JSON 时使用）"""
+        if self._data_url is None:
+            self._data_url = "data:image/png;base64," + base64.b64encode(self.body).decode()
+        return self._data_url
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """请求头 If-None-Match 是否与当前 ETag 匹配"""
+        return etag_matches(self.etag, if_none_match)
+
+
+class QRImageCache:
+    """
+    二维码图片缓存（内容寻址）
+
+    以 二维码内容 + 渲染参数 的哈希为键：签到链接（mobile_base_url、qr_code_id）或渲染参数
+    变化时自然换成新键，不需要主动失效。内存中按 LRU 保留 max_entries 张，
+    指定 cache_dir 时同时落盘，进程重启后不必重新渲染。
+    渲染函数由调用方提供（render(data, **options) -> PNG bytes），本模块不依赖二维码库。
+    """
+
+    def __init__(self, render: Callable[..., bytes], max_entries: int = 2048,
+                 cache_dir: Optional[str] = None):
+        self.render = render
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._images: "OrderedDict[str, CachedImage]" = OrderedDict()
+
+    def get(self, data: str, **options) -> CachedImage:
+        """
+        获取二维码图片，未缓存时渲染
+
+        Args:
+            data: 二维码内容（签到链接）
+            options: 传给渲染函数的参数，同时参与缓存键计算
+        """
+        key = self._key(data, options)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                return image
+
+        # 渲染不加锁：并发首次请求可能各渲染一次，结果相同
+        image = self._load(key)
+        if image is None:
+            image = CachedImage(self.render(data, **options))
+            self._store(key, image)
+
+        with self._lock:
+            self._images[key] = image
+            while len(self._images) > self.max_entries:
+                self._images.popitem(last=False)
+        return image
+
+    def clear(self):
+        """清空内存中的缓存（磁盘文件保留）"""
+        with self._lock:
+            self._images.clear()
+
+    def __len__(self):
+        return len(self._images)
+
+    @staticmethod
+    def _key(data: str, options: dict) -> str:
+        payload = json.dumps([data, options], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def _load(self, key: str) -> Optional[CachedImage]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return CachedImage(f.read())
+        except OSError:
+            return None
+
+    def _store(self, key: str, image: CachedImage):
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(image.body)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            # 磁盘缓存只是加速，写入失败不影响返回
+            print(f"二维码缓存写入失败: {e}")
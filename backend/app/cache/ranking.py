@@ -0,0 +1,206 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 排名条目：(参赛者ID, 平均分, 评分数量)
+RankingItem = Tuple[int, float, int]
+
+
+class RoundRanking:
+    """
+    单轮次的实时排名
+
+    每个参赛者保存各评委的评分以及累计总分、评分数量；
+    另维护一个按 (-平均分, 参赛者ID) 排序的有序列表作为顺序统计结构：
+    查询某人名次为二分查找 O(log n)，取前N名为切片 O(N)，
+    更新时 insort 只是一次内存移动，对比赛规模的数据量足够快。
+    不加锁，由 LiveRanking 统一加锁。
+    """
+
+    def __init__(self):
+        self._scores: Dict[int, Dict[int, float]] = {}
+        self._sums: Dict[int, float] = {}
+        self._keys: Dict[int, Tuple[float, int]] = {}
+        self._order: List[Tuple[float, int]] = []
+
+    def __len__(self):
+        return len(self._order)
+
+    def set_score(self, participant_id: int, judge_id: int, score: float):
+        """新增或修改一条评分（按绝对值设置，重复调用结果相同）"""
+        judge_scores = self._scores.setdefault(participant_id, {})
+        old = judge_scores.get(judge_id)
+        if old == score:
+            return
+        judge_scores[judge_id] = score
+        self._sums[participant_id] = self._sums.get(participant_id, 0.0) + score - (old or 0.0)
+        self._reorder(participant_id)
+
+    def remove_score(self, participant_id: int, judge_id: int):
+        """删除一条评分"""
+        judge_scores = self._scores.get(participant_id)
+        if not judge_scores or judge_id not in judge_scores:
+            return
+        self._sums[participant_id] -= judge_scores.pop(judge_id)
+        self._reorder(participant_id)
+
+    def remove_participant(self, participant_id: int):
+        """移除参赛者的全部评分"""
+        self._scores.pop(participant_id, None)
+        self._reorder(participant_id)
+
+    def top(self, limit: Optional[int] = None) -> List[RankingItem]:
+        """按名次返回前 limit 名（None 表示全部）"""
+        keys = self._order if limit is None else self._order[:max(limit, 0)]
+        return [(pid, -neg_avg, len(self._scores[pid])) for neg_avg, pid in keys]
+
+    def rank_of(self, participant_id: int) -> Optional[Tuple[int, float, int]]:
+        """
+        查询参赛者名次
+
+        Returns:
+            (名次, 平均分, 评分数量)，没有评分时返回None
+        """
+        key = self._keys.get(participant_id)
+        if key is None:
+            return None
+        return bisect_left(self._order, key) + 1, -key[0], len(self._scores[participant_id])
+
+    def _reorder(self, participant_id: int):
+        old_key = self._keys.pop(participant_id, None)
+        if old_key is not None:
+            del self._order[bisect_left(self._order, old_key)]
+
+        judge_scores = self._scores.get(participant_id)
+        if not judge_scores:
+            self._scores.pop(participant_id, None)
+            self._sums.pop(participant_id, None)
+            return
+
+        key = (-(self._sums[participant_id] / len(judge_scores)), participant_id)
+        self._keys[participant_id] = key
+        insort(self._order, key)
+
+
+class LiveRanking:
+    """
+    各轮次实时排名（进程内，写穿）
+
+    轮次首次被查询时从数据库整轮加载，此后由评分服务在提交、修改、删除评分后
+    调用 set_score / remove_score 增量维护，读取排名不再访问数据库。
+    加载期间发生的写入会先记下，加载完成后重放，避免覆盖掉并发写入。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rounds: Dict[int, RoundRanking] = {}
+        self._loaded_at: Dict[int, float] = {}
+        self._pending: Dict[int, List[tuple]] = {}
+
+    def needs_load(self, round_number: int, max_age: float = 0) -> bool:
+        """
+        轮次是否需要（重新）加载
+
+        Args:
+            round_number: 轮次
+            max_age: 缓存最长有效秒数，0 表示一直有效（多 worker 部署时应设置）
+        """
+        loaded_at = self._loaded_at.get(round_number)
+        if loaded_at is None:
+            return True
+        return max_age > 0 and time.monotonic() - loaded_at > max_age
+
+    def begin_load(self, round_number: int) -> float:
+        """
+        开始加载轮次：此后的写入在加载完成前先记录下来
+
+        Returns:
+            加载开始时间，传给 load
+        """
+        with self._lock:
+            self._pending.setdefault(round_number, [])
+            return time.monotonic()
+
+    def load(self, round_number: int, rows: Iterable[Tuple[int, int, float]],
+             started: Optional[float] = None) -> int:
+        """
+        整轮加载（覆盖已有内容），并重放 begin_load 之后的写入
+
+        Args:
+            round_number: 轮次
+            rows: (参赛者ID, 评委ID, 评分)
+            started: begin_load 的返回值；若期间已有其他线程完成加载则不再覆盖
+
+        Returns:
+            有评分的参赛者数量
+        """
+        ranking = RoundRanking()
+        for participant_id, judge_id, score in rows:
+            ranking.set_score(participant_id, judge_id, score)
+
+        with self._lock:
+            loaded_at = self._loaded_at.get(round_number)
+            if started is not None and loaded_at is not None and loaded_at >= started:
+                return len(self._rounds[round_number])
+
+            for op, args in self._pending.pop(round_number, []):
+                getattr(ranking, op)(*args)
+            self._rounds[round_number] = ranking
+            self._loaded_at[round_number] = time.monotonic()
+            return len(ranking)
+
+    def invalidate(self, round_number: Optional[int] = None):
+        """丢弃某一轮（None 表示全部）的缓存，下次查询时重新加载"""
+        with self._lock:
+            if round_number is None:
+                self._rounds.clear()
+                self._loaded_at.clear()
+            else:
+                self._rounds.pop(round_number, None)
+                self._loaded_at.pop(round_number, None)
+
+    def set_score(self, round_number: int, participant_id: int, judge_id: int, score: float):
+        """评分提交或修改后调用"""
+        self._apply(round_number, "set_score", (participant_id, judge_id, score))
+
+    def remove_score(self, round_number: int, participant_id: int, judge_id: int):
+        """评分删除后调用"""
+        self._apply(round_number, "remove_score", (participant_id, judge_id))
+
+    def remove_participant(self, participant_id: int):
+        """参赛者删除后调用，从所有轮次中移除"""
+        with self._lock:
+            for round_number in set(self._rounds) | set(self._pending):
+                self._apply(round_number, "remove_participant", (participant_id,))
+
+    def top(self, round_number: int, limit: Optional[int] = None) -> List[RankingItem]:
+        """获取某轮前 limit 名"""
+        with self._lock:
+            ranking = self._rounds.get(round_number)
+            return ranking.top(limit) if ranking is not None else []
+
+    def rank_of(self, round_number: int, participant_id: int) -> Optional[Tuple[int, float, int]]:
+        """获取参赛者在某轮的 (名次, 平均分, 评分数量)"""
+        with self._lock:
+            ranking = self._rounds.get(round_number)
+            return ranking.rank_of(participant_id) if ranking is not None else None
+
+    def count(self, round_number: int) -> int:
+        """某轮有评分的参赛者数量"""
+        with self._lock:
+            ranking = self._rounds.get(round_number)
+            return len(ranking) if ranking is not None else 0
+
+    def _apply(self, round_number: int, op: str, args: tuple):
+        with self._lock:
+            pending = self._pending.get(round_number)
+            if pending is not None:
+                pending.append((op, args))
+            ranking = self._rounds.get(round_number)
+            if ranking is not None:
+                getattr(ranking, op)(*args)
+
+
+# 全局实时排名
+score_ranking = LiveRanking()
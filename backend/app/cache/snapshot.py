@@ -0,0 +1,80 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """请求头 If-None-Match 是否与 ETag 匹配（弱比较）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in tags or f"W/{etag}" in tags
+
+
+class Snapshot:
+    """一份物化的统计结果，预先序列化好 JSON 并计算 ETag"""
+
+    __slots__ = ("data", "body", "etag", "version", "built_at")
+
+    def __init__(self, data: Any, version: int):
+        self.data = data
+        self.body = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+        # 按内容计算，重算结果不变时 ETag 也不变，进程重启后依然有效
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+        self.version = version
+        self.built_at = time.monotonic()
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """请求头 If-None-Match 是否与当前 ETag 匹配"""
+        return etag_matches(self.etag, if_none_match)
+
+
+class SnapshotCache:
+    """
+    按数据版本失效的快照缓存
+
+    get 时传入当前数据版本，快照版本落后即视为失效。重算不加锁：
+    写入后第一批并发请求可能各自重算一次，之后的请求全部命中缓存。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots: Dict[str, Snapshot] = {}
+
+    def get(self, key: str, version: int, max_age: float = 0) -> Optional[Snapshot]:
+        """
+        获取仍然有效的快照
+
+        Args:
+            key: 快照名称
+            version: 当前数据版本
+            max_age: 快照最长有效秒数，0 表示只按版本失效
+        """
+        snapshot = self._snapshots.get(key)
+        if snapshot is None or snapshot.version != version:
+            return None
+        if max_age > 0 and time.monotonic() - snapshot.built_at > max_age:
+            return None
+        return snapshot
+
+    def put(self, key: str, version: int, data: Any) -> Snapshot:
+        """保存重算结果（不会用旧版本覆盖新版本）"""
+        snapshot = Snapshot(data, version)
+        with self._lock:
+            current = self._snapshots.get(key)
+            if current is None or current.version <= version:
+                self._snapshots[key] = snapshot
+        return snapshot
+
+    def clear(self):
+        """清空全部快照"""
+        with self._lock:
+            self._snapshots.clear()
+
+
+# 全局统计快照缓存
+statistics_snapshots = SnapshotCache()
@@ -1,24 +1,206 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Any, Callable, Optional
+import anyio
+import functools
+import sqlite3
 import os
+from config import settings, get_db_pool_size, get_db_thread_pool_size
+from .cache.data_version import data_version
 
-# 数据库文件路径
-DATABASE_URL = "sqlite:///./data/database.db"
+# 数据库地址（读取配置，默认 sqlite:///./data/database.db）
+DATABASE_URL = settings.database_url
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def _apply_sqlite_pragmas(dbapi_connection, read_only: bool):
+    """每个新连接建立时设置 SQLite 调优参数"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        # cache_size 取负数表示单位为 KiB
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kb)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+def create_db_engine(url: str = DATABASE_URL, read_only: bool = False) -> Engine:
+    """
+    创建数据库引擎
+
+    Args:
+        url: 数据库地址
+        read_only: 是否为只读引擎（统计等只读接口使用，SQLite 下启用 query_only）
+
+    Returns:
+        数据库引擎
+    """
+    engine_kwargs = {
+        "echo": settings.database_echo,
+        "pool_size": get_db_pool_size(),
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+
+    if not _is_sqlite(url):
+        return create_engine(url, pool_pre_ping=True, **engine_kwargs)
+
+    database = make_url(url).database
+    if not database or database == ":memory:":
+        # 内存数据库只能使用单连接，不做连接池配置
+        return create_engine(url, connect_args={"check_same_thread": False}, echo=settings.database_echo)
+
+    engine = create_engine(
+        url,
+        connect_args={
+            "check_same_thread": False,
+            # pysqlite 自身的锁等待时间（秒），与 busy_timeout 保持一致
+            "timeout": settings.sqlite_busy_timeout_ms / 1000
+        },
+        **engine_kwargs
+    )
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, read_only)
+
+    return engine
+
+def create_async_db_engine(url: str = DATABASE_URL, read_only: bool = False):
+    """
+    创建异步数据库引擎（async 模式，SQLite 使用 aiosqlite 驱动）
+
+    Raises:
+        ImportError: 未安装 aiosqlite / greenlet
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+    import aiosqlite  # noqa: F401  提前检查驱动是否安装
+
+    async_url = make_url(url)
+    if async_url.get_backend_name() == "sqlite":
+        async_url = async_url.set(drivername="sqlite+aiosqlite")
+
+    async_engine = create_async_engine(
+        async_url,
+        echo=settings.database_echo,
+        pool_size=get_db_pool_size(),
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        connect_args={"timeout": settings.sqlite_busy_timeout_ms / 1000} if _is_sqlite(url) else {}
+    )
+
+    if _is_sqlite(url):
+        @event.listens_for(async_engine.sync_engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            _apply_sqlite_pragmas(dbapi_connection, read_only)
+
+    return async_engine
 
 # 创建数据库引擎
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False},
-    echo=False  # 设置为True可以看到SQL语句
-)
+engine = create_db_engine(DATABASE_URL)
+
+# 只读引擎：统计、看板等只读接口使用，与写连接分开排队
+read_engine = create_db_engine(DATABASE_URL, read_only=True)
 
 # 创建SessionLocal类
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# async 模式下的异步会话（未启用时为None）
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+
+if settings.db_execution_mode == "async":
+    try:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        AsyncSessionLocal = async_sessionmaker(
+            create_async_db_engine(DATABASE_URL), autoflush=False, expire_on_commit=True
+        )
+        AsyncReadSessionLocal = async_sessionmaker(
+            create_async_db_engine(DATABASE_URL, read_only=True), autoflush=False, expire_on_commit=True
+        )
+    except ImportError as e:
+        print(f"异步数据库模式不可用（{e}），改用线程池模式")
 
 # 创建Base类
 Base = declarative_base()
 
+# 有写入的事务提交后递增数据版本号，统计快照据此失效（对所有会话生效，包括 async 模式）
+@event.listens_for(Session, "after_flush")
+def _mark_flush_writes(session, flush_context):
+    if session.new or session.dirty or session.deleted:
+        session.info["has_writes"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["has_writes"] = True
+
+@event.listens_for(Session, "after_commit")
+def _bump_data_version(session):
+    # after_commit 在数据库提交完成之后触发，读请求不会拿到新版本号却读到旧数据
+    if session.info.pop("has_writes", False):
+        data_version.bump()
+
+@event.listens_for(Session, "after_rollback")
+def _clear_writes(session):
+    session.info.pop("has_writes", None)
+
+# threadpool 模式下限制同时执行数据库操作的线程数（需在事件循环中创建）
+_db_limiter: Optional[anyio.CapacityLimiter] = None
+
+def _get_db_limiter() -> anyio.CapacityLimiter:
+    global _db_limiter
+    if _db_limiter is None:
+        _db_limiter = anyio.CapacityLimiter(get_db_thread_pool_size())
+    return _db_limiter
+
+def _call_to_dict(db: Session, fn: Callable, *args, **kwargs):
+    result = fn(db, *args, **kwargs)
+    return result.to_dict() if result is not None else None
+
+def _call_to_dicts(db: Session, fn: Callable, *args, **kwargs):
+    return [item.to_dict() for item in fn(db, *args, **kwargs)]
+
+class DBRunner:
+    """
+    数据库执行器
+
+    路由通过它调用同步服务函数 fn(db, *args)，不在事件循环线程里直接访问数据库：
+    - threadpool 模式：在有界线程池中用同步会话执行
+    - async 模式：通过 AsyncSession.run_sync 在 aiosqlite 异步引擎上执行
+    两种模式下服务层 API 完全相同。ORM 对象的懒加载属性必须在 fn 内部访问，
+    返回给路由的应是字典等普通数据（可使用 run_dict / run_dicts）。
+    """
+
+    def __init__(self, session: Session = None, async_session=None):
+        self.session = session
+        self.async_session = async_session
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """执行 fn(db, *args, **kwargs) 并返回结果"""
+        if self.async_session is not None:
+            return await self.async_session.run_sync(fn, *args, **kwargs)
+        return await anyio.to_thread.run_sync(
+            functools.partial(fn, self.session, *args, **kwargs),
+            limiter=_get_db_limiter()
+        )
+
+    async def run_dict(self, fn: Callable, *args, **kwargs) -> Optional[dict]:
+        """执行返回单个ORM对象的服务函数，并在同一执行上下文中转换为字典"""
+        return await self.run(_call_to_dict, fn, *args, **kwargs)
+
+    async def run_dicts(self, fn: Callable, *args, **kwargs) -> list:
+        """执行返回ORM对象列表的服务函数，并在同一执行上下文中转换为字典列表"""
+        return await self.run(_call_to_dicts, fn, *args, **kwargs)
+
 # 依赖项：获取数据库会话
 def get_db():
     db = SessionLocal()
@@ -27,9 +209,82 @@ def get_db():
     finally:
         db.close()
 
+# 依赖项：获取只读数据库会话
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# 依赖项：获取数据库执行器
+async def get_db_runner():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            yield DBRunner(async_session=session)
+    else:
+        db = SessionLocal()
+        try:
+            yield DBRunner(session=db)
+        finally:
+            db.close()
+
+# 依赖项：获取只读数据库执行器
+async def get_read_db_runner():
+    if AsyncReadSessionLocal is not None:
+        async with AsyncReadSessionLocal() as session:
+            yield DBRunner(async_session=session)
+    else:
+        db = ReadSessionLocal()
+        try:
+            yield DBRunner(session=db)
+        finally:
+            db.close()
+
 # 创建所有表
+def _upgrade_score_sync_ops(bind):
+    """score_sync_ops 的主键由 op_id 改为 (judge_id, op_id)：旧表改名后按新结构重建并复制数据"""
+    inspector = inspect(bind)
+    if not inspector.has_table("score_sync_ops"):
+        return
+    if inspector.get_pk_constraint("score_sync_ops")["constrained_columns"] != ["op_id"]:
+        return
+    table = Base.metadata.tables["score_sync_ops"]
+    columns = ", ".join(column.name for column in table.columns)
+    with bind.begin() as conn:
+        conn.execute(text("ALTER TABLE score_sync_ops RENAME TO score_sync_ops_old"))
+        table.create(conn)
+        conn.execute(text(f"INSERT INTO score_sync_ops ({columns}) SELECT {columns} FROM score_sync_ops_old"))
+        conn.execute(text("DROP TABLE score_sync_ops_old"))
+
 def create_tables():
+    # create_all 不会修改已存在的表，主键变化的表先升级
+    _upgrade_score_sync_ops(engine)
     Base.metadata.create_all(bind=engine)
+    # create_all 不会给已存在的表补建后来新增的索引，这里逐个检查补齐
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def backup_database(backup_path: str):
+    """
+    备份数据库
+
+    WAL 模式下最新数据可能还在 -wal 文件中，直接复制主文件会丢数据，
+    这里使用 SQLite 在线备份接口。
+    """
+    if not _is_sqlite(DATABASE_URL):
+        raise ValueError("仅支持备份 SQLite 数据库")
+
+    raw_connection = engine.raw_connection()
+    try:
+        target = sqlite3.connect(backup_path)
+        try:
+            raw_connection.driver_connection.backup(target)
+        finally:
+            target.close()
+    finally:
+        raw_connection.close()
 
 # 初始化数据库
 def init_database():
@@ -38,7 +293,7 @@ def init_database():
     os.makedirs("data", exist_ok=True)
     os.makedirs("data/photos", exist_ok=True)
     os.makedirs("data/exports", exist_ok=True)
-    
+
     # 创建所有表
     create_tables()
-    print("数据库初始化完成！")
\ No newline at end of file
+    print("数据库初始化完成！")
@@ -2,9 +2,16 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
+import asyncio
 import os
-from .database import init_database
+from .database import init_database, SessionLocal
 from .api import api_router
+from .services.participant_service import ParticipantService
+from .services.score_service import ScoreService
+from .services.checkin_writer import checkin_writer
+from .services.event_hub import event_hub
+from .services.qr_batch import qr_renderer
+from .services.password_hasher import password_hasher
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -36,9 +43,34 @@ async def startup_event():
     """应用启动时初始化数据库"""
     init_database()
     print("数据库初始化完成")
+    
+    # 预加载签到身份索引
+    db = SessionLocal()
+    try:
+        indexed_count = ParticipantService.load_identity_index(db)
+        # 按评分表校准评分汇总（升级前已有的评分在这里补齐）
+        aggregate_count = ScoreService.rebuild_aggregates(db)
+    finally:
+        db.close()
+    print(f"签到身份索引已加载: {indexed_count} 人")
+    print(f"评分汇总已校准: {aggregate_count} 条")
+    
+    # 启动签到组提交写入器
+    checkin_writer.start()
+    
+    # 实时推送事件在事件循环中分发
+    event_hub.bind_loop(asyncio.get_running_loop())
     print("应用启动成功！")
     print("API文档地址: http://localhost:8000/docs")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时把未落库的签到全部写入"""
+    checkin_writer.stop()
+    print("签到写入队列已清空")
+    qr_renderer.shutdown()
+    password_hasher.shutdown()
+
 @app.get("/")
 async def root():
     """根路径"""
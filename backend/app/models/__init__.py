@@ -2,6 +2,8 @@ from .participant import Participant
 from .group import Group
 from .judge import Judge
 from .score import Score
+from .score_aggregate import ScoreAggregate
 from .checkin_log import CheckinLog
+from .score_sync import ScoreChange, ScoreSyncOp
 
-__all__ = ["Participant", "Group", "Judge", "Score", "CheckinLog"]
\ No newline at end of file
+__all__ = ["Participant", "Group", "Judge", "Score", "ScoreAggregate", "CheckinLog", "ScoreChange", "ScoreSyncOp"]
\ No newline at end of file
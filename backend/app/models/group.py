@@ -42,15 +42,19 @@ class Group(Base):
         return list(set([p.organization for p in self.participants]))
     
     def to_dict(self):
-        """转换为字典"""
+        """转换为字典（成员只遍历一次）"""
+        members = self.participants
+        member_count = len(members)
+        checkin_count = sum(1 for p in members if p.is_checked_in)
+        checkin_rate = checkin_count / member_count * 100 if member_count else 0.0
         return {
             "id": self.id,
             "name": self.name,
             "description": self.description,
             "draw_order": self.draw_order,
-            "member_count": self.member_count,
-            "checkin_count": self.checkin_count,
-            "checkin_rate": round(self.checkin_rate, 2),
-            "organizations": self.organizations,
+            "member_count": member_count,
+            "checkin_count": checkin_count,
+            "checkin_rate": round(checkin_rate, 2),
+            "organizations": list(set(p.organization for p in members)),
             "created_at": self.created_at.isoformat() if self.created_at else None
         }
\ No newline at end of file
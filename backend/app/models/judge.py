@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import query_expression, relationship
 from sqlalchemy.sql import func
 from ..database import Base
 
@@ -18,12 +18,17 @@ class Judge(Base):
     # 关系
     scores = relationship("Score", back_populates="judge")
     
+    # 列表查询用 with_expression 预先统计的评分数量，未预加载时为None
+    preloaded_score_count = query_expression()
+    
     def __repr__(self):
         return f"<Judge(id={self.id}, name='{self.name}', username='{self.username}')>"
     
     @property
     def score_count(self):
-        """评分数量"""
+        """评分数量（已预先统计时不再加载全部评分）"""
+        if self.preloaded_score_count is not None:
+            return self.preloaded_score_count
         return len(self.scores)
     
     def to_dict(self):
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -22,17 +22,27 @@ class Participant(Base):
     # 关系
     group = relationship("Group", back_populates="participants")
     scores = relationship("Score", back_populates="participant")
+    score_aggregates = relationship(
+        "ScoreAggregate", back_populates="participant",
+        cascade="all, delete-orphan", order_by="ScoreAggregate.round_number"
+    )
     checkin_logs = relationship("CheckinLog", back_populates="participant")
     
+    # 按签到状态计数、按出场顺序筛选已签到参赛者
+    __table_args__ = (
+        Index('ix_participants_checked_in', 'is_checked_in', 'id'),
+    )
+    
     def __repr__(self):
         return f"<Participant(id={self.id}, name='{self.name}', organization='{self.organization}')>"
     
     @property
     def average_score(self):
-        """计算平均分"""
-        if not self.scores:
+        """全部轮次的平均分（由每轮评分汇总计算，不加载评分记录）"""
+        score_count = sum(aggregate.score_count for aggregate in self.score_aggregates)
+        if not score_count:
             return 0.0
-        return sum(score.score for score in self.scores) / len(self.scores)
+        return sum(aggregate.score_sum for aggregate in self.score_aggregates) / score_count
     
     def to_dict(self):
         """转换为字典"""
@@ -49,5 +59,6 @@ class Participant(Base):
             "is_checked_in": self.is_checked_in,
             "checkin_time": self.checkin_time.isoformat() if self.checkin_time else None,
             "average_score": self.average_score,
+            "round_scores": [aggregate.to_dict() for aggregate in self.score_aggregates],
             "created_at": self.created_at.isoformat() if self.created_at else None
         }
\ No newline at end of file
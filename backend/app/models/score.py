@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -21,6 +21,8 @@ class Score(Base):
     # 唯一约束：每个评委对每个参赛者在每轮只能评分一次
     __table_args__ = (
         UniqueConstraint('participant_id', 'judge_id', 'round_number', name='unique_score_per_round'),
+        # 按评委、轮次统计评分数量（评委待评分列表、评分进度）
+        Index('ix_scores_judge_round', 'judge_id', 'round_number', 'participant_id'),
     )
     
     def __repr__(self):
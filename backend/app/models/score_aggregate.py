@@ -0,0 +1,59 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from ..database import Base
+
+class ScoreAggregate(Base):
+    """
+    参赛者每轮评分汇总
+
+    评分写入（新增、修改、删除）时在同一事务中按评分表重算对应 (参赛者, 轮次) 的一行，
+    参赛者列表、搜索、导出等读取平均分时只读这张表，不再访问 scores。
+    """
+    __tablename__ = "score_aggregates"
+
+    participant_id = Column(Integer, ForeignKey("participants.id"), primary_key=True, comment="参赛者ID")
+    round_number = Column(Integer, primary_key=True, comment="轮次")
+    score_sum = Column(Float, nullable=False, default=0.0, comment="评分总和")
+    score_count = Column(Integer, nullable=False, default=0, comment="评分数量")
+    min_score = Column(Float, comment="最低分")
+    max_score = Column(Float, comment="最高分")
+    trimmed_mean = Column(Float, comment="去掉一个最高分和一个最低分后的平均分（不足3个评分时为平均分）")
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    # 关系
+    participant = relationship("Participant", back_populates="score_aggregates")
+
+    def __repr__(self):
+        return f"<ScoreAggregate(participant_id={self.participant_id}, round_number={self.round_number}, score_count={self.score_count})>"
+
+    @staticmethod
+    def summarize(score_sum: float, score_count: int, min_score: float, max_score: float) -> dict:
+        """由评分总和、数量、最低分、最高分得到汇总字段"""
+        if score_count >= 3:
+            trimmed_mean = (score_sum - min_score - max_score) / (score_count - 2)
+        else:
+            trimmed_mean = score_sum / score_count
+        return {
+            "score_sum": score_sum,
+            "score_count": score_count,
+            "min_score": min_score,
+            "max_score": max_score,
+            "trimmed_mean": trimmed_mean
+        }
+
+    @property
+    def average_score(self):
+        """本轮平均分"""
+        return self.score_sum / self.score_count if self.score_count else 0.0
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            "round_number": self.round_number,
+            "score_count": self.score_count,
+            "average_score": round(self.average_score, 2),
+            "min_score": self.min_score,
+            "max_score": self.max_score,
+            "trimmed_mean": round(self.trimmed_mean, 2) if self.trimmed_mean is not None else None
+        }
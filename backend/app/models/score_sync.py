@@ -0,0 +1,76 @@
+from sqlalchemy import Column, Integer, BigInteger, Float, String, DateTime, Index
+from sqlalchemy.sql import func
+from ..database import Base
+
+class ScoreChange(Base):
+    """
+    评分变更日志
+
+    每次评分写入（新增、修改、删除）追加一条，seq 单调递增，作为离线同步的游标；
+    (client_ts, op_id) 是该评分当前值的版本，用于"后写入者胜出"的冲突判定。
+    """
+    __tablename__ = "score_changes"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True, comment="变更序号（同步游标）")
+    participant_id = Column(Integer, nullable=False, comment="参赛者ID")
+    judge_id = Column(Integer, nullable=False, comment="评委ID")
+    round_number = Column(Integer, nullable=False, comment="轮次")
+    score = Column(Float, comment="评分，删除时为空")
+    client_ts = Column(BigInteger, nullable=False, comment="评分时间（客户端毫秒时间戳，服务端写入时为服务器时间）")
+    op_id = Column(String(64), comment="客户端操作ID，服务端直接写入时为空")
+    created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
+
+    __table_args__ = (
+        # 评委拉取自己的变更
+        Index('ix_score_changes_judge_seq', 'judge_id', 'seq'),
+        # 查询某条评分的当前版本
+        Index('ix_score_changes_key_seq', 'participant_id', 'judge_id', 'round_number', 'seq'),
+    )
+
+    def __repr__(self):
+        return f"<ScoreChange(seq={self.seq}, participant_id={self.participant_id}, judge_id={self.judge_id}, score={self.score})>"
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            "seq": self.seq,
+            "participant_id": self.participant_id,
+            "judge_id": self.judge_id,
+            "round_number": self.round_number,
+            "score": self.score,
+            "deleted": self.score is None,
+            "client_ts": self.client_ts,
+            "op_id": self.op_id
+        }
+
+class ScoreSyncOp(Base):
+    """
+    已处理的离线评分操作（按 (评委, op_id) 去重）
+
+    客户端重试时同一 op_id 直接返回第一次处理的结果，不会重复写入。
+    op_id 由各评委的客户端生成，只在同一评委内唯一，不同评委的相同 op_id 互不影响。
+    """
+    __tablename__ = "score_sync_ops"
+
+    judge_id = Column(Integer, primary_key=True, comment="评委ID")
+    op_id = Column(String(64), primary_key=True, comment="客户端操作ID")
+    participant_id = Column(Integer, nullable=False, comment="参赛者ID")
+    round_number = Column(Integer, nullable=False, comment="轮次")
+    score = Column(Float, nullable=False, comment="评分")
+    client_ts = Column(BigInteger, nullable=False, comment="评分时间（客户端毫秒时间戳）")
+    status = Column(String(20), nullable=False, comment="处理结果：applied / stale / rejected")
+    error_code = Column(String(50), comment="rejected 时的错误码")
+    seq = Column(Integer, comment="applied 时产生的变更序号")
+    created_at = Column(DateTime, server_default=func.now(), comment="处理时间")
+
+    def __repr__(self):
+        return f"<ScoreSyncOp(judge_id={self.judge_id}, op_id={self.op_id}, status={self.status})>"
+
+    def to_dict(self):
+        """转换为字典（同步接口中每条操作的处理结果）"""
+        return {
+            "op_id": self.op_id,
+            "status": self.status,
+            "error_code": self.error_code,
+            "seq": self.seq
+        }
@@ -4,6 +4,7 @@ from .judge_service import JudgeService
 from .score_service import ScoreService
 from .checkin_service import CheckinService
 from .statistics_service import StatisticsService
+from .worklist_service import WorklistService
 
 __all__ = [
     "ParticipantService",
@@ -11,5 +12,6 @@ __all__ = [
     "JudgeService",
     "ScoreService",
     "CheckinService",
-    "StatisticsService"
+    "StatisticsService",
+    "WorklistService"
 ]
\ No newline at end of file
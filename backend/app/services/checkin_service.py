@@ -1,9 +1,13 @@
 from sqlalchemy.orm import Session
 from datetime import datetime
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from typing import Optional, Dict, Any
 from ..models.participant import Participant
 from ..models.checkin_log import CheckinLog
+from ..cache.identity_index import IdentityEntry, checkin_index
 from .participant_service import ParticipantService
+from .checkin_writer import CheckinWrite, CheckinQueueFull, checkin_writer
+from .event_hub import event_hub
 
 class CheckinService:
     """签到服务类"""
@@ -26,45 +30,70 @@ class CheckinService:
         Returns:
             签到结果
         """
-        # 验证参赛者身份
-        participant = ParticipantService.verify_participant_identity(
-            db, qr_code_id, phone_last4, name
-        )
-        
-        if not participant:
+        # 验证参赛者身份：优先查内存索引，未命中再回退数据库并回填索引
+        entry = checkin_index.verify(qr_code_id, phone_last4, name)
+        
+        if entry is None:
+            participant = ParticipantService.verify_participant_identity(
+                db, qr_code_id, phone_last4, name
+            )
+            if participant:
+                entry = IdentityEntry.from_participant(participant)
+                checkin_index.upsert(entry)
+        
+        if entry is None:
             return {
                 "success": False,
                 "message": "身份验证失败，请检查输入信息是否正确",
                 "error_code": "IDENTITY_VERIFICATION_FAILED"
             }
         
-        # 检查是否已经签到
-        if participant.is_checked_in:
-            return {
-                "success": False,
-                "message": f"您已于 {participant.checkin_time.strftime('%H:%M:%S')} 完成签到",
-                "error_code": "ALREADY_CHECKED_IN",
-                "participant": participant.to_dict()
-            }
-        
         # 执行签到
         checkin_time = datetime.now()
         
-        # 更新参赛者签到状态
-        participant.is_checked_in = True
-        participant.checkin_time = checkin_time
+        # 在索引中占位，同一参赛者的并发扫码只有一个能继续
+        if not checkin_index.mark_checked_in(entry.id, checkin_time):
+            return CheckinService._already_checked_in_result(entry)
         
-        # 创建签到日志
-        checkin_log = CheckinLog(
-            participant_id=participant.id,
-            checkin_time=checkin_time,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
-        
-        db.add(checkin_log)
-        db.commit()
-        db.refresh(participant)
+        # 交给组提交写入器落库，确认后才返回
+        write = CheckinWrite(entry.id, checkin_time, ip_address, user_agent)
+        try:
+            applied = checkin_writer.write(db, write)
+        except CheckinQueueFull:
+            checkin_index.mark_not_checked_in(entry.id)
+            return {
+                "success": False,
+                "message": "当前签到人数较多，请稍后重试",
+                "error_code": "CHECKIN_BUSY"
+            }
+        except FutureTimeoutError:
+            # 签到已在队列中，稍后仍会落库，索引保持已签到状态
+            return {
+                "success": False,
+                "message": "签到处理中，请稍后刷新确认",
+                "error_code": "CHECKIN_PENDING"
+            }
+        except Exception:
+            db.rollback()
+            checkin_index.mark_not_checked_in(entry.id)
+            raise
+        
+        if not applied:
+            # 条件更新未生效：已在其他进程中签到
+            participant = ParticipantService.get_participant_by_id(db, entry.id)
+            if participant is None:
+                checkin_index.remove(entry.id)
+                return {
+                    "success": False,
+                    "message": "身份验证失败，请检查输入信息是否正确",
+                    "error_code": "IDENTITY_VERIFICATION_FAILED"
+                }
+            entry = IdentityEntry.from_participant(participant)
+            checkin_index.upsert(entry)
+            return CheckinService._already_checked_in_result(entry)
+        
+        participant = ParticipantService.get_participant_by_id(db, entry.id)
+        CheckinService._publish_checkin_event("checkin", participant)
         
         return {
             "success": True,
@@ -73,6 +102,35 @@ class CheckinService:
             "checkin_time": checkin_time.isoformat()
         }
     
+    @staticmethod
+    def _publish_checkin_event(event_type: str, participant: Participant, manual: bool = False):
+        """向实时推送通道发布签到变化（只带大屏需要的字段）"""
+        event_hub.publish(event_type, {
+            "participant_id": participant.id,
+            "name": participant.name,
+            "organization": participant.organization,
+            "group_id": participant.group_id,
+            "is_checked_in": participant.is_checked_in,
+            "checkin_time": participant.checkin_time.isoformat() if participant.checkin_time else None,
+            "manual": manual
+        })
+    
+    @staticmethod
+    def _already_checked_in_result(entry: IdentityEntry) -> Dict[str, Any]:
+        """已签到时的返回结果（直接由索引条目生成，不访问数据库）"""
+        checkin_time = entry.checkin_time
+        if isinstance(checkin_time, datetime):
+            message = f"您已于 {checkin_time.strftime('%H:%M:%S')} 完成签到"
+        else:
+            message = "您已经完成签到"
+        
+        return {
+            "success": False,
+            "message": message,
+            "error_code": "ALREADY_CHECKED_IN",
+            "participant": entry.to_dict()
+        }
+    
     @staticmethod
     def get_checkin_info(db: Session, qr_code_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -85,16 +143,20 @@ class CheckinService:
         Returns:
             参赛者基本信息（用于验证页面显示）
         """
-        participant = ParticipantService.get_participant_by_qr_code(db, qr_code_id)
+        entry = checkin_index.get(qr_code_id)
         
-        if not participant:
-            return None
+        if entry is None:
+            participant = ParticipantService.get_participant_by_qr_code(db, qr_code_id)
+            if not participant:
+                return None
+            entry = IdentityEntry.from_participant(participant)
+            checkin_index.upsert(entry)
         
         return {
             "qr_code_id": qr_code_id,
             "participant_exists": True,
-            "is_checked_in": participant.is_checked_in,
-            "checkin_time": participant.checkin_time.isoformat() if participant.checkin_time else None
+            "is_checked_in": entry.is_checked_in,
+            "checkin_time": entry.checkin_time.isoformat() if entry.checkin_time else None
         }
     
     @staticmethod
@@ -150,21 +212,29 @@ class CheckinService:
         
         # 执行签到
         checkin_time = datetime.now()
-        participant.is_checked_in = True
-        participant.checkin_time = checkin_time
-        
-        # 创建签到日志
         user_agent = f"MANUAL_CHECKIN: {admin_note}" if admin_note else "MANUAL_CHECKIN"
-        checkin_log = CheckinLog(
-            participant_id=participant.id,
-            checkin_time=checkin_time,
-            ip_address="ADMIN",
-            user_agent=user_agent
-        )
+        write = CheckinWrite(participant.id, checkin_time, "ADMIN", user_agent)
         
-        db.add(checkin_log)
-        db.commit()
-        db.refresh(participant)
+        try:
+            applied = checkin_writer.write(db, write)
+        except CheckinQueueFull:
+            return {
+                "success": False,
+                "message": "当前签到人数较多，请稍后重试",
+                "error_code": "CHECKIN_BUSY"
+            }
+        
+        db.expire(participant)
+        checkin_index.upsert(IdentityEntry.from_participant(participant))
+        
+        if not applied:
+            return {
+                "success": False,
+                "message": "该参赛者已经签到",
+                "error_code": "ALREADY_CHECKED_IN"
+            }
+        
+        CheckinService._publish_checkin_event("checkin", participant, manual=True)
         
         return {
             "success": True,
@@ -215,9 +285,12 @@ class CheckinService:
             user_agent=user_agent
         )
         
+        entry = IdentityEntry.from_participant(participant)
         db.add(checkin_log)
         db.commit()
         db.refresh(participant)
+        checkin_index.upsert(entry)
+        CheckinService._publish_checkin_event("checkin_cancelled", participant, manual=True)
         
         return {
             "success": True,
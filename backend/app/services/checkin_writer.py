@@ -0,0 +1,208 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import insert, or_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from ..database import SessionLocal
+from ..models.participant import Participant
+from ..models.checkin_log import CheckinLog
+
+
+class CheckinQueueFull(Exception):
+    """签到写入队列已满（背压）"""
+
+
+class CheckinWrite:
+    """一次待落库的签到"""
+
+    __slots__ = ("participant_id", "checkin_time", "ip_address", "user_agent", "future")
+
+    def __init__(self, participant_id: int, checkin_time: datetime,
+                 ip_address: str = None, user_agent: str = None):
+        self.participant_id = participant_id
+        self.checkin_time = checkin_time
+        self.ip_address = ip_address
+        self.user_agent = user_agent
+        self.future: Future = Future()
+
+
+def apply_checkin_writes(db: Session, writes: List[CheckinWrite]) -> List[bool]:
+    """
+    在一个事务内写入一批签到
+
+    每条签到都是条件更新（仅当参赛者尚未签到），成功的才写签到日志。
+
+    Args:
+        db: 数据库会话
+        writes: 待写入的签到
+
+    Returns:
+        与 writes 一一对应的结果，True 表示本次签到生效
+    """
+    results = []
+    logs = []
+
+    for write in writes:
+        updated = db.execute(
+            update(Participant)
+            .where(
+                Participant.id == write.participant_id,
+                or_(Participant.is_checked_in == False, Participant.is_checked_in.is_(None))
+            )
+            .values(is_checked_in=True, checkin_time=write.checkin_time)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        results.append(bool(updated))
+        if updated:
+            logs.append({
+                "participant_id": write.participant_id,
+                "checkin_time": write.checkin_time,
+                "ip_address": write.ip_address,
+                "user_agent": write.user_agent
+            })
+
+    if logs:
+        db.execute(insert(CheckinLog), logs)
+
+    db.commit()
+    return results
+
+
+class CheckinWriteBatcher:
+    """
+    签到组提交写入器
+
+    请求线程把签到放入有界队列后等待确认；后台线程每隔几毫秒把队列中的
+    签到合并到一个事务里提交，SQLite 上一批签到只需一次 fsync。
+    队列满时 submit 在 submit_timeout 内等不到空位会抛出 CheckinQueueFull。
+    """
+
+    def __init__(self, session_factory=SessionLocal, max_batch_size: int = 200,
+                 max_delay_ms: float = 5, max_queue_size: int = 2000,
+                 submit_timeout: float = 1.0, ack_timeout: float = 10.0):
+        self.session_factory = session_factory
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.submit_timeout = submit_timeout
+        self.ack_timeout = ack_timeout
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        """后台写入线程是否在运行"""
+        return self._thread is not None and self._thread.is_alive() and not self._stopping.is_set()
+
+    def start(self):
+        """启动后台写入线程"""
+        if self.running:
+            return
+        self._queue = queue.Queue(maxsize=self.max_queue_size)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="checkin-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """停止写入线程，退出前把队列中剩余的签到全部落库"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, write: CheckinWrite) -> Future:
+        """
+        提交一条签到
+
+        Raises:
+            CheckinQueueFull: 队列已满
+        """
+        try:
+            self._queue.put(write, timeout=self.submit_timeout)
+        except queue.Full:
+            raise CheckinQueueFull("签到写入队列已满")
+        return write.future
+
+    def write(self, db: Session, write: CheckinWrite) -> bool:
+        """
+        写入一条签到并等待落库确认
+
+        写入线程未启动时（脚本、初始化等场景）直接在调用方会话中同步写入。
+
+        Returns:
+            True 表示签到生效，False 表示参赛者已经签到
+        """
+        if not self.running:
+            return apply_checkin_writes(db, [write])[0]
+
+        future = self.submit(write)
+        if in_greenlet():
+            # async 模式下运行在事件循环线程中，不能阻塞等待，交还给事件循环
+            try:
+                return await_only(asyncio.wait_for(asyncio.wrap_future(future), self.ack_timeout))
+            except asyncio.TimeoutError:
+                raise FutureTimeoutError()
+        return future.result(timeout=self.ack_timeout)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                                 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._flush(batch)
+
+    def _flush(self, batch: List[CheckinWrite]):
+        db = self.session_factory()
+        try:
+            try:
+                results = apply_checkin_writes(db, batch)
+            except Exception:
+                db.rollback()
+                if len(batch) == 1:
+                    raise
+                # 整批失败时逐条重试，避免一条坏数据拖垮整批
+                for write in batch:
+                    self._flush_one(db, write)
+                return
+
+            for write, applied in zip(batch, results):
+                write.future.set_result(applied)
+        except Exception as e:
+            for write in batch:
+                if not write.future.done():
+                    write.future.set_exception(e)
+        finally:
+            db.close()
+
+    def _flush_one(self, db: Session, write: CheckinWrite):
+        try:
+            write.future.set_result(apply_checkin_writes(db, [write])[0])
+        except Exception as e:
+            db.rollback()
+            write.future.set_exception(e)
+
+
+# 全局签到写入器，随应用启动/关闭
+checkin_writer = CheckinWriteBatcher()
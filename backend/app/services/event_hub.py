@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+
+class EventSubscription:
+    """一个实时推送连接的订阅"""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.last_seq = 0
+        self.overflowed = False
+
+    async def next_event(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        等待下一条未发送过的事件
+
+        Returns:
+            事件；超时或订阅因积压被断开（队列已取空）时返回None
+        """
+        while True:
+            if self.overflowed and self.queue.empty():
+                return None
+            try:
+                event = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+            # 订阅时的回放和实时推送可能有重叠，按序号去重
+            if event["seq"] > self.last_seq:
+                self.last_seq = event["seq"]
+                return event
+
+
+class EventHub:
+    """
+    实时事件中心（进程内）
+
+    服务层在数据提交后调用 publish 发布小粒度的变更事件（新签到、评分变化、名次变化），
+    WebSocket / SSE 连接通过 subscribe 订阅。事件带递增序号并保存在环形缓冲区中，
+    断线重连时带上最后收到的序号即可补发；序号太旧（已被挤出缓冲区）时返回 resync，
+    客户端应重新拉取一次完整数据。
+
+    publish 可以在任意线程调用，事件统一交给事件循环线程分发；
+    消费过慢的连接队列满后会被断开，由客户端按序号重连补发。
+    多 worker 部署时每个进程各有一份，只能推送本进程处理的写入。
+    """
+
+    def __init__(self, buffer_size: int = 1000, queue_size: int = 500):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._seq = 0
+        self._subscribers: Set[EventSubscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def last_seq(self) -> int:
+        """最新事件序号"""
+        return self._seq
+
+    @property
+    def subscriber_count(self) -> int:
+        """当前订阅连接数"""
+        return len(self._subscribers)
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """绑定分发事件的事件循环（应用启动时调用）"""
+        self._loop = loop
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> int:
+        """
+        发布事件（线程安全）
+
+        Args:
+            event_type: 事件类型
+            data: 事件数据（需可JSON序列化）
+
+        Returns:
+            事件序号
+        """
+        with self._lock:
+            self._seq += 1
+            event = {"seq": self._seq, "type": event_type, "ts": time.time(), "data": data}
+            self._buffer.append(event)
+            loop = self._loop
+            if loop is not None and self._subscribers and not loop.is_closed():
+                # 在锁内投递，保证分发顺序与序号一致
+                loop.call_soon_threadsafe(self._fanout, event)
+            return event["seq"]
+
+    def subscribe(self, since: Optional[int] = None) -> Tuple[EventSubscription, List[Dict[str, Any]], bool]:
+        """
+        订阅事件（在事件循环线程中调用）
+
+        Args:
+            since: 客户端最后收到的事件序号，None 表示只接收新事件
+
+        Returns:
+            (订阅, 需要补发的事件, 是否需要客户端重新全量同步)
+        """
+        subscription = EventSubscription(self.queue_size)
+        with self._lock:
+            subscription.last_seq = self._seq if since is None else min(since, self._seq)
+            backlog = [event for event in self._buffer if event["seq"] > subscription.last_seq]
+            oldest_seq = self._buffer[0]["seq"] if self._buffer else self._seq + 1
+            # 序号已被挤出缓冲区，或大于当前序号（服务已重启）时都无法补发
+            resync = since is not None and (since > self._seq or since + 1 < oldest_seq)
+            self._subscribers.add(subscription)
+        return subscription, backlog, resync
+
+    def unsubscribe(self, subscription: EventSubscription):
+        """取消订阅"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _fanout(self, event: Dict[str, Any]):
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self.unsubscribe(subscription)
+
+
+# 全局事件中心
+event_hub = EventHub()
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from ..models.group import Group
 from ..models.participant import Participant
+from .loader_options import group_options, participant_options
 import random
 
 class GroupService:
@@ -34,12 +35,12 @@ class GroupService:
     @staticmethod
     def get_group_by_id(db: Session, group_id: int) -> Optional[Group]:
         """根据ID获取分组"""
-        return db.query(Group).filter(Group.id == group_id).first()
+        return db.query(Group).options(*group_options()).filter(Group.id == group_id).first()
     
     @staticmethod
     def get_all_groups(db: Session) -> List[Group]:
         """获取所有分组"""
-        return db.query(Group).all()
+        return db.query(Group).options(*group_options()).all()
     
     @staticmethod
     def update_group(db: Session, group_id: int, 
@@ -101,12 +102,16 @@ class GroupService:
     @staticmethod
     def get_group_members(db: Session, group_id: int) -> List[Participant]:
         """获取组内成员"""
-        return db.query(Participant).filter(Participant.group_id == group_id).all()
+        return db.query(Participant).options(*participant_options()).filter(
+            Participant.group_id == group_id
+        ).all()
     
     @staticmethod
     def get_ungrouped_participants(db: Session) -> List[Participant]:
         """获取未分组的参赛者"""
-        return db.query(Participant).filter(Participant.group_id.is_(None)).all()
+        return db.query(Participant).options(*participant_options()).filter(
+            Participant.group_id.is_(None)
+        ).all()
     
     @staticmethod
     def auto_group_by_organization(db: Session, max_group_size: int = 20) -> List[Group]:
@@ -318,7 +323,7 @@ class GroupService:
         db.commit()
         
         # 返回抽签结果
-        updated_groups = db.query(Group).order_by(Group.draw_order).all()
+        updated_groups = db.query(Group).options(*group_options()).order_by(Group.draw_order).all()
         
         return {
             "success": True,
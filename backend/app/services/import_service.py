@@ -0,0 +1,216 @@
+from typing import Any, Dict, Iterator, List, Tuple
+import openpyxl
+from sqlalchemy.orm import Session
+from config import settings
+from ..database import SessionLocal
+from ..models.group import Group
+from ..utils.file_handler import delete_file
+from .judge_service import JudgeService
+from .participant_service import ParticipantService
+from .password_hasher import password_hasher
+
+
+class ImportService:
+    """Excel 导入服务类"""
+
+    # 每批校验、写入的行数
+    CHUNK_SIZE = 1000
+
+    @staticmethod
+    def iter_excel_rows(file_path: str, width: int, min_row: int = 2) -> Iterator[Tuple[int, tuple]]:
+        """
+        以只读模式逐行读取Excel（不把整个工作簿载入内存），跳过空行
+
+        Args:
+            file_path: Excel文件路径
+            width: 读取的列数，不足的补None
+            min_row: 起始行（默认跳过标题行）
+
+        Yields:
+            (行号, 单元格值)
+        """
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            for row_num, row in enumerate(sheet.iter_rows(min_row=min_row, values_only=True), start=min_row):
+                if not any(row):  # 跳过空行
+                    continue
+                yield row_num, (tuple(row) + (None,) * width)[:width]
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def count_excel_rows(file_path: str, min_row: int = 2) -> int:
+        """读取工作表记录的行数（用于进度显示，不遍历数据）"""
+        workbook = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            max_row = workbook.active.max_row
+        finally:
+            workbook.close()
+        return max(max_row - min_row + 1, 0) if max_row else 0
+
+    @staticmethod
+    def parse_participant_row(row: tuple, group_ids: Dict[str, int]) -> Dict[str, Any]:
+        """
+        校验并转换一行参赛者数据（姓名、单位、手机号、组名、照片文件名）
+
+        Raises:
+            ValueError: 数据不完整
+        """
+        name, organization, phone, group_name, photo_filename = row
+
+        if not all([name, organization, phone]):
+            raise ValueError("姓名、单位、手机号不能为空")
+
+        return {
+            "name": str(name).strip(),
+            "organization": str(organization).strip(),
+            "phone": _cell_text(phone),
+            # 组名对应已有分组，找不到的留空
+            "group_id": group_ids.get(str(group_name).strip()) if group_name else None,
+            "photo_path": f"data/photos/{photo_filename}" if photo_filename else None
+        }
+
+    @staticmethod
+    def parse_judge_row(row: tuple) -> Dict[str, Any]:
+        """
+        校验并转换一行评委数据（姓名、用户名、密码、单位）
+
+        Raises:
+            ValueError: 数据不完整
+        """
+        name, username, password, organization = row
+
+        if not all([name, username, password]):
+            raise ValueError("姓名、用户名、密码不能为空")
+
+        return {
+            "name": str(name).strip(),
+            "username": _cell_text(username),
+            "password": _cell_text(password),
+            "organization": str(organization).strip() if organization else None
+        }
+
+    @staticmethod
+    def read_judge_rows(file_path: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        读取评委导入文件
+
+        Returns:
+            (评委数据, 错误列表)
+        """
+        judges_data = []
+        errors = []
+        for row_num, row in ImportService.iter_excel_rows(file_path, 4):
+            try:
+                judges_data.append(ImportService.parse_judge_row(row))
+            except Exception as e:
+                errors.append({"row": row_num, "error": _row_error(e)})
+        return judges_data, errors
+
+    @staticmethod
+    def import_participants(job, file_path: str, session_factory=SessionLocal) -> Dict[str, Any]:
+        """
+        后台任务：导入参赛者
+
+        逐行读取、按 CHUNK_SIZE 分批校验，每批一条多行 INSERT 写入并汇报进度。
+        每批单独提交，中途出错时已写入的批次保留。
+
+        Args:
+            job: 后台任务
+            file_path: 已保存的Excel文件，任务结束后删除
+
+        Returns:
+            {"success_count", "error_count", "errors"}
+        """
+        db: Session = session_factory()
+        try:
+            job.set_total(ImportService.count_excel_rows(file_path))
+            group_ids = {name: group_id for group_id, name in db.query(Group.id, Group.name)}
+
+            success_count = 0
+            errors = []
+            chunk: List[Dict[str, Any]] = []
+            chunk_rows = 0
+            chunk_errors = 0
+
+            def flush():
+                nonlocal success_count, chunk, chunk_rows, chunk_errors
+                success_count += ParticipantService.bulk_insert_participants(db, chunk)
+                job.advance(chunk_rows, chunk_errors, f"已导入 {success_count} 人")
+                chunk, chunk_rows, chunk_errors = [], 0, 0
+
+            for row_num, row in ImportService.iter_excel_rows(file_path, 5):
+                chunk_rows += 1
+                try:
+                    chunk.append(ImportService.parse_participant_row(row, group_ids))
+                except Exception as e:
+                    chunk_errors += 1
+                    errors.append({"row": row_num, "error": _row_error(e)})
+                if chunk_rows >= ImportService.CHUNK_SIZE:
+                    flush()
+            flush()
+
+            return {
+                "success_count": success_count,
+                "error_count": len(errors),
+                "errors": errors
+            }
+        finally:
+            db.close()
+            delete_file(file_path)
+
+    @staticmethod
+    def import_judges(job, file_path: str, session_factory=SessionLocal) -> Dict[str, Any]:
+        """
+        后台任务：导入评委
+
+        读取全部行后先去掉已存在的用户名，再在进程池中并行哈希密码
+        （成本因子取 judge_import_bcrypt_rounds），最后一条多行 INSERT 写入。
+
+        Args:
+            job: 后台任务
+            file_path: 已保存的Excel文件，任务结束后删除
+
+        Returns:
+            {"success_count", "skipped_count", "error_count", "errors"}
+        """
+        db: Session = session_factory()
+        try:
+            judges_data, errors = ImportService.read_judge_rows(file_path)
+            new_judges = JudgeService.filter_new_judges(db, judges_data)
+            skipped_count = len(judges_data) - len(new_judges)
+            job.set_total(len(new_judges))
+            job.advance(0, 0, f"正在加密 {len(new_judges)} 个密码")
+
+            hashed = password_hasher.hash_many(
+                [data["password"] for data in new_judges],
+                rounds=settings.judge_import_bcrypt_rounds or None,
+                progress=lambda done: job.advance(done)
+            )
+            # 哈希期间其他请求可能已占用部分用户名，写入前再过滤一次
+            new_judges = [{**data, "password": password} for data, password in zip(new_judges, hashed)]
+            fresh_judges = JudgeService.filter_new_judges(db, new_judges)
+            skipped_count += len(new_judges) - len(fresh_judges)
+            judge_ids = JudgeService.bulk_insert_judges(db, fresh_judges)
+            job.advance(0, 0, f"已导入 {len(judge_ids)} 位评委")
+
+            return {
+                "success_count": len(judge_ids),
+                "skipped_count": skipped_count,
+                "error_count": len(errors),
+                "errors": errors
+            }
+        finally:
+            db.close()
+            delete_file(file_path)
+
+
+def _cell_text(value: Any) -> str:
+    # 手机号、用户名等在Excel中常被存成数字，避免出现 13812345678.0
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+def _row_error(e: Exception) -> str:
+    return str(e) if isinstance(e, ValueError) else f"数据解析错误: {str(e)}"
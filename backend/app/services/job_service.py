@@ -0,0 +1,171 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Job:
+    """一个后台任务（批量生成二维码、批量导入等）"""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    def __init__(self, kind: str, total: int = 0):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.status = Job.PENDING
+        self.total = total
+        self.processed = 0
+        self.failed = 0
+        self.message = ""
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        """任务是否已结束（成功或失败）"""
+        return self.status in (Job.COMPLETED, Job.FAILED)
+
+    def set_total(self, total: int):
+        """设置总数（开始执行后才知道总数时调用）"""
+        with self._lock:
+            self.total = total
+
+    def advance(self, processed: int = 1, failed: int = 0, message: str = None):
+        """
+        汇报进度（线程安全）
+
+        Args:
+            processed: 本次新处理的数量（含失败）
+            failed: 其中失败的数量
+            message: 当前进度说明
+        """
+        with self._lock:
+            self.processed += processed
+            self.failed += failed
+            if message is not None:
+                self.message = message
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待任务结束，超时返回False"""
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        with self._lock:
+            progress = round(self.processed / self.total * 100, 2) if self.total else (100.0 if self.finished else 0.0)
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "total": self.total,
+                "processed": self.processed,
+                "failed": self.failed,
+                "progress": progress,
+                "message": self.message,
+                "result": self.result if self.finished else None,
+                "error": self.error,
+                "created_at": self.created_at.isoformat(),
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None
+            }
+
+    def _start(self):
+        with self._lock:
+            self.status = Job.RUNNING
+            self.started_at = datetime.now()
+
+    def _finish(self, result: Any = None, error: str = None):
+        with self._lock:
+            self.result = result
+            self.error = error
+            self.status = Job.FAILED if error is not None else Job.COMPLETED
+            self.finished_at = datetime.now()
+        self._done.set()
+
+
+class JobRegistry:
+    """
+    后台任务登记表（进程内）
+
+    submit 在后台线程中执行 fn(job, *args)，fn 通过 job.advance 汇报进度，返回值作为任务结果
+    （需可JSON序列化）。客户端拿到 job_id 后轮询 /api/jobs/{job_id} 查询进度。
+    只保留最近 max_jobs 个任务；多 worker 部署时任务只能在创建它的进程中查到。
+    """
+
+    def __init__(self, max_jobs: int = 100):
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def submit(self, kind: str, fn: Callable, *args, total: int = 0, **kwargs) -> Job:
+        """
+        创建任务并在后台线程中执行
+
+        Args:
+            kind: 任务类型
+            fn: 任务函数，调用方式为 fn(job, *args, **kwargs)
+            total: 预计处理总数
+
+        Returns:
+            任务
+        """
+        job = Job(kind, total)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+
+        thread = threading.Thread(
+            target=self._run, args=(job, fn, args, kwargs), name=f"job-{kind}-{job.id}", daemon=True
+        )
+        thread.start()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """根据ID获取任务"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, kind: Optional[str] = None) -> List[Job]:
+        """获取任务列表（最新的在前）"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        jobs.reverse()
+        if kind is not None:
+            jobs = [job for job in jobs if job.kind == kind]
+        return jobs
+
+    def _run(self, job: Job, fn: Callable, args: tuple, kwargs: dict):
+        job._start()
+        started = time.monotonic()
+        try:
+            result = fn(job, *args, **kwargs)
+        except Exception as e:
+            print(f"后台任务失败 - {job.kind} {job.id}: {e}")
+            job._finish(error=str(e))
+            return
+        job._finish(result=result)
+        print(f"后台任务完成 - {job.kind} {job.id}，耗时 {time.monotonic() - started:.1f}s")
+
+    def _evict(self):
+        # 超出上限时优先丢弃最早的已结束任务，运行中的任务保留
+        while len(self._jobs) > self.max_jobs:
+            for job_id, job in self._jobs.items():
+                if job.finished:
+                    del self._jobs[job_id]
+                    break
+            else:
+                return
+
+
+# 全局后台任务登记表
+job_registry = JobRegistry()
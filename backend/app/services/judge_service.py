@@ -1,6 +1,9 @@
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Set
 from ..models.judge import Judge
+from .loader_options import judge_options
+from .password_hasher import password_hasher
 from ..utils.auth import hash_password, verify_password, create_judge_token
 
 class JudgeService:
@@ -44,7 +47,7 @@ class JudgeService:
     @staticmethod
     def get_judge_by_id(db: Session, judge_id: int) -> Optional[Judge]:
         """根据ID获取评委"""
-        return db.query(Judge).filter(Judge.id == judge_id).first()
+        return db.query(Judge).options(*judge_options()).filter(Judge.id == judge_id).first()
     
     @staticmethod
     def get_judge_by_username(db: Session, username: str) -> Optional[Judge]:
@@ -54,7 +57,7 @@ class JudgeService:
     @staticmethod
     def get_all_judges(db: Session, include_inactive: bool = False) -> List[Judge]:
         """获取所有评委"""
-        query = db.query(Judge)
+        query = db.query(Judge).options(*judge_options())
         if not include_inactive:
             query = query.filter(Judge.is_active == True)
         return query.all()
@@ -166,34 +169,79 @@ class JudgeService:
         return True
     
     @staticmethod
-    def batch_create_judges(db: Session, judges_data: List[Dict[str, Any]]) -> List[Judge]:
-        """批量创建评委"""
-        judges = []
-        
-        for data in judges_data:
-            # 检查用户名是否已存在
-            existing_judge = db.query(Judge).filter(Judge.username == data["username"]).first()
-            if existing_judge:
-                continue  # 跳过已存在的用户名
-            
-            judge = Judge(
-                name=data["name"],
-                username=data["username"],
-                password=hash_password(data["password"]),
-                organization=data.get("organization")
+    def get_existing_usernames(db: Session, usernames: Iterable[str], chunk_size: int = 500) -> Set[str]:
+        """查询已被占用的用户名（按批 IN 查询）"""
+        usernames = list(usernames)
+        existing = set()
+        for i in range(0, len(usernames), chunk_size):
+            existing.update(
+                username for (username,) in
+                db.query(Judge.username).filter(Judge.username.in_(usernames[i:i + chunk_size]))
             )
-            
-            judges.append(judge)
+        return existing
+    
+    @staticmethod
+    def filter_new_judges(db: Session, judges_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """去掉用户名已存在或在本批中重复的评委数据（保留第一条）"""
+        existing = JudgeService.get_existing_usernames(db, {data["username"] for data in judges_data})
+        new_judges = []
+        for data in judges_data:
+            if data["username"] in existing:
+                continue
+            existing.add(data["username"])
+            new_judges.append(data)
+        return new_judges
+    
+    @staticmethod
+    def bulk_insert_judges(db: Session, judges_data: List[Dict[str, Any]]) -> List[int]:
+        """
+        批量插入评委（导入用，一条多行 INSERT，不创建ORM对象；
+        数据库不支持批量 INSERT ... RETURNING 时退回 ORM 插入）
         
-        if judges:
+        Args:
+            db: 数据库会话
+            judges_data: 评委数据，password 为已哈希的密码
+        
+        Returns:
+            新评委ID
+        """
+        if not judges_data:
+            return []
+        
+        rows = [
+            {
+                "name": data["name"],
+                "username": data["username"],
+                "password": data["password"],
+                "organization": data.get("organization")
+            }
+            for data in judges_data
+        ]
+        if db.get_bind().dialect.insert_executemany_returning:
+            judge_ids = [judge_id for (judge_id,) in db.execute(insert(Judge).returning(Judge.id), rows)]
+        else:
+            # 不支持批量 INSERT ... RETURNING 的数据库（如 MySQL）通过 ORM 插入，flush 后取回ID
+            judges = [Judge(**row) for row in rows]
             db.add_all(judges)
-            db.commit()
-            
-            # 刷新所有对象
-            for judge in judges:
-                db.refresh(judge)
+            db.flush()
+            judge_ids = [judge.id for judge in judges]
+        db.commit()
+        return judge_ids
+    
+    @staticmethod
+    def batch_create_judges(db: Session, judges_data: List[Dict[str, Any]]) -> List[Judge]:
+        """批量创建评委（跳过已存在的用户名，密码在进程池中并行哈希）"""
+        judges_data = JudgeService.filter_new_judges(db, judges_data)
+        if not judges_data:
+            return []
+        
+        hashed = password_hasher.hash_many([data["password"] for data in judges_data])
+        judge_ids = JudgeService.bulk_insert_judges(
+            db, [{**data, "password": password} for data, password in zip(judges_data, hashed)]
+        )
         
-        return judges
+        # 一次查询取回新评委
+        return db.query(Judge).options(*judge_options()).filter(Judge.id.in_(judge_ids)).order_by(Judge.id).all()
     
     @staticmethod
     def get_judge_statistics(db: Session) -> Dict[str, Any]:
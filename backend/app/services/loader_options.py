@@ -0,0 +1,69 @@
+from typing import List
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, raiseload, selectinload, with_expression
+from config import settings
+from ..models.participant import Participant
+from ..models.group import Group
+from ..models.judge import Judge
+from ..models.score import Score
+from ..models.score_aggregate import ScoreAggregate
+
+# 各列表查询的加载策略：to_dict 用到的关联数据在查询时一次取齐，序列化时不再逐条懒加载。
+# 开启 db_raise_on_lazy_load 后，未在这里声明的关联一旦被访问就抛出异常，便于发现新的 N+1 查询。
+
+
+def _finalize(options: list) -> list:
+    if settings.db_raise_on_lazy_load:
+        options.append(raiseload("*"))
+    return options
+
+
+def participant_average_scores():
+    """各参赛者全部轮次的平均分（由评分汇总表计算，只包含有评分的参赛者），列为 participant_id、average_score"""
+    return (
+        select(
+            ScoreAggregate.participant_id.label("participant_id"),
+            (func.sum(ScoreAggregate.score_sum) / func.sum(ScoreAggregate.score_count)).label("average_score")
+        )
+        .group_by(ScoreAggregate.participant_id)
+        .subquery()
+    )
+
+
+def judge_score_count_expression():
+    """评委的评分数量（相关子查询）"""
+    return (
+        select(func.count(Score.id))
+        .where(Score.judge_id == Judge.id)
+        .scalar_subquery()
+    )
+
+
+def participant_options() -> List:
+    """参赛者列表：组别随主查询 JOIN 取出，每轮评分汇总用一条 IN 查询取出（不访问评分表）"""
+    return _finalize([
+        joinedload(Participant.group),
+        selectinload(Participant.score_aggregates)
+    ])
+
+
+def group_options() -> List:
+    """分组列表：全部分组的成员用一条 IN 查询取出"""
+    return _finalize([
+        selectinload(Group.participants)
+    ])
+
+
+def judge_options() -> List:
+    """评委列表：评分数量由 SQL 聚合，不加载评分记录"""
+    return _finalize([
+        with_expression(Judge.preloaded_score_count, judge_score_count_expression())
+    ])
+
+
+def score_options() -> List:
+    """评分列表：参赛者和评委姓名随主查询 JOIN 取出"""
+    return _finalize([
+        joinedload(Score.participant),
+        joinedload(Score.judge)
+    ])
@@ -1,9 +1,12 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional, Dict, Any
+from sqlalchemy import and_, or_, case, func, insert, select
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from ..models.participant import Participant
 from ..models.group import Group
-from ..utils.qr_generator import generate_participant_qr
+from ..cache.identity_index import IdentityEntry, checkin_index
+from ..cache.ranking import score_ranking
+from .loader_options import participant_average_scores, participant_options
+from .qr_batch import qr_renderer
 import uuid
 import os
 
@@ -43,12 +46,16 @@ class ParticipantService:
         db.commit()
         db.refresh(participant)
         
+        checkin_index.upsert(IdentityEntry.from_participant(participant))
+        
         return participant
     
     @staticmethod
     def get_participant_by_id(db: Session, participant_id: int) -> Optional[Participant]:
         """根据ID获取参赛者"""
-        return db.query(Participant).filter(Participant.id == participant_id).first()
+        return db.query(Participant).options(*participant_options()).filter(
+            Participant.id == participant_id
+        ).first()
     
     @staticmethod
     def get_participant_by_qr_code(db: Session, qr_code_id: str) -> Optional[Participant]:
@@ -58,17 +65,48 @@ class ParticipantService:
     @staticmethod
     def get_participants_by_group(db: Session, group_id: int) -> List[Participant]:
         """获取指定组的参赛者"""
-        return db.query(Participant).filter(Participant.group_id == group_id).all()
+        return db.query(Participant).options(*participant_options()).filter(
+            Participant.group_id == group_id
+        ).all()
     
     @staticmethod
     def get_all_participants(db: Session, skip: int = 0, limit: int = 1000) -> List[Participant]:
         """获取所有参赛者"""
-        return db.query(Participant).offset(skip).limit(limit).all()
+        return db.query(Participant).options(*participant_options()).offset(skip).limit(limit).all()
+    
+    @staticmethod
+    def iter_export_rows(db: Session, batch_size: int = 1000) -> Iterator[tuple]:
+        """
+        导出用：参赛者、组名、平均分由一条 LEFT JOIN 查询取出，按 batch_size 分批从游标读取
+        
+        Yields:
+            (id, 姓名, 单位, 手机号, 组名, 是否签到, 签到时间, 平均分, 二维码ID)
+        """
+        averages = participant_average_scores()
+        stmt = (
+            select(
+                Participant.id,
+                Participant.name,
+                Participant.organization,
+                Participant.phone,
+                Group.name,
+                Participant.is_checked_in,
+                Participant.checkin_time,
+                func.coalesce(averages.c.average_score, 0.0),
+                Participant.qr_code_id
+            )
+            .outerjoin(Group, Participant.group_id == Group.id)
+            .outerjoin(averages, averages.c.participant_id == Participant.id)
+            .order_by(Participant.id)
+            .execution_options(yield_per=batch_size)
+        )
+        for row in db.execute(stmt):
+            yield tuple(row)
     
     @staticmethod
     def search_participants(db: Session, keyword: str) -> List[Participant]:
         """搜索参赛者"""
-        return db.query(Participant).filter(
+        return db.query(Participant).options(*participant_options()).filter(
             or_(
                 Participant.name.contains(keyword),
                 Participant.organization.contains(keyword),
@@ -94,6 +132,8 @@ class ParticipantService:
         
         db.commit()
         db.refresh(participant)
+        
+        checkin_index.upsert(IdentityEntry.from_participant(participant))
         return participant
     
     @staticmethod
@@ -105,6 +145,9 @@ class ParticipantService:
         
         db.delete(participant)
         db.commit()
+        
+        checkin_index.remove(participant_id)
+        score_ranking.remove_participant(participant_id)
         return True
     
     @staticmethod
@@ -132,19 +175,122 @@ class ParticipantService:
         
         return participant
     
+    @staticmethod
+    def load_identity_index(db: Session) -> int:
+        """
+        预加载签到身份索引
+        
+        只查询签到校验需要的列，启动时调用一次，之后由写操作维护。
+        
+        Returns:
+            加载的参赛者数量
+        """
+        rows = db.query(
+            Participant.id,
+            Participant.qr_code_id,
+            Participant.name,
+            Participant.phone_last4,
+            Participant.is_checked_in,
+            Participant.checkin_time
+        ).all()
+        
+        return checkin_index.load(IdentityEntry(*row) for row in rows)
+    
+    @staticmethod
+    def generate_qr_code_ids(db: Session, count: int, chunk_size: int = 500) -> List[str]:
+        """
+        批量生成不重复的二维码ID
+        
+        一次生成一批候选ID，用 IN 查询批量排除已被占用的，冲突的部分再补生成，
+        不必每个ID单独查询一次。
+        
+        Args:
+            db: 数据库会话
+            count: 需要的数量
+            chunk_size: 每条 IN 查询检查的ID数量
+        
+        Returns:
+            二维码ID列表
+        """
+        qr_code_ids = set()
+        while len(qr_code_ids) < count:
+            candidates = list({
+                str(uuid.uuid4())[:8].upper() for _ in range(count - len(qr_code_ids))
+            } - qr_code_ids)
+            taken = set()
+            for start in range(0, len(candidates), chunk_size):
+                taken.update(
+                    row[0] for row in db.query(Participant.qr_code_id).filter(
+                        Participant.qr_code_id.in_(candidates[start:start + chunk_size])
+                    )
+                )
+            qr_code_ids.update(qr_code_id for qr_code_id in candidates if qr_code_id not in taken)
+        return list(qr_code_ids)
+    
+    @staticmethod
+    def bulk_insert_participants(db: Session, participants_data: List[Dict[str, Any]]) -> int:
+        """
+        批量插入参赛者（导入用，一条多行 INSERT，不创建ORM对象；
+        数据库不支持批量 INSERT ... RETURNING 时退回 ORM 插入）
+        
+        Args:
+            db: 数据库会话
+            participants_data: 参赛者数据（name、organization、phone，可选 photo_path、group_id）
+        
+        Returns:
+            插入数量
+        """
+        if not participants_data:
+            return 0
+        
+        qr_code_ids = ParticipantService.generate_qr_code_ids(db, len(participants_data))
+        rows = [
+            {
+                "name": data["name"],
+                "organization": data["organization"],
+                "phone": data["phone"],
+                "phone_last4": data["phone"][-4:],
+                "photo_path": data.get("photo_path"),
+                "group_id": data.get("group_id"),
+                "qr_code_id": qr_code_id
+            }
+            for data, qr_code_id in zip(participants_data, qr_code_ids)
+        ]
+        
+        if db.get_bind().dialect.insert_executemany_returning:
+            inserted = db.execute(
+                insert(Participant).returning(
+                    Participant.id,
+                    Participant.qr_code_id,
+                    Participant.name,
+                    Participant.phone_last4,
+                    Participant.is_checked_in,
+                    Participant.checkin_time
+                ),
+                rows
+            ).all()
+        else:
+            # 不支持批量 INSERT ... RETURNING 的数据库（如 MySQL）通过 ORM 插入，flush 后取回ID
+            participants = [Participant(**row) for row in rows]
+            db.add_all(participants)
+            db.flush()
+            inserted = [
+                (p.id, p.qr_code_id, p.name, p.phone_last4, p.is_checked_in, p.checkin_time)
+                for p in participants
+            ]
+        db.commit()
+        
+        for row in inserted:
+            checkin_index.upsert(IdentityEntry(*row))
+        return len(inserted)
+    
     @staticmethod
     def batch_create_participants(db: Session, participants_data: List[Dict[str, Any]]) -> List[Participant]:
         """批量创建参赛者"""
         participants = []
+        qr_code_ids = ParticipantService.generate_qr_code_ids(db, len(participants_data))
         
-        for data in participants_data:
-            # 生成唯一的二维码ID
-            qr_code_id = str(uuid.uuid4())[:8].upper()
-            
-            # 确保二维码ID唯一
-            while db.query(Participant).filter(Participant.qr_code_id == qr_code_id).first():
-                qr_code_id = str(uuid.uuid4())[:8].upper()
-            
+        for data, qr_code_id in zip(participants_data, qr_code_ids):
             participant = Participant(
                 name=data["name"],
                 organization=data["organization"],
@@ -158,63 +304,82 @@ class ParticipantService:
             participants.append(participant)
         
         db.add_all(participants)
+        db.flush()
+        participant_ids = [participant.id for participant in participants]
         db.commit()
         
-        # 刷新所有对象
+        # 提交后用一条查询重新加载，不再逐个 refresh
+        participants = db.query(Participant).options(*participant_options()).filter(
+            Participant.id.in_(participant_ids)
+        ).order_by(Participant.id).all()
         for participant in participants:
-            db.refresh(participant)
+            checkin_index.upsert(IdentityEntry.from_participant(participant))
         
         return participants
     
     @staticmethod
-    def generate_qr_codes_for_all(db: Session) -> List[str]:
-        """为所有参赛者生成二维码"""
-        participants = db.query(Participant).all()
-        file_paths = []
-        
-        for participant in participants:
-            try:
-                file_path = generate_participant_qr(
-                    participant_id=participant.id,
-                    qr_code_id=participant.qr_code_id,
-                    participant_name=participant.name
-                )
-                file_paths.append(file_path)
-            except Exception as e:
-                print(f"生成二维码失败 - 参赛者ID: {participant.id}, 错误: {e}")
-        
-        return file_paths
+    def get_qr_code_items(db: Session) -> List[Tuple[int, str, str]]:
+        """获取生成二维码所需的 (参赛者ID, 二维码标识, 姓名)，只查询这三列"""
+        return [
+            tuple(row) for row in db.query(
+                Participant.id, Participant.qr_code_id, Participant.name
+            ).order_by(Participant.id).all()
+        ]
+    
+    @staticmethod
+    def get_qr_sheet_items(db: Session) -> List[Tuple[int, str, str, str]]:
+        """获取打印二维码表格所需的 (参赛者ID, 二维码标识, 姓名, 单位)，按组别、ID排序"""
+        return [
+            tuple(row) for row in db.query(
+                Participant.id, Participant.qr_code_id, Participant.name, Participant.organization
+            ).order_by(Participant.group_id, Participant.id).all()
+        ]
+    
+    @staticmethod
+    def generate_qr_codes_for_all(db: Session, force: bool = False) -> List[str]:
+        """为所有参赛者生成二维码（内容未变化的跳过，返回全部二维码文件路径）"""
+        items = ParticipantService.get_qr_code_items(db)
+        return qr_renderer.render(items, force=force)["file_paths"]
     
     @staticmethod
     def get_participants_by_organization(db: Session, organization: str) -> List[Participant]:
         """根据单位获取参赛者"""
-        return db.query(Participant).filter(Participant.organization == organization).all()
+        return db.query(Participant).options(*participant_options()).filter(
+            Participant.organization == organization
+        ).all()
     
     @staticmethod
     def get_checked_in_participants(db: Session) -> List[Participant]:
         """获取已签到的参赛者"""
-        return db.query(Participant).filter(Participant.is_checked_in == True).all()
+        return db.query(Participant).options(*participant_options()).filter(
+            Participant.is_checked_in == True
+        ).all()
     
     @staticmethod
     def get_not_checked_in_participants(db: Session) -> List[Participant]:
         """获取未签到的参赛者"""
-        return db.query(Participant).filter(Participant.is_checked_in == False).all()
+        return db.query(Participant).options(*participant_options()).filter(
+            Participant.is_checked_in == False
+        ).all()
     
     @staticmethod
     def get_participants_statistics(db: Session) -> Dict[str, Any]:
-        """获取参赛者统计信息"""
-        total_count = db.query(Participant).count()
-        checked_in_count = db.query(Participant).filter(Participant.is_checked_in == True).count()
+        """获取参赛者统计信息（一次按单位分组的查询）"""
+        org_counts = db.query(
+            Participant.organization,
+            func.count(Participant.id),
+            func.sum(case((Participant.is_checked_in == True, 1), else_=0))
+        ).group_by(Participant.organization).all()
         
         # 按单位统计
-        organizations = db.query(Participant.organization).distinct().all()
         org_stats = []
+        total_count = 0
+        checked_in_count = 0
         
-        for (org,) in organizations:
-            org_total = db.query(Participant).filter(Participant.organization == org).count()
-            org_checked_in = db.query(Participant).filter(
-                and_(Participant.organization == org, Participant.is_checked_in == True)
-            ).count()
+        for org, org_total, org_checked_in in org_counts:
+            org_checked_in = org_checked_in or 0
+            total_count += org_total
+            checked_in_count += org_checked_in
             
             org_stats.append({
                 "organization": org,
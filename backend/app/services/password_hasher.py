@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional
+from config import settings
+from ..utils.auth import hash_passwords_batch
+
+# 进度回调：本次完成的数量
+ProgressCallback = Callable[[int], None]
+
+
+class PasswordHasher:
+    """
+    批量密码哈希器
+
+    bcrypt 刻意设计得很慢（成本因子 12 时单个约 250ms），且计算时持有 GIL，
+    批量导入评委时在进程池中并行哈希，不占用请求线程。
+    数量少于 min_parallel 时在当前线程计算，不启动进程池。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, chunk_size: int = 4, min_parallel: int = 4):
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.min_parallel = min_parallel
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def hash_many(self, passwords: List[str], rounds: Optional[int] = None,
+                  progress: Optional[ProgressCallback] = None) -> List[str]:
+        """
+        批量哈希密码
+
+        Args:
+            passwords: 原始密码
+            rounds: bcrypt 成本因子，默认使用 passlib 的默认值
+            progress: 进度回调
+
+        Returns:
+            与 passwords 顺序一致的密码哈希
+        """
+        chunks = [passwords[i:i + self.chunk_size] for i in range(0, len(passwords), self.chunk_size)]
+        if len(passwords) < self.min_parallel or self._worker_count() <= 1:
+            hashed = []
+            for chunk in chunks:
+                hashed.extend(hash_passwords_batch(chunk, rounds))
+                if progress is not None:
+                    progress(len(chunk))
+            return hashed
+
+        results: List[Optional[List[str]]] = [None] * len(chunks)
+        with self._lock:
+            executor = self._get_executor()
+            futures = {executor.submit(hash_passwords_batch, chunk, rounds): index
+                       for index, chunk in enumerate(chunks)}
+        try:
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index] = future.result()
+                if progress is not None:
+                    progress(len(chunks[index]))
+        except BrokenProcessPool:
+            # 子进程异常退出后进程池不可再用，下次重新创建
+            with self._lock:
+                self._executor = None
+            raise
+        return [hashed for chunk in results for hashed in chunk]
+
+    def shutdown(self):
+        """关闭进程池（应用关闭时调用）"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def _worker_count(self) -> int:
+        return self.max_workers or settings.password_hash_workers or os.cpu_count() or 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # 与二维码渲染相同，使用 spawn 启动子进程
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._worker_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+
+# 全局密码哈希器
+password_hasher = PasswordHasher()
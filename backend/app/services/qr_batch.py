@@ -0,0 +1,170 @@
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import settings
+from ..utils.qr_generator import (
+    init_qr_worker,
+    participant_qr_hash,
+    participant_qr_path,
+    render_participant_qr_batch,
+)
+
+# 进度回调：(本次处理数量, 其中失败数量)
+ProgressCallback = Callable[[int, int], None]
+
+
+class QRBatchRenderer:
+    """
+    参赛者二维码批量渲染器
+
+    - 渲染在进程池中并行执行，进程启动时由 init_qr_worker 预先加载字体
+    - manifest.json 记录每个参赛者上次生成的内容哈希（二维码内容 + 姓名 + 样式），
+      哈希未变且文件仍在的直接跳过，重复生成只渲染有变化的参赛者
+    - 需要渲染的数量少于 min_parallel 时在当前线程渲染，不启动进程池
+    同一时间只执行一个批次。
+    """
+
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, output_dir: str = "data/qrcodes", max_workers: Optional[int] = None,
+                 chunk_size: int = 25, min_parallel: int = 50):
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.min_parallel = min_parallel
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.output_dir, self.MANIFEST_NAME)
+
+    def render(self, participants: List[Tuple[int, str, str]], force: bool = False,
+               progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        批量生成参赛者二维码
+
+        Args:
+            participants: (参赛者ID, 二维码标识, 姓名)
+            force: 忽略内容哈希，全部重新生成
+            progress: 进度回调
+
+        Returns:
+            {"file_paths": 全部二维码文件, "generated": 本次生成数, "skipped": 未变化跳过数,
+             "failed": [{"participant_id", "error"}]}
+        """
+        with self._lock:
+            os.makedirs(self.output_dir, exist_ok=True)
+            manifest = self._load_manifest()
+
+            file_paths: Dict[int, str] = {}
+            hashes: Dict[int, str] = {}
+            tasks = []
+            for participant_id, qr_code_id, name in participants:
+                content_hash = participant_qr_hash(participant_id, qr_code_id, name)
+                path = participant_qr_path(participant_id, qr_code_id, self.output_dir)
+                entry = manifest.get(str(participant_id))
+                if (not force and entry and entry["hash"] == content_hash
+                        and entry["path"] == path and os.path.exists(path)):
+                    file_paths[participant_id] = path
+                    continue
+                hashes[participant_id] = content_hash
+                tasks.append((participant_id, qr_code_id, name or "", path))
+
+            skipped = len(participants) - len(tasks)
+            if progress is not None and skipped:
+                progress(skipped, 0)
+
+            failed = []
+            for results in self._run_tasks(tasks):
+                chunk_failed = 0
+                for participant_id, path, error in results:
+                    if error is None:
+                        file_paths[participant_id] = path
+                        manifest[str(participant_id)] = {"hash": hashes[participant_id], "path": path}
+                    else:
+                        chunk_failed += 1
+                        manifest.pop(str(participant_id), None)
+                        failed.append({"participant_id": participant_id, "error": error})
+                        print(f"生成二维码失败 - 参赛者ID: {participant_id}, 错误: {error}")
+                if progress is not None:
+                    progress(len(results), chunk_failed)
+
+            if tasks:
+                self._save_manifest(manifest)
+
+            return {
+                "file_paths": [file_paths[pid] for pid, _, _ in participants if pid in file_paths],
+                "generated": len(tasks) - len(failed),
+                "skipped": skipped,
+                "failed": failed
+            }
+
+    def shutdown(self):
+        """关闭进程池（应用关闭时调用）"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def _run_tasks(self, tasks: list):
+        chunks = [tasks[i:i + self.chunk_size] for i in range(0, len(tasks), self.chunk_size)]
+        if len(tasks) < self.min_parallel or self._worker_count() <= 1:
+            init_qr_worker()
+            for chunk in chunks:
+                yield render_participant_qr_batch(chunk)
+            return
+
+        executor = self._get_executor()
+        futures = [executor.submit(render_participant_qr_batch, chunk) for chunk in chunks]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        except BrokenProcessPool:
+            # 子进程异常退出后进程池不可再用，下次重新创建
+            self._executor = None
+            raise
+
+    def _worker_count(self) -> int:
+        return self.max_workers or settings.qr_render_workers or os.cpu_count() or 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # 应用进程里有多个线程，使用 spawn 启动子进程，避免 fork 带出线程锁状态
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._worker_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_qr_worker
+            )
+        return self._executor
+
+    def _load_manifest(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest: Dict[str, Dict[str, str]]):
+        # 先写临时文件再替换，中途失败不会留下半个 manifest
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+
+def render_qr_codes_job(job, participants: List[Tuple[int, str, str]], force: bool = False) -> Dict[str, Any]:
+    """后台任务：批量生成二维码并把进度汇报到任务上"""
+    job.set_total(len(participants))
+    return qr_renderer.render(
+        participants, force=force,
+        progress=lambda processed, failed: job.advance(processed, failed)
+    )
+
+
+# 全局二维码批量渲染器
+qr_renderer = QRBatchRenderer()
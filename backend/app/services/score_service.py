@@ -1,13 +1,34 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
-from typing import List, Optional, Dict, Any
+import time
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Iterable, List, Optional, Dict, Any, Sequence, Tuple
+from config import settings
 from ..models.score import Score
+from ..models.score_aggregate import ScoreAggregate
 from ..models.participant import Participant
 from ..models.judge import Judge
+from ..models.group import Group
+from ..models.score_sync import ScoreChange
+from ..cache.ranking import score_ranking
+from .event_hub import event_hub
+from .loader_options import participant_options, score_options
 
 class ScoreService:
     """评分服务类"""
     
+    # 评分范围（在线提交、批量提交和离线同步共用）
+    MIN_SCORE = 0
+    MAX_SCORE = 10
+    INVALID_SCORE_MESSAGE = f"评分必须在{MIN_SCORE}-{MAX_SCORE}之间"
+    
+    @staticmethod
+    def is_valid_score(score: float) -> bool:
+        """评分是否在允许范围内"""
+        return ScoreService.MIN_SCORE <= score <= ScoreService.MAX_SCORE
+    
     @staticmethod
     def submit_score(db: Session, participant_id: int, judge_id: int, 
                     score: float, round_number: int = 1) -> Dict[str, Any]:
@@ -25,10 +46,10 @@ class ScoreService:
             提交结果
         """
         # 验证评分范围
-        if not (0 <= score <= 10):
+        if not ScoreService.is_valid_score(score):
             return {
                 "success": False,
-                "message": "评分必须在0-10之间",
+                "message": ScoreService.INVALID_SCORE_MESSAGE,
                 "error_code": "INVALID_SCORE_RANGE"
             }
         
@@ -62,8 +83,11 @@ class ScoreService:
         if existing_score:
             # 更新现有评分
             existing_score.score = score
+            ScoreService._log_changes(db, [(participant_id, judge_id, round_number, score)])
+            ScoreService._refresh_aggregates(db, [(participant_id, round_number)])
             db.commit()
             db.refresh(existing_score)
+            ScoreService._apply_score_change(round_number, participant_id, judge_id, score, "updated")
             
             return {
                 "success": True,
@@ -81,8 +105,11 @@ class ScoreService:
             )
             
             db.add(new_score)
+            ScoreService._log_changes(db, [(participant_id, judge_id, round_number, score)])
+            ScoreService._refresh_aggregates(db, [(participant_id, round_number)])
             db.commit()
             db.refresh(new_score)
+            ScoreService._apply_score_change(round_number, participant_id, judge_id, score, "created")
             
             return {
                 "success": True,
@@ -91,11 +118,338 @@ class ScoreService:
                 "action": "created"
             }
     
+    @staticmethod
+    def batch_submit_scores(db: Session, items: List[Dict[str, Any]], atomic: bool = False) -> Dict[str, Any]:
+        """
+        批量提交评分（评委平板离线评分同步等）
+        
+        参赛者、评委各用一次 IN 查询校验，已有评分用一次查询取出，
+        全部有效条目在同一个事务中用 INSERT ... ON CONFLICT (unique_score_per_round) 写入
+        （不支持的数据库退回查询后逐条修改或新增，见 _upsert_scores）。
+        同一批次中相同 (参赛者, 评委, 轮次) 出现多次时以最后一条为准。
+        
+        Args:
+            db: 数据库会话
+            items: 评分列表，每项包含 participant_id、judge_id、score，可选 round_number
+            atomic: True 时只要有一条无效就全部不写入；False 时写入有效条目，无效条目逐条报告
+        
+        Returns:
+            {"success", "atomic", "success_count", "error_count",
+             "results": 与 items 一一对应的结果, "errors": [{"index", "error", "error_code"}]}
+        """
+        keys = [
+            (item["participant_id"], item["judge_id"], item.get("round_number", 1))
+            for item in items
+        ]
+        participant_ids = {key[0] for key in keys}
+        judge_ids = {key[1] for key in keys}
+        existing_participants = {
+            pid for (pid,) in db.execute(select(Participant.id).where(Participant.id.in_(participant_ids)))
+        } if participant_ids else set()
+        active_judges = {
+            jid for jid, is_active in db.execute(
+                select(Judge.id, Judge.is_active).where(Judge.id.in_(judge_ids))
+            ) if is_active
+        } if judge_ids else set()
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        last_index: Dict[tuple, int] = {}
+        for index, (item, key) in enumerate(zip(items, keys)):
+            if not ScoreService.is_valid_score(item["score"]):
+                results[index] = _batch_error(index, ScoreService.INVALID_SCORE_MESSAGE, "INVALID_SCORE_RANGE")
+            elif key[0] not in existing_participants:
+                results[index] = _batch_error(index, "参赛者不存在", "PARTICIPANT_NOT_FOUND")
+            elif key[1] not in active_judges:
+                results[index] = _batch_error(index, "评委不存在或已停用", "JUDGE_NOT_FOUND")
+            else:
+                last_index[key] = index
+        
+        errors = [
+            {"index": result["index"], "error": result["message"], "error_code": result["error_code"]}
+            for result in results if result is not None
+        ]
+        if atomic and errors:
+            for index in range(len(items)):
+                if results[index] is None:
+                    results[index] = _batch_error(index, "批次中有无效评分，未写入", "BATCH_REJECTED")
+            return _batch_summary(False, atomic, 0, results, errors)
+        
+        previous = ScoreService._get_scores_by_key(db, list(last_index))
+        rows = [
+            {
+                "participant_id": key[0],
+                "judge_id": key[1],
+                "round_number": key[2],
+                "score": items[index]["score"]
+            }
+            for key, index in last_index.items()
+        ]
+        saved = {}
+        try:
+            for row in ScoreService._upsert_scores(db, rows):
+                saved[(row.participant_id, row.judge_id, row.round_number)] = row
+            changes = [
+                (*key, row["score"]) for key, row in zip(last_index, rows) if previous.get(key) != row["score"]
+            ]
+            ScoreService._log_changes(db, changes)
+            ScoreService._refresh_aggregates(db, [(change[0], change[2]) for change in changes])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        
+        for key, index in last_index.items():
+            row = saved[key]
+            # SQLite 的 RETURNING 对整数值的 REAL 列返回 int，这里统一为 float
+            score = float(row.score)
+            action = "updated" if key in previous else "created"
+            results[index] = {
+                "index": index,
+                "success": True,
+                "message": "评分更新成功" if action == "updated" else "评分提交成功",
+                "action": action,
+                "score": {
+                    "id": row.id,
+                    "participant_id": row.participant_id,
+                    "judge_id": row.judge_id,
+                    "score": score,
+                    "round_number": row.round_number
+                }
+            }
+            if previous.get(key) != score:
+                ScoreService._apply_score_change(key[2], key[0], key[1], score, action)
+        for index, key in enumerate(keys):
+            if results[index] is None:
+                results[index] = {
+                    "index": index,
+                    "success": True,
+                    "message": "同一批次中后面的评分覆盖了本条",
+                    "action": "superseded",
+                    "score": results[last_index[key]]["score"]
+                }
+        
+        success_count = len(items) - len(errors)
+        return _batch_summary(not errors, atomic, success_count, results, errors)
+    
+    @staticmethod
+    def _log_changes(db: Session, changes: List[tuple]) -> List[int]:
+        """
+        在当前事务中追加评分变更日志（离线同步按 seq 拉取变更）
+        
+        Args:
+            changes: (参赛者ID, 评委ID, 轮次, 评分[, 版本时间戳, 操作ID])，删除时评分为None；
+                     服务端直接写入时不带后两项，版本时间戳取服务器当前时间（毫秒）；
+                     同一次调用中 (参赛者ID, 评委ID, 轮次) 不重复
+        
+        Returns:
+            与 changes 顺序一致的变更序号
+        """
+        if not changes:
+            return []
+        now_ms = int(time.time() * 1000)
+        rows = []
+        for change in changes:
+            participant_id, judge_id, round_number, score, client_ts, op_id = (*change, None, None)[:6]
+            rows.append({
+                "participant_id": participant_id,
+                "judge_id": judge_id,
+                "round_number": round_number,
+                "score": score,
+                "client_ts": now_ms if client_ts is None else client_ts,
+                "op_id": op_id
+            })
+        if not db.get_bind().dialect.insert_returning:
+            # 不支持 INSERT ... RETURNING 的数据库（如 MySQL）逐条插入，由 ORM 取回自增序号
+            records = [ScoreChange(**row) for row in rows]
+            db.add_all(records)
+            db.flush()
+            return [record.seq for record in records]
+        # 按键对应回序号（SQLite 下要求按参数顺序返回会退化为逐行 INSERT）
+        seqs = {}
+        for i in range(0, len(rows), 500):
+            result = db.execute(insert(ScoreChange).values(rows[i:i + 500]).returning(
+                ScoreChange.seq, ScoreChange.participant_id, ScoreChange.judge_id, ScoreChange.round_number
+            ))
+            for seq, participant_id, judge_id, round_number in result:
+                seqs[(participant_id, judge_id, round_number)] = seq
+        return [seqs[(row["participant_id"], row["judge_id"], row["round_number"])] for row in rows]
+    
+    @staticmethod
+    def _refresh_aggregates(db: Session, keys: Iterable[Tuple[int, int]]):
+        """
+        在当前事务中按评分表重算 (参赛者ID, 轮次) 的评分汇总（与评分写入一起提交或回滚）
+        
+        每个键只统计该参赛者该轮的评分（走 unique_score_per_round 索引），开销与评委人数成正比；
+        没有评分的键删除汇总行。
+        """
+        keys = set(keys)
+        if not keys:
+            return
+        # 会话未开启 autoflush，先把本事务中待写入的评分刷到数据库再统计
+        db.flush()
+        participant_ids = {key[0] for key in keys}
+        round_numbers = {key[1] for key in keys}
+        # PostgreSQL 下锁住已有汇总行，并发写同一参赛者同一轮时依次重算
+        existing = {
+            (aggregate.participant_id, aggregate.round_number): aggregate
+            for aggregate in db.query(ScoreAggregate).filter(
+                ScoreAggregate.participant_id.in_(participant_ids),
+                ScoreAggregate.round_number.in_(round_numbers)
+            ).with_for_update()
+        }
+        stats = {
+            (participant_id, round_number): values
+            for participant_id, round_number, *values in db.execute(_aggregate_statement(
+                Score.participant_id.in_(participant_ids),
+                Score.round_number.in_(round_numbers)
+            ))
+        }
+        for key in keys:
+            aggregate = existing.get(key)
+            values = stats.get(key)
+            if values is None:
+                if aggregate is not None:
+                    db.delete(aggregate)
+                continue
+            if aggregate is None:
+                aggregate = ScoreAggregate(participant_id=key[0], round_number=key[1])
+                db.add(aggregate)
+            for name, value in ScoreAggregate.summarize(*values).items():
+                setattr(aggregate, name, value)
+    
+    @staticmethod
+    def rebuild_aggregates(db: Session) -> int:
+        """
+        按评分表重建全部评分汇总（启动时校准，补齐升级前已有的评分）
+        
+        Returns:
+            汇总行数
+        """
+        rows = [
+            {"participant_id": participant_id, "round_number": round_number, **ScoreAggregate.summarize(*values)}
+            for participant_id, round_number, *values in db.execute(_aggregate_statement())
+        ]
+        try:
+            db.query(ScoreAggregate).delete(synchronize_session=False)
+            for i in range(0, len(rows), 500):
+                db.execute(insert(ScoreAggregate), rows[i:i + 500])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return len(rows)
+    
+    @staticmethod
+    def _get_scores_by_key(db: Session, keys: List[tuple]) -> Dict[tuple, float]:
+        """按 (参赛者ID, 评委ID, 轮次) 取已有评分"""
+        if not keys:
+            return {}
+        wanted = set(keys)
+        rows = db.execute(
+            select(Score.participant_id, Score.judge_id, Score.round_number, Score.score).where(
+                Score.judge_id.in_({key[1] for key in keys}),
+                Score.participant_id.in_({key[0] for key in keys}),
+                Score.round_number.in_({key[2] for key in keys})
+            )
+        )
+        return {
+            (pid, jid, round_number): score
+            for pid, jid, round_number, score in rows
+            if (pid, jid, round_number) in wanted
+        }
+    
+    @staticmethod
+    def _upsert_scores(db: Session, rows: List[Dict[str, Any]]) -> List[Any]:
+        """
+        写入评分，(参赛者, 评委, 轮次) 已存在时覆盖分数
+        
+        SQLite / PostgreSQL 每 500 条一条 INSERT ... ON CONFLICT DO UPDATE；
+        其他数据库（如 MySQL）退回先查出已有评分、再逐条修改或新增。
+        
+        Returns:
+            与 rows 对应的记录，带 id、participant_id、judge_id、round_number、score 属性
+        """
+        upsert_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if upsert_insert is None:
+            return ScoreService._save_scores(db, rows)
+        saved = []
+        for i in range(0, len(rows), 500):
+            stmt = upsert_insert(Score).values(rows[i:i + 500])
+            saved.extend(db.execute(stmt.on_conflict_do_update(
+                index_elements=[Score.participant_id, Score.judge_id, Score.round_number],
+                set_={"score": stmt.excluded.score, "updated_at": func.now()}
+            ).returning(Score.id, Score.participant_id, Score.judge_id, Score.round_number, Score.score)))
+        return saved
+    
+    @staticmethod
+    def _save_scores(db: Session, rows: List[Dict[str, Any]]) -> List["_SavedScore"]:
+        """不支持 ON CONFLICT 的数据库：一次查询取出已有评分，修改或新增后 flush"""
+        keys = [(row["participant_id"], row["judge_id"], row["round_number"]) for row in rows]
+        existing = {
+            (score.participant_id, score.judge_id, score.round_number): score
+            for score in db.query(Score).filter(
+                Score.participant_id.in_({key[0] for key in keys}),
+                Score.judge_id.in_({key[1] for key in keys}),
+                Score.round_number.in_({key[2] for key in keys})
+            )
+        }
+        scores = []
+        for key, row in zip(keys, rows):
+            score = existing.get(key)
+            if score is None:
+                score = Score(**row)
+                db.add(score)
+            else:
+                score.score = row["score"]
+            scores.append(score)
+        db.flush()
+        # 提交后 ORM 对象会过期，这里先取出字段值
+        return [
+            _SavedScore(score.id, score.participant_id, score.judge_id, score.round_number, score.score)
+            for score in scores
+        ]
+    
+    @staticmethod
+    def _apply_score_change(round_number: int, participant_id: int, judge_id: int,
+                           score: Optional[float], action: str):
+        """
+        评分提交后更新实时排名，并向实时推送通道发布评分和名次变化
+        
+        Args:
+            score: 新评分，删除时为None
+            action: created / updated / deleted
+        """
+        previous = score_ranking.rank_of(round_number, participant_id)
+        if score is None:
+            score_ranking.remove_score(round_number, participant_id, judge_id)
+        else:
+            score_ranking.set_score(round_number, participant_id, judge_id, score)
+        current = score_ranking.rank_of(round_number, participant_id)
+        
+        event_hub.publish("score", {
+            "participant_id": participant_id,
+            "judge_id": judge_id,
+            "round_number": round_number,
+            "score": score,
+            "action": action
+        })
+        
+        # 仅在名次或平均分变化时推送（该轮排名尚未加载时没有名次信息）
+        if (current and current[:2]) != (previous and previous[:2]):
+            event_hub.publish("rank", {
+                "participant_id": participant_id,
+                "round_number": round_number,
+                "rank": current[0] if current else None,
+                "previous_rank": previous[0] if previous else None,
+                "average_score": round(current[1], 2) if current else None,
+                "score_count": current[2] if current else 0
+            })
+    
     @staticmethod
     def get_participant_scores(db: Session, participant_id: int, 
                               round_number: int = 1) -> List[Score]:
         """获取参赛者的所有评分"""
-        return db.query(Score).filter(
+        return db.query(Score).options(*score_options()).filter(
             and_(
                 Score.participant_id == participant_id,
                 Score.round_number == round_number
@@ -106,7 +460,7 @@ class ScoreService:
     def get_judge_scores(db: Session, judge_id: int, 
                         round_number: int = 1) -> List[Score]:
         """获取评委的所有评分"""
-        return db.query(Score).filter(
+        return db.query(Score).options(*score_options()).filter(
             and_(
                 Score.judge_id == judge_id,
                 Score.round_number == round_number
@@ -116,57 +470,91 @@ class ScoreService:
     @staticmethod
     def calculate_participant_average(db: Session, participant_id: int, 
                                     round_number: int = 1) -> Optional[float]:
-        """计算参赛者平均分"""
-        scores = ScoreService.get_participant_scores(db, participant_id, round_number)
-        
-        if not scores:
+        """参赛者该轮平均分（读取评分汇总），暂无评分时返回None"""
+        aggregate = db.get(ScoreAggregate, (participant_id, round_number))
+        if aggregate is None:
             return None
+        return round(aggregate.average_score, 2)
+    
+    @staticmethod
+    def ensure_ranking_loaded(db: Session, round_number: int = 1):
+        """实时排名中没有该轮次（或已过期）时，用一次查询整轮加载"""
+        if not score_ranking.needs_load(round_number, settings.ranking_cache_ttl):
+            return
         
-        total_score = sum(score.score for score in scores)
-        return round(total_score / len(scores), 2)
+        started = score_ranking.begin_load(round_number)
+        rows = db.query(Score.participant_id, Score.judge_id, Score.score).filter(
+            Score.round_number == round_number
+        ).all()
+        score_ranking.load(round_number, rows, started)
     
     @staticmethod
-    def get_ranking(db: Session, round_number: int = 1) -> List[Dict[str, Any]]:
+    def get_ranking(db: Session, round_number: int = 1, 
+                   limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         获取排行榜
         
+        名次和平均分来自实时排名，只需再查一次参赛者信息。
+        
         Args:
             db: 数据库会话
             round_number: 轮次
+            limit: 只返回前N名，None 表示全部
         
         Returns:
             排行榜列表
         """
-        # 查询所有参赛者的平均分
-        subquery = db.query(
-            Score.participant_id,
-            func.avg(Score.score).label('avg_score'),
-            func.count(Score.id).label('score_count')
-        ).filter(
-            Score.round_number == round_number
-        ).group_by(Score.participant_id).subquery()
+        ScoreService.ensure_ranking_loaded(db, round_number)
+        items = score_ranking.top(round_number, limit)
+        if not items:
+            return []
         
-        # 连接参赛者信息
-        results = db.query(
-            Participant,
-            subquery.c.avg_score,
-            subquery.c.score_count
-        ).join(
-            subquery, Participant.id == subquery.c.participant_id
-        ).order_by(subquery.c.avg_score.desc()).all()
+        total_judges = db.query(Judge).filter(Judge.is_active == True).count()
+        participants = db.query(Participant).options(
+            selectinload(Participant.group),
+            selectinload(Participant.score_aggregates)
+        ).filter(Participant.id.in_([pid for pid, _, _ in items])).all()
+        participants_by_id = {p.id: p for p in participants}
         
         ranking = []
-        for rank, (participant, avg_score, score_count) in enumerate(results, 1):
+        for rank, (participant_id, avg_score, score_count) in enumerate(items, 1):
+            participant = participants_by_id.get(participant_id)
+            if participant is None:
+                continue
             ranking.append({
                 "rank": rank,
                 "participant": participant.to_dict(),
-                "average_score": round(float(avg_score), 2),
+                "average_score": round(avg_score, 2),
                 "score_count": score_count,
-                "total_judges": db.query(Judge).filter(Judge.is_active == True).count()
+                "total_judges": total_judges
             })
         
         return ranking
     
+    @staticmethod
+    def get_participant_rank(db: Session, participant_id: int, 
+                            round_number: int = 1) -> Optional[Dict[str, Any]]:
+        """
+        获取单个参赛者的名次
+        
+        Returns:
+            名次信息，该轮暂无评分时返回None
+        """
+        ScoreService.ensure_ranking_loaded(db, round_number)
+        result = score_ranking.rank_of(round_number, participant_id)
+        if result is None:
+            return None
+        
+        rank, avg_score, score_count = result
+        return {
+            "participant_id": participant_id,
+            "round_number": round_number,
+            "rank": rank,
+            "average_score": round(avg_score, 2),
+            "score_count": score_count,
+            "ranked_participants": score_ranking.count(round_number)
+        }
+    
     @staticmethod
     def get_scoring_progress(db: Session, round_number: int = 1) -> Dict[str, Any]:
         """获取评分进度"""
@@ -233,15 +621,21 @@ class ScoreService:
         if not score:
             return False
         
+        round_number, participant_id, judge_id = score.round_number, score.participant_id, score.judge_id
         db.delete(score)
+        ScoreService._log_changes(db, [(participant_id, judge_id, round_number, None)])
+        ScoreService._refresh_aggregates(db, [(participant_id, round_number)])
         db.commit()
+        ScoreService._apply_score_change(round_number, participant_id, judge_id, None, "deleted")
         return True
     
     @staticmethod
     def get_participant_detailed_scores(db: Session, participant_id: int, 
                                        round_number: int = 1) -> Dict[str, Any]:
         """获取参赛者详细评分信息"""
-        participant = db.query(Participant).filter(Participant.id == participant_id).first()
+        participant = db.query(Participant).options(*participant_options()).filter(
+            Participant.id == participant_id
+        ).first()
         if not participant:
             return None
         
@@ -266,36 +660,136 @@ class ScoreService:
             "total_judges": db.query(Judge).filter(Judge.is_active == True).count()
         }
     
+    @staticmethod
+    def build_score_pivot(db: Session, round_numbers: Sequence[int]) -> Dict[str, Any]:
+        """
+        构建 参赛者 × 评委 评分透视表（一条 JOIN 查询取出所选轮次的全部评分）
+        
+        评委列按评委ID排序，所选轮次共用同一组列，多次导出列顺序不变；
+        每轮按 (平均分降序, 参赛者ID) 排名，与实时排名一致。
+        
+        Args:
+            db: 数据库会话
+            round_numbers: 轮次列表
+        
+        Returns:
+            {"judges": [{"id", "name", "column"}],
+             "rounds": {轮次: [{"rank", "participant_id", "name", "organization", "group_name",
+                               "average_score", "score_count", "scores": {评委ID: 分数}}]}}
+        """
+        rows = db.execute(
+            select(
+                Score.round_number,
+                Score.participant_id,
+                Score.judge_id,
+                Score.score,
+                Participant.name,
+                Participant.organization,
+                Group.name,
+                Judge.name,
+                Judge.username
+            )
+            .join(Participant, Score.participant_id == Participant.id)
+            .outerjoin(Group, Participant.group_id == Group.id)
+            .join(Judge, Score.judge_id == Judge.id)
+            .where(Score.round_number.in_(list(round_numbers)))
+            .order_by(Score.round_number, Score.participant_id, Score.judge_id)
+        ).all()
+        
+        judges: Dict[int, Tuple[str, str]] = {}
+        rounds: Dict[int, Dict[int, Dict[str, Any]]] = {round_number: {} for round_number in round_numbers}
+        for (round_number, participant_id, judge_id, score, name, organization,
+             group_name, judge_name, judge_username) in rows:
+            judges[judge_id] = (judge_name, judge_username)
+            entry = rounds[round_number].get(participant_id)
+            if entry is None:
+                entry = rounds[round_number][participant_id] = {
+                    "participant_id": participant_id,
+                    "name": name,
+                    "organization": organization,
+                    "group_name": group_name,
+                    "scores": {}
+                }
+            entry["scores"][judge_id] = score
+        
+        # 评委重名时在列名后附上用户名区分
+        name_counts: Dict[str, int] = {}
+        for judge_name, _ in judges.values():
+            name_counts[judge_name] = name_counts.get(judge_name, 0) + 1
+        judge_columns = [
+            {
+                "id": judge_id,
+                "name": judge_name,
+                "column": f"评委_{judge_name}" if name_counts[judge_name] == 1 else f"评委_{judge_name}({judge_username})"
+            }
+            for judge_id, (judge_name, judge_username) in sorted(judges.items())
+        ]
+        
+        ranked_rounds = {}
+        for round_number, entries in rounds.items():
+            for entry in entries.values():
+                values = entry["scores"].values()
+                entry["score_count"] = len(values)
+                entry["average_score"] = sum(values) / len(values)
+            ranked = sorted(entries.values(), key=lambda e: (-e["average_score"], e["participant_id"]))
+            for rank, entry in enumerate(ranked, 1):
+                entry["rank"] = rank
+                entry["average_score"] = round(entry["average_score"], 2)
+            ranked_rounds[round_number] = ranked
+        
+        return {"judges": judge_columns, "rounds": ranked_rounds}
+    
+    @staticmethod
+    def export_score_table(db: Session, round_numbers: Sequence[int]) -> Tuple[List[str], Dict[int, List[list]]]:
+        """
+        评分导出表格（文件导出用）
+        
+        Returns:
+            (标题行, {轮次: 数据行})，各轮次列相同，没有评分的评委单元格为空
+        """
+        pivot = ScoreService.build_score_pivot(db, round_numbers)
+        judges = pivot["judges"]
+        headers = ["排名", "姓名", "单位", "组别", "平均分", "评分数量"] + [judge["column"] for judge in judges]
+        tables = {
+            round_number: [
+                [
+                    entry["rank"],
+                    entry["name"],
+                    entry["organization"],
+                    entry["group_name"] or "未分组",
+                    entry["average_score"],
+                    entry["score_count"],
+                    *(entry["scores"].get(judge["id"], "") for judge in judges)
+                ]
+                for entry in entries
+            ]
+            for round_number, entries in pivot["rounds"].items()
+        }
+        return headers, tables
+    
     @staticmethod
     def export_scores(db: Session, round_number: int = 1) -> Dict[str, Any]:
         """导出评分数据"""
-        ranking = ScoreService.get_ranking(db, round_number)
+        pivot = ScoreService.build_score_pivot(db, [round_number])
+        judges = pivot["judges"]
         
         export_data = []
-        for item in ranking:
-            participant = item["participant"]
-            
-            # 获取详细评分
-            scores = ScoreService.get_participant_scores(db, participant["id"], round_number)
-            score_details = {}
-            
-            for score in scores:
-                judge_name = score.judge.name
-                score_details[f"评委_{judge_name}"] = score.score
-            
+        for entry in pivot["rounds"][round_number]:
             export_data.append({
-                "排名": item["rank"],
-                "姓名": participant["name"],
-                "单位": participant["organization"],
-                "组别": participant["group_name"] or "未分组",
-                "平均分": item["average_score"],
-                "评分数量": item["score_count"],
-                **score_details
+                "排名": entry["rank"],
+                "姓名": entry["name"],
+                "单位": entry["organization"],
+                "组别": entry["group_name"] or "未分组",
+                "平均分": entry["average_score"],
+                "评分数量": entry["score_count"],
+                **{judge["column"]: entry["scores"][judge["id"]]
+                   for judge in judges if judge["id"] in entry["scores"]}
             })
         
         return {
             "round_number": round_number,
-            "export_time": func.now(),
+            "export_time": datetime.now().isoformat(),
+            "judge_columns": [judge["column"] for judge in judges],
             "total_participants": len(export_data),
             "data": export_data
         }
@@ -329,4 +823,31 @@ class ScoreService:
             "highest_score": max(score_values),
             "lowest_score": min(score_values),
             "score_distribution": score_distribution
-        }
\ No newline at end of file
+        }
+
+
+# 支持 INSERT ... ON CONFLICT DO UPDATE 的方言
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+_SavedScore = namedtuple("_SavedScore", "id participant_id judge_id round_number score")
+
+def _aggregate_statement(*conditions):
+    """按 (参赛者ID, 轮次) 分组统计评分总和、数量、最低分、最高分"""
+    return select(
+        Score.participant_id, Score.round_number,
+        func.sum(Score.score), func.count(Score.id), func.min(Score.score), func.max(Score.score)
+    ).where(*conditions).group_by(Score.participant_id, Score.round_number)
+
+def _batch_error(index: int, message: str, error_code: str) -> Dict[str, Any]:
+    return {"index": index, "success": False, "message": message, "error_code": error_code}
+
+def _batch_summary(success: bool, atomic: bool, success_count: int,
+                   results: List[Dict[str, Any]], errors: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "success": success,
+        "atomic": atomic,
+        "success_count": success_count,
+        "error_count": len(errors),
+        "results": results,
+        "errors": errors
+    }
@@ -0,0 +1,248 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, select
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Dict, Any, Tuple
+from ..models.participant import Participant
+from ..models.judge import Judge
+from ..models.score_sync import ScoreChange, ScoreSyncOp
+from .score_service import ScoreService
+
+# 评分的键：(参赛者ID, 评委ID, 轮次)
+ScoreKey = Tuple[int, int, int]
+
+class ScoreSyncService:
+    """
+    评委离线评分同步服务
+
+    客户端离线时把评分记为操作日志（op_id、参赛者、轮次、分数、客户端时间戳），
+    联网后一次请求上传全部操作并取回游标之后的服务端变更：
+    - 评委已处理过的 op_id 直接返回当时的结果，重试不会重复写入；同一请求中重复的 op_id 只处理第一条
+    - 同一条评分的多次修改按 (client_ts, op_id) 比较，较大者胜出（后写入者胜出），
+      与到达顺序无关，各端最终一致
+    - 变更日志 score_changes 的 seq 作为游标，客户端保存返回的 cursor，下次同步只取增量
+    """
+
+    APPLIED = "applied"
+    STALE = "stale"
+    REJECTED = "rejected"
+
+    # 与并发请求冲突（同一 op_id 被对方先提交）时的最多尝试次数
+    MAX_ATTEMPTS = 3
+
+    @staticmethod
+    def sync(db: Session, judge_id: int, ops: List[Dict[str, Any]], cursor: int = 0) -> Dict[str, Any]:
+        """
+        处理一次同步请求（上传操作 + 拉取变更在同一次调用中完成）
+
+        Args:
+            db: 数据库会话
+            judge_id: 评委ID
+            ops: 操作列表，每项包含 op_id、participant_id、score、client_ts（毫秒），可选 round_number
+            cursor: 客户端上次同步得到的游标
+
+        Returns:
+            {"success", "results": 与 ops 一一对应的处理结果, "changes": 游标之后的评分最新值, "cursor"}
+        """
+        judge = db.execute(select(Judge.is_active).where(Judge.id == judge_id)).first()
+        if judge is None or not judge.is_active:
+            return {
+                "success": False,
+                "message": "评委不存在或已停用",
+                "error_code": "JUDGE_NOT_FOUND"
+            }
+
+        results = ScoreSyncService._apply_ops(db, judge_id, ops) if ops else []
+        changes, new_cursor = ScoreSyncService.get_changes(db, judge_id, cursor)
+        return {
+            "success": True,
+            "results": results,
+            "changes": changes,
+            "cursor": new_cursor
+        }
+
+    @staticmethod
+    def get_changes(db: Session, judge_id: int, cursor: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        获取评委游标之后的评分变更，同一条评分只返回最新值
+
+        Returns:
+            (变更列表, 新游标)
+        """
+        latest: Dict[ScoreKey, ScoreChange] = {}
+        new_cursor = cursor
+        for change in db.query(ScoreChange).filter(
+            and_(ScoreChange.judge_id == judge_id, ScoreChange.seq > cursor)
+        ).order_by(ScoreChange.seq):
+            latest[(change.participant_id, change.judge_id, change.round_number)] = change
+            new_cursor = change.seq
+        return [change.to_dict() for change in latest.values()], new_cursor
+
+    @staticmethod
+    def _apply_ops(db: Session, judge_id: int, ops: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        在一个事务中处理上传的操作，返回与 ops 一一对应的结果
+
+        两个请求同时上传同一个新 op_id 时，后提交的一方违反 score_sync_ops 主键，
+        回滚后重新读取已处理的操作，对方处理过的按重复返回，其余操作重新处理。
+        """
+        op_ids = list(dict.fromkeys(op["op_id"] for op in ops))
+        for attempt in range(ScoreSyncService.MAX_ATTEMPTS):
+            processed = ScoreSyncService._get_processed(db, judge_id, op_ids)
+            # 新操作（同一请求中重复的 op_id 只处理第一条）
+            new_ops: Dict[str, Dict[str, Any]] = {}
+            for op in ops:
+                if op["op_id"] not in processed and op["op_id"] not in new_ops:
+                    new_ops[op["op_id"]] = {**op, "round_number": op.get("round_number", 1)}
+            if not new_ops:
+                new_results, applied = {}, []
+                break
+            try:
+                new_results, applied = ScoreSyncService._write_ops(db, judge_id, new_ops)
+                break
+            except IntegrityError:
+                db.rollback()
+                if attempt == ScoreSyncService.MAX_ATTEMPTS - 1:
+                    raise
+            except Exception:
+                db.rollback()
+                raise
+
+        for key, op, previous_score in applied:
+            if previous_score != op["score"]:
+                action = "created" if previous_score is None else "updated"
+                ScoreService._apply_score_change(key[2], key[0], key[1], op["score"], action)
+
+        # 之前的请求处理过的，以及本请求中第二次及以后出现的 op_id，都标记为重复
+        results = []
+        seen = set()
+        for op in ops:
+            op_id = op["op_id"]
+            result = processed.get(op_id)
+            if result is not None:
+                results.append({**result, "duplicate": True})
+            else:
+                results.append({**new_results[op_id], "duplicate": op_id in seen})
+            seen.add(op_id)
+        return results
+
+    @staticmethod
+    def _get_processed(db: Session, judge_id: int, op_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """评委已处理过的操作结果 {op_id: 结果}"""
+        # 结果在提交前转成字典，提交后对象过期，再访问会逐条重新查询
+        return {
+            record.op_id: record.to_dict()
+            for record in db.query(ScoreSyncOp).filter(
+                ScoreSyncOp.judge_id == judge_id,
+                ScoreSyncOp.op_id.in_(op_ids)
+            )
+        }
+
+    @staticmethod
+    def _write_ops(db: Session, judge_id: int, new_ops: Dict[str, Dict[str, Any]]
+                   ) -> Tuple[Dict[str, Dict[str, Any]], List[Tuple[ScoreKey, Dict[str, Any], Optional[float]]]]:
+        """
+        校验并写入新操作，提交事务
+
+        Returns:
+            ({op_id: 处理结果}, 实际写入的 [(键, 操作, 原评分)])
+        """
+        participant_ids = {op["participant_id"] for op in new_ops.values()}
+        existing_participants = {
+            pid for (pid,) in db.execute(select(Participant.id).where(Participant.id.in_(participant_ids)))
+        }
+
+        records: Dict[str, ScoreSyncOp] = {}
+        # 每条评分在本批中的候选操作，按 (client_ts, op_id) 取最大者
+        winners: Dict[ScoreKey, Dict[str, Any]] = {}
+        for op_id, op in new_ops.items():
+            error_code = None
+            if not ScoreService.is_valid_score(op["score"]):
+                error_code = "INVALID_SCORE_RANGE"
+            elif op["participant_id"] not in existing_participants:
+                error_code = "PARTICIPANT_NOT_FOUND"
+            if error_code:
+                records[op_id] = _op_record(judge_id, op, ScoreSyncService.REJECTED, error_code)
+                continue
+            key = (op["participant_id"], judge_id, op["round_number"])
+            if key not in winners or _version(op) > _version(winners[key]):
+                winners[key] = op
+
+        versions = ScoreSyncService._current_versions(db, list(winners))
+        previous_scores = ScoreService._get_scores_by_key(db, list(winners))
+        applied: List[Tuple[ScoreKey, Dict[str, Any], Optional[float]]] = []
+        for key, op in winners.items():
+            # 变更日志启用前写入的评分没有版本，任何操作都可以覆盖
+            if key not in versions or _version(op) > versions[key]:
+                applied.append((key, op, previous_scores.get(key)))
+        applied_ops = {op["op_id"] for _, op, _ in applied}
+
+        for op_id, op in new_ops.items():
+            if op_id not in records:
+                status = ScoreSyncService.APPLIED if op_id in applied_ops else ScoreSyncService.STALE
+                records[op_id] = _op_record(judge_id, op, status)
+
+        if applied:
+            rows = [
+                {"participant_id": key[0], "judge_id": key[1], "round_number": key[2], "score": op["score"]}
+                for key, op, _ in applied
+            ]
+            ScoreService._upsert_scores(db, rows)
+            seqs = ScoreService._log_changes(db, [
+                (*key, op["score"], op["client_ts"], op["op_id"]) for key, op, _ in applied
+            ])
+            for (_, op, _), seq in zip(applied, seqs):
+                records[op["op_id"]].seq = seq
+            ScoreService._refresh_aggregates(db, [(key[0], key[2]) for key, _, _ in applied])
+
+        db.add_all(records.values())
+        new_results = {op_id: record.to_dict() for op_id, record in records.items()}
+        db.commit()
+        return new_results, applied
+
+    @staticmethod
+    def _current_versions(db: Session, keys: List[ScoreKey]) -> Dict[ScoreKey, tuple]:
+        """
+        查询各评分最新变更的版本 (client_ts, op_id)
+
+        Returns:
+            {键: 版本}，没有变更记录的键不在结果中
+        """
+        if not keys:
+            return {}
+        wanted = set(keys)
+        latest_seq = (
+            select(func.max(ScoreChange.seq))
+            .where(
+                ScoreChange.judge_id.in_({key[1] for key in keys}),
+                ScoreChange.participant_id.in_({key[0] for key in keys}),
+                ScoreChange.round_number.in_({key[2] for key in keys})
+            )
+            .group_by(ScoreChange.participant_id, ScoreChange.judge_id, ScoreChange.round_number)
+        )
+        rows = db.execute(
+            select(
+                ScoreChange.participant_id, ScoreChange.judge_id, ScoreChange.round_number,
+                ScoreChange.client_ts, ScoreChange.op_id
+            ).where(ScoreChange.seq.in_(latest_seq))
+        )
+        return {
+            (pid, jid, round_number): (client_ts, op_id or "")
+            for pid, jid, round_number, client_ts, op_id in rows
+            if (pid, jid, round_number) in wanted
+        }
+
+
+def _version(op: Dict[str, Any]) -> tuple:
+    return op["client_ts"], op["op_id"]
+
+def _op_record(judge_id: int, op: Dict[str, Any], status: str, error_code: str = None) -> ScoreSyncOp:
+    return ScoreSyncOp(
+        op_id=op["op_id"],
+        judge_id=judge_id,
+        participant_id=op["participant_id"],
+        round_number=op["round_number"],
+        score=op["score"],
+        client_ts=op["client_ts"],
+        status=status,
+        error_code=error_code
+    )
@@ -1,12 +1,85 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
-from typing import Dict, Any, List
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, and_, or_, case
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
+from array import array
+import json
+import math
+import struct
+import sys
+from config import settings
 from ..models.participant import Participant
 from ..models.group import Group
 from ..models.judge import Judge
 from ..models.score import Score
+from ..models.score_aggregate import ScoreAggregate
 from ..models.checkin_log import CheckinLog
+from ..cache.data_version import data_version
+from ..cache.snapshot import Snapshot, statistics_snapshots
+from .loader_options import participant_average_scores
+
+class ScoringMatrix:
+    """
+    参赛者×评委评分矩阵
+    
+    values 为按行存放的稠密 double 数组，values[i * 评委数 + j] 是第 i 个参赛者
+    收到第 j 个评委的评分，未评分为 NaN。
+    """
+    
+    # 二进制格式: 魔数 + 版本 + 行数 + 列数 + 标签JSON长度，之后是标签JSON（补齐到4字节）和 float32 矩阵
+    BINARY_MAGIC = b"HMAP"
+    BINARY_VERSION = 1
+    
+    def __init__(self, participants: List[Tuple[int, str, str]], judges: List[Tuple[int, str]],
+                 values: array, round_number: Optional[int] = None):
+        self.participants = participants
+        self.judges = judges
+        self.values = values
+        self.round_number = round_number
+    
+    def row(self, index: int) -> List[Optional[float]]:
+        """第 index 个参赛者的评分（未评分为None）"""
+        width = len(self.judges)
+        return [None if math.isnan(v) else v for v in self.values[index * width:(index + 1) * width]]
+    
+    def to_columnar(self) -> Dict[str, Any]:
+        """列式JSON：标签各成一列，评分按行展开成一维数组"""
+        return {
+            "round_number": self.round_number,
+            "rows": len(self.participants),
+            "cols": len(self.judges),
+            "participant_ids": [p[0] for p in self.participants],
+            "participant_names": [p[1] for p in self.participants],
+            "organizations": [p[2] for p in self.participants],
+            "judge_ids": [j[0] for j in self.judges],
+            "judge_names": [j[1] for j in self.judges],
+            "values": [None if math.isnan(v) else v for v in self.values]
+        }
+    
+    def to_binary(self) -> bytes:
+        """
+        紧凑二进制格式（小端）
+        
+        | 'HMAP' | u32 版本 | u32 行数 | u32 列数 | u32 标签长度 | 标签JSON(UTF-8，补齐到4字节) | float32[行数*列数] |
+        未评分为 NaN，前端可直接用 Float32Array 读取矩阵部分。
+        """
+        labels = json.dumps({
+            "round_number": self.round_number,
+            "participant_ids": [p[0] for p in self.participants],
+            "participant_names": [p[1] for p in self.participants],
+            "judge_ids": [j[0] for j in self.judges],
+            "judge_names": [j[1] for j in self.judges]
+        }, ensure_ascii=False).encode("utf-8")
+        labels += b" " * (-len(labels) % 4)
+        
+        matrix = array("f", self.values)
+        if sys.byteorder != "little":
+            matrix.byteswap()
+        
+        header = self.BINARY_MAGIC + struct.pack(
+            "<IIII", self.BINARY_VERSION, len(self.participants), len(self.judges), len(labels)
+        )
+        return header + labels + matrix.tobytes()
 
 class StatisticsService:
     """统计服务类"""
@@ -29,7 +102,9 @@ class StatisticsService:
         scoring_progress = round(total_scores / expected_scores * 100, 2) if expected_scores > 0 else 0
         
         # 最近签到
-        recent_checkins = db.query(CheckinLog).order_by(
+        recent_checkins = db.query(CheckinLog).options(
+            joinedload(CheckinLog.participant)
+        ).order_by(
             CheckinLog.checkin_time.desc()
         ).limit(10).all()
         
@@ -94,42 +169,47 @@ class StatisticsService:
     
     @staticmethod
     def get_organization_statistics(db: Session) -> List[Dict[str, Any]]:
-        """获取单位统计信息"""
-        # 查询所有单位
-        organizations = db.query(Participant.organization).distinct().all()
+        """获取单位统计信息（固定三次分组查询，与单位数量无关）"""
+        checked_in = func.sum(case((Participant.is_checked_in == True, 1), else_=0))
+        
+        # 各单位总人数、已签到人数
+        org_counts = db.query(
+            Participant.organization,
+            func.count(Participant.id),
+            checked_in
+        ).group_by(Participant.organization).all()
+        
+        # 各单位平均分（全部评分的平均，由评分汇总计算）
+        org_avg_scores = {
+            org: score_sum / score_count
+            for org, score_sum, score_count in db.query(
+                Participant.organization,
+                func.sum(ScoreAggregate.score_sum),
+                func.sum(ScoreAggregate.score_count)
+            ).join(
+                ScoreAggregate, ScoreAggregate.participant_id == Participant.id
+            ).group_by(Participant.organization)
+        }
+        
+        # 各单位所在的组
+        org_groups: Dict[str, List[str]] = {}
+        for org, group_name in db.query(Participant.organization, Group.name).join(
+            Group, Group.id == Participant.group_id
+        ).distinct().order_by(Participant.organization, Group.name):
+            org_groups.setdefault(org, []).append(group_name)
         
         org_stats = []
-        for (org,) in organizations:
-            # 该单位总人数
-            total_count = db.query(Participant).filter(Participant.organization == org).count()
-            
-            # 已签到人数
-            checked_in_count = db.query(Participant).filter(
-                and_(Participant.organization == org, Participant.is_checked_in == True)
-            ).count()
-            
-            # 平均分统计
-            avg_score_query = db.query(func.avg(Score.score)).join(
-                Participant, Score.participant_id == Participant.id
-            ).filter(Participant.organization == org)
-            
-            avg_score = avg_score_query.scalar()
-            avg_score = round(float(avg_score), 2) if avg_score else 0
-            
-            # 该单位所在的组
-            groups = db.query(Group.name).join(
-                Participant, Group.id == Participant.group_id
-            ).filter(Participant.organization == org).distinct().all()
-            
-            group_names = [group[0] for group in groups]
+        for org, total_count, checked_in_count in org_counts:
+            checked_in_count = checked_in_count or 0
+            avg_score = org_avg_scores.get(org)
             
             org_stats.append({
                 "organization": org,
                 "total_participants": total_count,
                 "checked_in_participants": checked_in_count,
                 "checkin_rate": round(checked_in_count / total_count * 100, 2) if total_count > 0 else 0,
-                "average_score": avg_score,
-                "groups": group_names
+                "average_score": round(float(avg_score), 2) if avg_score else 0,
+                "groups": org_groups.get(org, [])
             })
         
         # 按签到率排序
@@ -139,40 +219,54 @@ class StatisticsService:
     
     @staticmethod
     def get_group_statistics(db: Session) -> List[Dict[str, Any]]:
-        """获取分组统计信息"""
-        groups = db.query(Group).all()
+        """获取分组统计信息（固定四次查询，与分组和成员数量无关）"""
+        groups = db.query(Group.id, Group.name, Group.draw_order).all()
+        
+        # 各组人数、已签到人数
+        member_counts = {
+            group_id: (total, checked_in or 0)
+            for group_id, total, checked_in in db.query(
+                Participant.group_id,
+                func.count(Participant.id),
+                func.sum(case((Participant.is_checked_in == True, 1), else_=0))
+            ).filter(Participant.group_id.isnot(None)).group_by(Participant.group_id)
+        }
+        
+        # 组平均分 = 组内有评分成员的个人平均分的平均
+        member_avg = participant_average_scores()
+        group_scores = {
+            group_id: (avg_score, scored_members)
+            for group_id, avg_score, scored_members in db.query(
+                Participant.group_id,
+                func.avg(member_avg.c.average_score),
+                func.count(member_avg.c.participant_id)
+            ).join(
+                member_avg, member_avg.c.participant_id == Participant.id
+            ).filter(Participant.group_id.isnot(None)).group_by(Participant.group_id)
+        }
+        
+        # 各组包含的单位
+        group_orgs: Dict[int, List[str]] = {}
+        for group_id, org in db.query(Participant.group_id, Participant.organization).filter(
+            Participant.group_id.isnot(None)
+        ).distinct().order_by(Participant.group_id, Participant.organization):
+            group_orgs.setdefault(group_id, []).append(org)
         
         group_stats = []
-        for group in groups:
-            # 组内成员
-            members = db.query(Participant).filter(Participant.group_id == group.id).all()
-            
-            # 签到统计
-            checked_in_members = [m for m in members if m.is_checked_in]
-            
-            # 评分统计
-            group_scores = []
-            for member in members:
-                member_scores = db.query(Score).filter(Score.participant_id == member.id).all()
-                if member_scores:
-                    avg_score = sum(s.score for s in member_scores) / len(member_scores)
-                    group_scores.append(avg_score)
-            
-            group_avg_score = round(sum(group_scores) / len(group_scores), 2) if group_scores else 0
-            
-            # 单位统计
-            organizations = list(set([m.organization for m in members]))
+        for group_id, group_name, draw_order in groups:
+            total_members, checked_in_members = member_counts.get(group_id, (0, 0))
+            group_avg_score, scored_members = group_scores.get(group_id, (None, 0))
             
             group_stats.append({
-                "group_id": group.id,
-                "group_name": group.name,
-                "draw_order": group.draw_order,
-                "total_members": len(members),
-                "checked_in_members": len(checked_in_members),
-                "checkin_rate": round(len(checked_in_members) / len(members) * 100, 2) if members else 0,
-                "average_score": group_avg_score,
-                "organizations": organizations,
-                "scored_members": len(group_scores)
+                "group_id": group_id,
+                "group_name": group_name,
+                "draw_order": draw_order,
+                "total_members": total_members,
+                "checked_in_members": checked_in_members,
+                "checkin_rate": round(checked_in_members / total_members * 100, 2) if total_members else 0,
+                "average_score": round(float(group_avg_score), 2) if group_avg_score is not None else 0,
+                "organizations": group_orgs.get(group_id, []),
+                "scored_members": scored_members
             })
         
         # 按抽签顺序排序
@@ -181,35 +275,63 @@ class StatisticsService:
         return group_stats
     
     @staticmethod
-    def get_scoring_heatmap(db: Session) -> Dict[str, Any]:
+    def build_scoring_matrix(db: Session, round_number: Optional[int] = None) -> ScoringMatrix:
+        """
+        构建参赛者×评委评分矩阵（参赛者、评委、评分各查询一次）
+        
+        Args:
+            db: 数据库会话
+            round_number: 轮次；None 表示不区分轮次，取每对参赛者/评委轮次最小的评分
+        
+        Returns:
+            评分矩阵（只包含激活的评委）
+        """
+        participants = db.query(
+            Participant.id, Participant.name, Participant.organization
+        ).order_by(Participant.id).all()
+        judges = db.query(Judge.id, Judge.name).filter(
+            Judge.is_active == True
+        ).order_by(Judge.id).all()
+        
+        row_of = {p.id: i for i, p in enumerate(participants)}
+        col_of = {j.id: i for i, j in enumerate(judges)}
+        width = len(judges)
+        values = array("d", [math.nan]) * (len(participants) * width)
+        
+        query = db.query(Score.participant_id, Score.judge_id, Score.score)
+        if round_number is not None:
+            query = query.filter(Score.round_number == round_number)
+        else:
+            # 倒序遍历，同一格子最后写入的就是轮次最小的评分
+            query = query.order_by(Score.round_number.desc(), Score.id.desc())
+        
+        for participant_id, judge_id, score in query:
+            row = row_of.get(participant_id)
+            col = col_of.get(judge_id)
+            if row is not None and col is not None:
+                values[row * width + col] = score
+        
+        return ScoringMatrix(
+            [tuple(p) for p in participants], [tuple(j) for j in judges], values, round_number
+        )
+    
+    @staticmethod
+    def get_scoring_heatmap(db: Session, round_number: Optional[int] = None) -> Dict[str, Any]:
         """获取评分热力图数据"""
-        # 获取所有评分
-        scores = db.query(Score).join(Participant).join(Judge).all()
-        
-        # 构建评分矩阵
-        participants = db.query(Participant).all()
-        judges = db.query(Judge).filter(Judge.is_active == True).all()
+        matrix = StatisticsService.build_scoring_matrix(db, round_number)
+        judge_names = [name for _, name in matrix.judges]
         
         heatmap_data = []
-        for participant in participants:
-            participant_scores = {}
-            for judge in judges:
-                # 查找该评委对该参赛者的评分
-                score = db.query(Score).filter(
-                    and_(Score.participant_id == participant.id, Score.judge_id == judge.id)
-                ).first()
-                
-                participant_scores[judge.name] = score.score if score else None
-            
+        for i, (_, name, organization) in enumerate(matrix.participants):
             heatmap_data.append({
-                "participant_name": participant.name,
-                "organization": participant.organization,
-                "scores": participant_scores
+                "participant_name": name,
+                "organization": organization,
+                "scores": dict(zip(judge_names, matrix.row(i)))
             })
         
         return {
-            "participants": [p.name for p in participants],
-            "judges": [j.name for j in judges],
+            "participants": [p[1] for p in matrix.participants],
+            "judges": judge_names,
             "data": heatmap_data
         }
     
@@ -264,14 +386,15 @@ class StatisticsService:
         expected_scores = total_participants * total_judges
         
         # 获奖统计（前三名）
+        averages = participant_average_scores()
         ranking = db.query(
             Participant.id,
             Participant.name,
             Participant.organization,
-            func.avg(Score.score).label('avg_score')
-        ).join(Score).group_by(
-            Participant.id, Participant.name, Participant.organization
-        ).order_by(func.avg(Score.score).desc()).limit(3).all()
+            averages.c.average_score
+        ).join(
+            averages, averages.c.participant_id == Participant.id
+        ).order_by(averages.c.average_score.desc()).limit(3).all()
         
         winners = []
         for rank, (p_id, name, org, avg_score) in enumerate(ranking, 1):
@@ -283,9 +406,7 @@ class StatisticsService:
             })
         
         # 分数分布
-        all_avg_scores = db.query(
-            func.avg(Score.score).label('avg_score')
-        ).join(Participant).group_by(Participant.id).all()
+        all_avg_scores = db.query(averages.c.average_score).all()
         
         score_ranges = {
             "9-10分": 0,
@@ -330,13 +451,44 @@ class StatisticsService:
             "score_distribution": score_ranges
         }
     
+    @staticmethod
+    def get_cached_snapshot(name: str) -> Optional[Snapshot]:
+        """
+        获取仍然有效的统计快照（不访问数据库）
+        
+        Args:
+            name: 快照名称，见 SNAPSHOT_BUILDERS
+        
+        Returns:
+            快照；尚未生成或数据已变化时返回None
+        """
+        return statistics_snapshots.get(name, data_version.value, settings.stats_snapshot_ttl)
+    
+    @staticmethod
+    def get_snapshot(db: Session, name: str) -> Snapshot:
+        """获取统计快照，数据版本变化后才重新计算"""
+        # 先取版本再计算：计算期间发生的写入会让下次请求重新计算
+        version = data_version.value
+        snapshot = statistics_snapshots.get(name, version, settings.stats_snapshot_ttl)
+        if snapshot is None:
+            snapshot = statistics_snapshots.put(name, version, SNAPSHOT_BUILDERS[name](db))
+        return snapshot
+    
     @staticmethod
     def export_full_report(db: Session) -> Dict[str, Any]:
-        """导出完整报告"""
+        """导出完整报告（复用统计快照）"""
         return {
-            "dashboard": StatisticsService.get_dashboard_statistics(db),
-            "organizations": StatisticsService.get_organization_statistics(db),
-            "groups": StatisticsService.get_group_statistics(db),
-            "summary": StatisticsService.get_competition_summary(db),
+            "dashboard": StatisticsService.get_snapshot(db, "dashboard").data,
+            "organizations": StatisticsService.get_snapshot(db, "organizations").data,
+            "groups": StatisticsService.get_snapshot(db, "groups").data,
+            "summary": StatisticsService.get_snapshot(db, "summary").data,
             "export_time": datetime.now().isoformat()
-        }
\ No newline at end of file
+        }
+
+# 可物化的统计（结果只取决于数据，与当前时间无关）
+SNAPSHOT_BUILDERS = {
+    "dashboard": StatisticsService.get_dashboard_statistics,
+    "organizations": StatisticsService.get_organization_statistics,
+    "groups": StatisticsService.get_group_statistics,
+    "summary": StatisticsService.get_competition_summary
+}
\ No newline at end of file
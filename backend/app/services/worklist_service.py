@@ -0,0 +1,89 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, select
+from typing import List, Dict, Any
+from ..models.participant import Participant
+from ..models.score import Score
+from .loader_options import participant_options
+
+class WorklistService:
+    """
+    评委待评分列表服务
+
+    "未评分"用 NOT EXISTS 反连接表示：按出场顺序扫描参赛者，
+    每行用唯一约束 unique_score_per_round (participant_id, judge_id, round_number) 做一次索引探测，
+    凑够 limit 个就停止，不需要把参赛者或评分全部读出来。
+    出场顺序按参赛者ID（即导入/报名顺序）。
+    """
+
+    @staticmethod
+    def _pool_filter(checked_in_only: bool) -> list:
+        return [Participant.is_checked_in == True] if checked_in_only else []
+
+    @staticmethod
+    def _unscored(judge_id: int, round_number: int):
+        return ~select(Score.id).where(
+            and_(
+                Score.participant_id == Participant.id,
+                Score.judge_id == judge_id,
+                Score.round_number == round_number
+            )
+        ).exists()
+
+    @staticmethod
+    def get_next_participants(db: Session, judge_id: int, round_number: int = 1,
+                              limit: int = 1, checked_in_only: bool = False) -> List[Participant]:
+        """
+        按出场顺序获取评委接下来需要评分的参赛者
+
+        Args:
+            db: 数据库会话
+            judge_id: 评委ID
+            round_number: 轮次
+            limit: 返回数量
+            checked_in_only: 只包含已签到的参赛者
+        """
+        return db.query(Participant).options(*participant_options()).filter(
+            *WorklistService._pool_filter(checked_in_only),
+            WorklistService._unscored(judge_id, round_number)
+        ).order_by(Participant.id).limit(limit).all()
+
+    @staticmethod
+    def get_counts(db: Session, judge_id: int, round_number: int = 1,
+                   checked_in_only: bool = False) -> Dict[str, Any]:
+        """
+        评委评分进度（一条查询，两个计数均走索引）
+
+        Returns:
+            {"total_participants", "scored_participants", "remaining_participants", "completion_rate"}
+        """
+        pool_filter = WorklistService._pool_filter(checked_in_only)
+        total_query = select(func.count(Participant.id)).where(*pool_filter).scalar_subquery()
+        scored_query = select(func.count(Score.id)).join(
+            Participant, Score.participant_id == Participant.id
+        ).where(
+            Score.judge_id == judge_id,
+            Score.round_number == round_number,
+            *pool_filter
+        ).scalar_subquery()
+        total, scored = db.execute(select(total_query, scored_query)).one()
+
+        return {
+            "total_participants": total,
+            "scored_participants": scored,
+            "remaining_participants": total - scored,
+            "completion_rate": round(scored / total * 100, 2) if total > 0 else 0
+        }
+
+    @staticmethod
+    def get_worklist(db: Session, judge_id: int, round_number: int = 1,
+                     limit: int = 10, checked_in_only: bool = True) -> Dict[str, Any]:
+        """获取评委待评分列表（前 limit 个）和评分进度，默认只包含已签到的参赛者"""
+        participants = WorklistService.get_next_participants(
+            db, judge_id, round_number, limit, checked_in_only
+        )
+        return {
+            "judge_id": judge_id,
+            "round_number": round_number,
+            "participants": [participant.to_dict() for participant in participants],
+            **WorklistService.get_counts(db, judge_id, round_number, checked_in_only)
+        }
@@ -0,0 +1,48 @@
+# 可替换的存储后端与共享服务层
+# simple_app / app_fixed 通过 create_storage 选择后端，业务逻辑统一在 services 中实现。
+# 存储后端只依赖标准库，不依赖 SQLAlchemy；services 需要单独导入（from app.storage import services）。
+
+import os
+from typing import Optional
+from .base import Storage, StorageError, DuplicateKeyError
+from .records import Record, RecordView, record_type
+from .schema import TableSchema, SCHEMAS
+from .memory import IndexedTable, MemoryStorage
+from .log import LogStorage
+from .sqlite import SQLiteStorage
+
+STORAGE_BACKENDS = ("memory", "log", "sqlite")
+_FILE_SUFFIXES = {"log": ".log", "sqlite": ".db"}
+
+
+def create_storage(backend: str = "memory", path: Optional[str] = None,
+                   name: str = "data", data_dir: str = "./data",
+                   fsync: bool = False, compact_threshold: int = 10000) -> Storage:
+    """
+    创建存储后端
+
+    Args:
+        backend: memory（内存，重启后丢失）、log（内存 + 追加日志）、sqlite
+        path: 数据文件路径，为空时使用 {data_dir}/{name}.log 或 .db
+        name: 默认数据文件名
+        data_dir: 默认数据目录
+        fsync: 每次写入都同步到磁盘（log、sqlite 有效）
+        compact_threshold: log 后端触发快照压缩的最少日志条数
+    """
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"不支持的存储后端: {backend}，可选值: {', '.join(STORAGE_BACKENDS)}")
+    if backend == "memory":
+        return MemoryStorage()
+    path = path or os.path.join(data_dir, name + _FILE_SUFFIXES[backend])
+    if backend == "log":
+        return LogStorage(path, fsync=fsync, compact_threshold=compact_threshold)
+    return SQLiteStorage(path, fsync=fsync)
+
+
+__all__ = [
+    "Storage", "StorageError", "DuplicateKeyError",
+    "Record", "RecordView", "record_type",
+    "TableSchema", "SCHEMAS",
+    "IndexedTable", "MemoryStorage", "LogStorage", "SQLiteStorage",
+    "STORAGE_BACKENDS", "create_storage"
+]
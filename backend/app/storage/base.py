@@ -0,0 +1,93 @@
+from typing import Any, Dict, List, Optional
+from .records import Record
+
+
+class StorageError(Exception):
+    """存储层错误"""
+
+
+class DuplicateKeyError(StorageError):
+    """写入的记录与已有记录的唯一键冲突"""
+
+    def __init__(self, table: str, key: tuple, value: tuple):
+        super().__init__(f"表 {table} 的唯一键 {key} 已存在值 {value}")
+        self.table = table
+        self.key = key
+        self.value = value
+
+
+class Storage:
+    """
+    存储后端接口
+
+    记录是只读的 Record（Mapping，可以像字典一样读取），主键为 id；查询条件是字段等值匹配，结果按 id 升序。
+    返回的记录不会被后续写入修改（更新时换成新对象），需要可修改的字典时用 record.to_dict()，
+    写入必须通过 insert / update / delete。
+    可选后端：memory（内存索引）、log（内存 + 追加日志持久化）、sqlite。
+    """
+
+    def get(self, table: str, record_id: int) -> Optional[Record]:
+        """按主键获取记录"""
+        raise NotImplementedError
+
+    def find(self, table: str, **criteria) -> List[Record]:
+        """获取字段值全部等于 criteria 的记录，不给条件时返回全表"""
+        raise NotImplementedError
+
+    def find_one(self, table: str, **criteria) -> Optional[Record]:
+        """获取第一条匹配的记录"""
+        rows = self.find(table, **criteria)
+        return rows[0] if rows else None
+
+    def count(self, table: str, **criteria) -> int:
+        """统计匹配的记录数"""
+        return len(self.find(table, **criteria))
+
+    def insert(self, table: str, values: Dict[str, Any]) -> Record:
+        """
+        新增记录
+
+        Args:
+            table: 表名
+            values: 字段值，不含 id 时自动分配
+
+        Returns:
+            保存后的完整记录
+
+        Raises:
+            DuplicateKeyError: 唯一键冲突
+        """
+        raise NotImplementedError
+
+    def update(self, table: str, record_id: int, values: Dict[str, Any],
+               expect: Optional[Dict[str, Any]] = None) -> Optional[Record]:
+        """
+        修改记录
+
+        Args:
+            expect: 条件更新，当前值与之全部相等时才修改（用于"未签到才能签到"这类原子判断）
+
+        Returns:
+            修改后的记录；记录不存在或不满足 expect 时返回 None
+
+        Raises:
+            DuplicateKeyError: 唯一键冲突
+        """
+        raise NotImplementedError
+
+    def delete(self, table: str, record_id: int) -> bool:
+        """删除记录，记录不存在时返回 False"""
+        raise NotImplementedError
+
+    def is_empty(self) -> bool:
+        """所有表都没有数据（用于判断是否需要初始化示例数据）"""
+        raise NotImplementedError
+
+    def close(self):
+        """释放文件、连接等资源"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,196 @@
+import json
+import os
+from typing import Any, Dict, Optional
+from .base import StorageError
+from .memory import MemoryStorage
+from .records import Record
+from .schema import TableSchema
+
+
+class LogStorage(MemoryStorage):
+    """
+    追加日志（预写日志 + 快照）存储后端
+
+    数据常驻内存（查询与 MemoryStorage 相同）。每次写入先在日志末尾追加一行紧凑的 JSON，再修改内存：
+        {"seq": 1, "op": "insert", "table": ..., "row": {...}}
+        {"seq": 2, "op": "update", "table": ..., "id": ..., "changes": {...}}
+        {"seq": 3, "op": "delete", "table": ..., "id": ...}
+    单次写入只追加一行，开销与数据总量无关。
+
+    日志条数达到 max(compact_threshold, 当前记录总数) 时压缩：全部数据写入临时文件，
+    fsync 后原子地重命名为快照文件（{path}.snapshot），再清空日志。
+    每次压缩的开销与数据量成正比，但两次压缩之间至少有同样多次写入，均摊仍是 O(1)。
+
+    启动时加载快照，再重放日志中 seq 大于快照的记录：
+    - 快照替换后、日志清空前崩溃：日志中的旧记录 seq 不大于快照，重放时跳过
+    - 日志末尾只写了一半的记录（进程或机器在写入中途崩溃）：丢弃并截断
+    - 日志中间的记录损坏：不是崩溃能造成的，直接报错，避免静默丢数据
+    """
+
+    def __init__(self, path: str, schemas: Dict[str, TableSchema] = None,
+                 fsync: bool = False, compact_threshold: int = 10000):
+        """
+        Args:
+            path: 日志文件路径
+            fsync: 每次写入后 fsync（断电也不丢已返回的写入，但写入明显变慢）；
+                   为 False 时只保证进程崩溃不丢数据
+            compact_threshold: 触发压缩的最少日志条数
+        """
+        super().__init__(schemas)
+        self.path = path
+        self.snapshot_path = path + ".snapshot"
+        self.fsync = fsync
+        self.compact_threshold = compact_threshold
+        self._seq = 0
+        self._journal_entries = 0
+        self._file = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._load_snapshot()
+        self._replay()
+        self._file = open(path, "a", encoding="utf-8")
+        self._maybe_compact()
+
+    @property
+    def journal_entries(self) -> int:
+        """上次压缩以来的日志条数"""
+        return self._journal_entries
+
+    def _load_snapshot(self):
+        # 压缩中途崩溃留下的临时文件，快照本身仍是完整的旧版本
+        if os.path.exists(self.snapshot_path + ".tmp"):
+            os.remove(self.snapshot_path + ".tmp")
+        if not os.path.exists(self.snapshot_path):
+            return
+        with open(self.snapshot_path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        self._seq = snapshot["seq"]
+        for name, content in snapshot["tables"].items():
+            memory_table = self._table(name)
+            for row in content["rows"]:
+                memory_table.add(memory_table.schema.record_type(row))
+            memory_table.next_id = max(memory_table.next_id, content["next_id"])
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        valid_size = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                entry = _parse_line(line)
+                if entry is None:
+                    if f.read(1):
+                        raise StorageError(f"日志文件损坏: {self.path}，偏移 {valid_size}")
+                    break
+                valid_size += len(line)
+                # 早期版本的日志没有 seq，按顺序编号
+                seq = entry.get("seq", self._seq + 1)
+                if seq > self._seq:
+                    self._apply(entry)
+                    self._seq = seq
+                    self._journal_entries += 1
+        if valid_size < os.path.getsize(self.path):
+            # 截掉写了一半的尾部，后续追加从完整记录之后开始
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_size)
+
+    def _apply(self, entry: Dict[str, Any]):
+        op = entry["op"]
+        if op == "insert":
+            record_type = self._table(entry["table"]).schema.record_type
+            super()._apply_insert(entry["table"], record_type(entry["row"]))
+        elif op == "update":
+            super()._apply_update(entry["table"], entry["id"], entry["changes"])
+        elif op == "delete":
+            super()._apply_delete(entry["table"], entry["id"])
+
+    def _append(self, entry: Dict[str, Any]):
+        # 调用方已持有存储锁；先写日志再改内存
+        self._seq += 1
+        line = json.dumps({"seq": self._seq, **entry}, ensure_ascii=False, separators=(",", ":"))
+        self._file.write(line + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._journal_entries += 1
+
+    def _apply_insert(self, table: str, record: Record):
+        self._append({"op": "insert", "table": table, "row": record.to_dict()})
+        super()._apply_insert(table, record)
+        self._maybe_compact()
+
+    def _apply_update(self, table: str, record_id: int, changes: Dict[str, Any]):
+        self._append({"op": "update", "table": table, "id": record_id, "changes": changes})
+        super()._apply_update(table, record_id, changes)
+        self._maybe_compact()
+
+    def _apply_delete(self, table: str, record_id: int):
+        self._append({"op": "delete", "table": table, "id": record_id})
+        super()._apply_delete(table, record_id)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        total_rows = sum(len(memory_table.rows) for memory_table in self._tables.values())
+        if self._journal_entries >= max(self.compact_threshold, total_rows):
+            self.compact()
+
+    def compact(self):
+        """把当前数据写成快照并清空日志"""
+        with self._lock:
+            snapshot = {
+                "seq": self._seq,
+                "tables": {
+                    name: {
+                        "next_id": memory_table.next_id,
+                        "rows": [record.to_dict() for record in memory_table.rows.values()]
+                    }
+                    for name, memory_table in self._tables.items()
+                }
+            }
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            _fsync_directory(os.path.dirname(self.snapshot_path))
+
+            # 快照已包含日志中的全部记录；清空日志前崩溃也没关系，重放时会跳过这些记录
+            self._file.close()
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._journal_entries = 0
+
+    def close(self):
+        if self._file is None or self._file.closed:
+            return
+        with self._lock:
+            if self._journal_entries:
+                self.compact()
+            self._file.close()
+
+
+def _parse_line(line: bytes) -> Optional[Dict[str, Any]]:
+    """解析一行日志，不完整或无法解析时返回 None"""
+    if not line.endswith(b"\n"):
+        return None
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    return entry if isinstance(entry, dict) and "op" in entry else None
+
+
+def _fsync_directory(directory: str):
+    # 让重命名本身落盘；部分平台（如 Windows）不支持对目录 fsync
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,198 @@
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from .base import Storage, StorageError, DuplicateKeyError
+from .records import Record
+from .schema import TableSchema, SCHEMAS
+
+
+class IndexedTable:
+    """
+    带索引的内存表
+
+    - 主键索引：rows {id: 记录}
+    - 唯一索引：{键值: id}，写入前检查冲突；与 SQL 一致，含空值的键不参与唯一约束
+    - 二级索引：{键值: 升序的 id 列表}，用于 group_id、(phone_last4, name) 这类非唯一条件
+    每次 add / change / remove 同步维护全部索引，修改时只更新涉及被改字段的索引。
+    查询时优先使用主键，其次唯一索引，再次覆盖字段最多的二级索引，都不匹配时才顺序扫描。
+    """
+
+    def __init__(self, schema: TableSchema):
+        self.schema = schema
+        self.rows: Dict[int, Record] = {}
+        self.unique: Dict[Tuple[str, ...], Dict[tuple, int]] = {key: {} for key in schema.unique}
+        self.secondary: Dict[Tuple[str, ...], Dict[tuple, List[int]]] = {key: {} for key in schema.indexes}
+        self.next_id = 1
+
+    def check_unique(self, row: Dict[str, Any], record_id: int = None):
+        for key, index in self.unique.items():
+            value = self.schema.key_of(key, row)
+            if None in value:
+                continue
+            owner = index.get(value)
+            if owner is not None and owner != record_id:
+                raise DuplicateKeyError(self.schema.name, key, value)
+
+    def add(self, row: Record):
+        self.rows[row["id"]] = row
+        self.next_id = max(self.next_id, row["id"] + 1)
+        self._index(row, self.unique, self.secondary)
+
+    def change(self, record_id: int, changes: Dict[str, Any]):
+        # 记录是只读的，换成新对象（已返回给调用方的旧对象保持不变）；替换已有键不改变 rows 的顺序
+        row = self.rows[record_id]
+        unique = {key: index for key, index in self.unique.items() if not changes.keys().isdisjoint(key)}
+        secondary = {key: index for key, index in self.secondary.items() if not changes.keys().isdisjoint(key)}
+        self._unindex(row, unique, secondary)
+        row = self.rows[record_id] = row.replace(changes)
+        self._index(row, unique, secondary)
+
+    def remove(self, record_id: int) -> Optional[Record]:
+        row = self.rows.pop(record_id, None)
+        if row is not None:
+            self._unindex(row, self.unique, self.secondary)
+        return row
+
+    def _index(self, row: Record, unique: dict, secondary: dict):
+        record_id = row["id"]
+        for key, index in unique.items():
+            value = self.schema.key_of(key, row)
+            if None not in value:
+                index[value] = record_id
+        for key, index in secondary.items():
+            bucket = index.setdefault(self.schema.key_of(key, row), [])
+            if not bucket or bucket[-1] < record_id:
+                bucket.append(record_id)
+            else:
+                bisect.insort(bucket, record_id)
+
+    def _unindex(self, row: Record, unique: dict, secondary: dict):
+        record_id = row["id"]
+        for key, index in unique.items():
+            value = self.schema.key_of(key, row)
+            if index.get(value) == record_id:
+                del index[value]
+        for key, index in secondary.items():
+            value = self.schema.key_of(key, row)
+            bucket = index.get(value)
+            if bucket:
+                position = bisect.bisect_left(bucket, record_id)
+                if position < len(bucket) and bucket[position] == record_id:
+                    del bucket[position]
+                if not bucket:
+                    del index[value]
+
+    def candidate_ids(self, criteria: Dict[str, Any]) -> Optional[List[int]]:
+        """
+        用索引缩小查找范围
+
+        Returns:
+            候选记录ID（升序），没有可用索引时返回 None
+        """
+        if "id" in criteria:
+            return [criteria["id"]] if criteria["id"] in self.rows else []
+        for key, index in self.unique.items():
+            if criteria.keys() >= set(key):
+                value = tuple(criteria[name] for name in key)
+                if None not in value:
+                    record_id = index.get(value)
+                    return [record_id] if record_id is not None else []
+        best = None
+        for key in self.secondary:
+            if criteria.keys() >= set(key) and (best is None or len(key) > len(best)):
+                best = key
+        if best is None:
+            return None
+        return self.secondary[best].get(tuple(criteria[name] for name in best), [])
+
+    def lookup(self, criteria: Dict[str, Any]) -> List[Record]:
+        """按条件查找"""
+        ids = self.candidate_ids(criteria)
+        candidates = self.rows.values() if ids is None else [self.rows[record_id] for record_id in ids]
+        return [
+            row for row in candidates
+            if all(row.get(name) == value for name, value in criteria.items())
+        ]
+
+
+class MemoryStorage(Storage):
+    """
+    内存存储后端
+
+    每张表是一个 IndexedTable，表结构中声明了唯一键或二级索引的条件查询不扫描全表。
+    进程退出后数据丢失，适合演示和测试；需要持久化时使用 LogStorage 或 SQLiteStorage。
+    """
+
+    def __init__(self, schemas: Dict[str, TableSchema] = None):
+        self._lock = threading.RLock()
+        self._tables = {name: IndexedTable(schema) for name, schema in (schemas or SCHEMAS).items()}
+
+    def _table(self, table: str) -> IndexedTable:
+        try:
+            return self._tables[table]
+        except KeyError:
+            raise StorageError(f"表不存在: {table}")
+
+    def get(self, table: str, record_id: int) -> Optional[Record]:
+        return self._table(table).rows.get(record_id)
+
+    def find(self, table: str, **criteria) -> List[Record]:
+        memory_table = self._table(table)
+        memory_table.schema.check_fields(criteria)
+        with self._lock:
+            return memory_table.lookup(criteria)
+
+    def count(self, table: str, **criteria) -> int:
+        memory_table = self._table(table)
+        if not criteria:
+            return len(memory_table.rows)
+        memory_table.schema.check_fields(criteria)
+        with self._lock:
+            return len(memory_table.lookup(criteria))
+
+    def insert(self, table: str, values: Dict[str, Any]) -> Record:
+        memory_table = self._table(table)
+        row = memory_table.schema.new_row(values)
+        with self._lock:
+            record = memory_table.schema.record_type({"id": values.get("id") or memory_table.next_id, **row})
+            if record["id"] in memory_table.rows:
+                raise DuplicateKeyError(table, ("id",), (record["id"],))
+            memory_table.check_unique(record)
+            self._apply_insert(table, record)
+            return record
+
+    def update(self, table: str, record_id: int, values: Dict[str, Any],
+               expect: Optional[Dict[str, Any]] = None) -> Optional[Record]:
+        memory_table = self._table(table)
+        changes = memory_table.schema.changes(values)
+        with self._lock:
+            row = memory_table.rows.get(record_id)
+            if row is None:
+                return None
+            if expect and any(row.get(name) != value for name, value in expect.items()):
+                return None
+            memory_table.check_unique({**row, **changes}, record_id)
+            self._apply_update(table, record_id, changes)
+            return memory_table.rows[record_id]
+
+    def delete(self, table: str, record_id: int) -> bool:
+        memory_table = self._table(table)
+        with self._lock:
+            if record_id not in memory_table.rows:
+                return False
+            self._apply_delete(table, record_id)
+            return True
+
+    def is_empty(self) -> bool:
+        return not any(memory_table.rows for memory_table in self._tables.values())
+
+    # 以下方法直接修改内存数据，不做校验；LogStorage 重放日志时也调用它们
+
+    def _apply_insert(self, table: str, record: Record):
+        self._tables[table].add(record)
+
+    def _apply_update(self, table: str, record_id: int, changes: Dict[str, Any]):
+        self._tables[table].change(record_id, changes)
+
+    def _apply_delete(self, table: str, record_id: int):
+        self._tables[table].remove(record_id)
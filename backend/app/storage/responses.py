@@ -0,0 +1,25 @@
+import json
+from typing import Any
+from fastapi.responses import JSONResponse
+from .records import json_default
+
+# 依赖 FastAPI，不在 app.storage 的 __init__ 中导入，存储后端仍只依赖标准库。
+
+
+class RecordJSONResponse(JSONResponse):
+    """
+    直接序列化服务层结果（含 Record / RecordView）的 JSON 响应
+
+    路由返回普通对象时，FastAPI 先用 jsonable_encoder 逐字段递归复制一遍再序列化，
+    上千条记录的列表大部分时间花在这一步。服务层结果只包含 JSON 基本类型和记录，
+    可以跳过这一步直接交给 json.dumps。路由用 response_class 或直接返回该响应即可。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+            default=json_default
+        ).encode("utf-8")
@@ -0,0 +1,136 @@
+from datetime import datetime
+from typing import Any, Dict, Sequence, Tuple
+from .base import StorageError
+from .records import record_type
+
+# 字段类型
+INT = "int"
+STR = "str"
+FLOAT = "float"
+BOOL = "bool"
+DATETIME = "datetime"  # 统一以 ISO 格式字符串保存和返回
+
+
+class TableSchema:
+    """
+    存储表结构
+
+    表名、字段与 app/models 中的同名表一致（SQLite 后端不能与主应用共用数据库文件，见 SQLiteStorage）。
+    主键固定为自增整数 id；unique 中的每一项是一组联合唯一的字段，
+    indexes 中的每一项是一组按等值条件查询的字段（非唯一二级索引）。
+    """
+
+    def __init__(self, name: str, fields: Dict[str, str],
+                 unique: Sequence[Tuple[str, ...]] = (), indexes: Sequence[Tuple[str, ...]] = (),
+                 defaults: Dict[str, Any] = None):
+        self.name = name
+        self.fields = fields
+        self.unique = [tuple(key) for key in unique]
+        self.indexes = [tuple(key) for key in indexes]
+        self.defaults = defaults or {}
+        # 内存后端保存记录用的 __slots__ 类型，例如 participants -> ParticipantsRecord
+        self.record_type = record_type(name.title().replace("_", "") + "Record", self.columns)
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        """包含主键在内的全部列"""
+        return ("id",) + tuple(self.fields)
+
+    def check_fields(self, names):
+        """字段名必须在表结构中定义（SQLite 后端会把字段名拼进 SQL）"""
+        unknown = [name for name in names if name != "id" and name not in self.fields]
+        if unknown:
+            raise StorageError(f"表 {self.name} 没有字段: {', '.join(unknown)}")
+
+    def new_row(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        补全新记录：未提供的字段取默认值或 None，created_at / updated_at 取当前时间
+
+        Returns:
+            不含 id 的完整记录
+        """
+        self.check_fields(values)
+        now = datetime.now().isoformat()
+        row = {}
+        for name in self.fields:
+            if name in values:
+                row[name] = _normalize(values[name])
+            elif name in self.defaults:
+                row[name] = self.defaults[name]
+            elif name in ("created_at", "updated_at"):
+                row[name] = now
+            else:
+                row[name] = None
+        return row
+
+    def changes(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """规范化更新内容，表中有 updated_at 时自动刷新"""
+        self.check_fields(values)
+        if "id" in values:
+            raise StorageError("不能修改主键")
+        changes = {name: _normalize(value) for name, value in values.items()}
+        if "updated_at" in self.fields and "updated_at" not in changes:
+            changes["updated_at"] = datetime.now().isoformat()
+        return changes
+
+    def key_of(self, key: Tuple[str, ...], row: Dict[str, Any]) -> tuple:
+        """取记录在某个唯一键上的值"""
+        return tuple(row.get(name) for name in key)
+
+
+def _normalize(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+SCHEMAS: Dict[str, TableSchema] = {schema.name: schema for schema in (
+    TableSchema("groups", {
+        "name": STR,
+        "description": STR,
+        "draw_order": INT,
+        "created_at": DATETIME,
+        "updated_at": DATETIME
+    }),
+    TableSchema("participants", {
+        "name": STR,
+        "organization": STR,
+        "phone": STR,
+        "phone_last4": STR,
+        "photo_path": STR,
+        "group_id": INT,
+        "qr_code_id": STR,
+        "is_checked_in": BOOL,
+        "checkin_time": DATETIME,
+        "created_at": DATETIME,
+        "updated_at": DATETIME
+    }, unique=[("qr_code_id",)],
+       # 移动端签到、分组成员、已签到列表
+       indexes=[("phone_last4", "name"), ("group_id",), ("is_checked_in",)],
+       defaults={"is_checked_in": False}),
+    TableSchema("judges", {
+        "name": STR,
+        "username": STR,
+        "password": STR,
+        "organization": STR,
+        "is_active": BOOL,
+        "created_at": DATETIME,
+        "updated_at": DATETIME
+    }, unique=[("username",)], defaults={"is_active": True}),
+    TableSchema("scores", {
+        "participant_id": INT,
+        "judge_id": INT,
+        "score": FLOAT,
+        "round_number": INT,
+        "created_at": DATETIME,
+        "updated_at": DATETIME
+    }, unique=[("participant_id", "judge_id", "round_number")],
+       # 参赛者的全部评分、评委某一轮的打分列表
+       indexes=[("participant_id",), ("judge_id", "round_number")],
+       defaults={"round_number": 1}),
+    TableSchema("checkin_logs", {
+        "participant_id": INT,
+        "checkin_time": DATETIME,
+        "ip_address": STR,
+        "user_agent": STR,
+        "created_at": DATETIME
+    }, indexes=[("participant_id",)]),
+)}
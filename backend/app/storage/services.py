@@ -0,0 +1,462 @@
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional
+from ..utils.auth import hash_password, verify_password
+from .base import Storage, DuplicateKeyError
+from .records import RecordView
+
+# 基于 Storage 接口的服务层，simple_app 和 app_fixed 共用，与存储后端无关。
+# 方法命名与 app/services 保持一致；存储中只保存原始字段，
+# 分组名称、成员数量、评分平均值等派生数据在读取时计算，不会与原始数据不一致。
+# 存储返回的记录是只读的，派生字段用 RecordView 附加在记录上，不复制记录。
+
+
+class ParticipantService:
+    """参赛者服务"""
+
+    @staticmethod
+    def group_names(storage: Storage) -> Dict[int, str]:
+        """分组ID到名称的映射（分组数量很少，列表接口一次取出）"""
+        return {group["id"]: group["name"] for group in storage.find("groups")}
+
+    @staticmethod
+    def to_view(participant: Mapping, group_names: Dict[int, str]) -> RecordView:
+        """参赛者响应数据（补充分组名称）"""
+        return RecordView(participant, group_name=group_names.get(participant["group_id"]))
+
+    @staticmethod
+    def get_participants(storage: Storage, **criteria) -> List[Dict[str, Any]]:
+        """获取参赛者列表，criteria 为字段等值条件"""
+        group_names = ParticipantService.group_names(storage)
+        return [
+            ParticipantService.to_view(participant, group_names)
+            for participant in storage.find("participants", **criteria)
+        ]
+
+    @staticmethod
+    def get_participant(storage: Storage, participant_id: int) -> Optional[Dict[str, Any]]:
+        """根据ID获取参赛者"""
+        return ParticipantService._view_or_none(storage, storage.get("participants", participant_id))
+
+    @staticmethod
+    def get_participant_by_qr_code(storage: Storage, qr_code_id: str) -> Optional[Dict[str, Any]]:
+        """根据二维码ID获取参赛者"""
+        return ParticipantService._view_or_none(
+            storage, storage.find_one("participants", qr_code_id=qr_code_id)
+        )
+
+    @staticmethod
+    def find_by_phone_name(storage: Storage, phone_last4: str, name: str) -> Optional[Dict[str, Any]]:
+        """根据手机后四位和姓名查找参赛者（移动端签到）"""
+        return ParticipantService._view_or_none(
+            storage, storage.find_one("participants", phone_last4=phone_last4, name=name)
+        )
+
+    @staticmethod
+    def get_participant_detail(storage: Storage, participant_id: int) -> Optional[Dict[str, Any]]:
+        """获取参赛者详细信息（含评分明细和平均分）"""
+        participant = ParticipantService.get_participant(storage, participant_id)
+        if participant is None:
+            return None
+
+        scores = storage.find("scores", participant_id=participant_id)
+        judge_names = JudgeService.judge_names(storage)
+        avg_score = sum(s["score"] for s in scores) / len(scores) if scores else 0
+        return {
+            **participant.to_dict(),
+            "group_name": participant["group_name"] or "未分组",
+            "score_count": len(scores),
+            "avg_score": round(avg_score, 2),
+            "scores": [
+                {
+                    "score": score["score"],
+                    "round_number": score["round_number"],
+                    "created_at": score["created_at"],
+                    "judge_name": judge_names.get(score["judge_id"], "未知评委")
+                }
+                for score in scores
+            ]
+        }
+
+    @staticmethod
+    def _view_or_none(storage: Storage, participant: Optional[Mapping]) -> Optional[RecordView]:
+        if participant is None:
+            return None
+        group = storage.get("groups", participant["group_id"]) if participant["group_id"] else None
+        return RecordView(participant, group_name=group["name"] if group else None)
+
+
+class GroupService:
+    """分组服务"""
+
+    @staticmethod
+    def get_all_groups(storage: Storage) -> List[Dict[str, Any]]:
+        """获取所有分组，附带成员数量和成员单位"""
+        members: Dict[int, List[Dict[str, Any]]] = {}
+        for participant in storage.find("participants"):
+            members.setdefault(participant["group_id"], []).append(participant)
+        return [GroupService._to_view(group, members.get(group["id"], [])) for group in storage.find("groups")]
+
+    @staticmethod
+    def get_group(storage: Storage, group_id: int) -> Optional[Dict[str, Any]]:
+        """获取分组（附带成员数量和成员单位）"""
+        group = storage.get("groups", group_id)
+        if group is None:
+            return None
+        return GroupService._to_view(group, storage.find("participants", group_id=group_id))
+
+    @staticmethod
+    def get_group_members(storage: Storage, group_id: int) -> List[Dict[str, Any]]:
+        """获取分组成员"""
+        return ParticipantService.get_participants(storage, group_id=group_id)
+
+    @staticmethod
+    def get_group_statistics(storage: Storage) -> List[Dict[str, Any]]:
+        """各分组人数和签到人数"""
+        return [
+            {
+                "group_name": group["name"],
+                "total": group["member_count"],
+                "checked_in": group["checked_in_count"]
+            }
+            for group in GroupService.get_all_groups(storage)
+        ]
+
+    @staticmethod
+    def _to_view(group: Mapping, members: List[Mapping]) -> RecordView:
+        return RecordView(
+            group,
+            member_count=len(members),
+            checked_in_count=sum(1 for p in members if p["is_checked_in"]),
+            organizations=list(dict.fromkeys(p["organization"] for p in members))
+        )
+
+
+class JudgeService:
+    """评委服务"""
+
+    @staticmethod
+    def to_view(judge: Dict[str, Any]) -> Dict[str, Any]:
+        """评委响应数据（不含密码）"""
+        return {name: value for name, value in judge.items() if name != "password"}
+
+    @staticmethod
+    def judge_names(storage: Storage) -> Dict[int, str]:
+        """评委ID到姓名的映射"""
+        return {judge["id"]: judge["name"] for judge in storage.find("judges")}
+
+    @staticmethod
+    def get_all_judges(storage: Storage) -> List[Dict[str, Any]]:
+        """获取所有评委"""
+        return [JudgeService.to_view(judge) for judge in storage.find("judges")]
+
+    @staticmethod
+    def create_judge(storage: Storage, name: str, username: str, password: str,
+                     organization: str = None, rounds: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        创建评委（密码哈希后保存）
+
+        Returns:
+            评委数据，用户名已存在时返回 None
+        """
+        try:
+            judge = storage.insert("judges", {
+                "name": name,
+                "username": username,
+                "password": hash_password(password, rounds),
+                "organization": organization
+            })
+        except DuplicateKeyError:
+            return None
+        return JudgeService.to_view(judge)
+
+    @staticmethod
+    def authenticate_judge(storage: Storage, username: str, password: str) -> Optional[Dict[str, Any]]:
+        """
+        评委登录验证
+
+        Returns:
+            验证成功返回评委数据（不含密码），否则返回 None
+        """
+        judge = storage.find_one("judges", username=username)
+        if judge is None or not judge["is_active"] or not verify_password(password, judge["password"]):
+            return None
+        return JudgeService.to_view(judge)
+
+
+class CheckinService:
+    """签到服务"""
+
+    @staticmethod
+    def verify_identity(storage: Storage, qr_code_id: str, phone_last4: str, name: str) -> Dict[str, Any]:
+        """
+        校验二维码和身份信息
+
+        Returns:
+            {"success", "message", "error_code", "participant"}
+        """
+        participant = storage.find_one("participants", qr_code_id=qr_code_id)
+        if participant is None:
+            return {"success": False, "message": "二维码无效", "error_code": "INVALID_QR_CODE"}
+        if participant["phone_last4"] != phone_last4 or participant["name"] != name:
+            return {"success": False, "message": "验证信息不匹配", "error_code": "IDENTITY_VERIFICATION_FAILED"}
+        return {"success": True, "participant": participant}
+
+    @staticmethod
+    def checkin(storage: Storage, participant_id: int, ip_address: str = None,
+                user_agent: str = None) -> Dict[str, Any]:
+        """
+        签到（"未签到才能签到"由存储层的条件更新保证，并发重复提交只有一次成功）
+
+        Returns:
+            {"success", "message", "error_code", "participant"}，participant 为签到后的参赛者数据
+        """
+        checkin_time = datetime.now().isoformat()
+        updated = storage.update(
+            "participants", participant_id,
+            {"is_checked_in": True, "checkin_time": checkin_time},
+            expect={"is_checked_in": False}
+        )
+        if updated is None:
+            participant = ParticipantService.get_participant(storage, participant_id)
+            if participant is None:
+                return {"success": False, "message": "参赛者不存在", "error_code": "PARTICIPANT_NOT_FOUND"}
+            return {
+                "success": False,
+                "message": "您已经签到过了",
+                "error_code": "ALREADY_CHECKED_IN",
+                "participant": participant
+            }
+
+        storage.insert("checkin_logs", {
+            "participant_id": participant_id,
+            "checkin_time": checkin_time,
+            "ip_address": ip_address,
+            "user_agent": user_agent
+        })
+        return {
+            "success": True,
+            "message": "签到成功！",
+            "participant": ParticipantService.get_participant(storage, participant_id)
+        }
+
+    @staticmethod
+    def get_recent_checkins(storage: Storage, limit: int = 10) -> List[Dict[str, Any]]:
+        """最近的签到记录，按签到时间倒序"""
+        participants = [p for p in storage.find("participants", is_checked_in=True) if p["checkin_time"]]
+        participants.sort(key=lambda p: p["checkin_time"], reverse=True)
+        return [
+            {
+                "id": p["id"],
+                "name": p["name"],
+                "organization": p["organization"],
+                "checkin_time": p["checkin_time"]
+            }
+            for p in participants[:limit]
+        ]
+
+
+class ScoreService:
+    """评分服务"""
+
+    @staticmethod
+    def submit_score(storage: Storage, participant_id: int, judge_id: int, score: float,
+                     round_number: int = 1, min_score: float = 0, max_score: float = 10,
+                     require_checkin: bool = False) -> Dict[str, Any]:
+        """
+        提交评分，同一评委对同一参赛者同一轮次重复提交时覆盖原分数
+
+        Returns:
+            {"success", "message", "error_code", "action": created / updated, "score"}
+        """
+        if not (min_score <= score <= max_score):
+            return {
+                "success": False,
+                "message": f"分数必须在{min_score:g}-{max_score:g}之间",
+                "error_code": "INVALID_SCORE_RANGE"
+            }
+        participant = storage.get("participants", participant_id)
+        if participant is None:
+            return {"success": False, "message": "参赛者不存在", "error_code": "PARTICIPANT_NOT_FOUND"}
+        if require_checkin and not participant["is_checked_in"]:
+            return {"success": False, "message": "该参赛者尚未签到，无法打分", "error_code": "NOT_CHECKED_IN"}
+        judge = storage.get("judges", judge_id)
+        if judge is None:
+            return {"success": False, "message": "评委不存在", "error_code": "JUDGE_NOT_FOUND"}
+
+        key = {"participant_id": participant_id, "judge_id": judge_id, "round_number": round_number}
+        existing = storage.find_one("scores", **key)
+        if existing is not None:
+            record = storage.update("scores", existing["id"], {"score": score})
+            action = "updated"
+        else:
+            try:
+                record = storage.insert("scores", {**key, "score": score})
+                action = "created"
+            except DuplicateKeyError:
+                # 并发提交时另一请求先插入了，改为覆盖
+                existing = storage.find_one("scores", **key)
+                record = storage.update("scores", existing["id"], {"score": score})
+                action = "updated"
+
+        return {
+            "success": True,
+            "message": "分数更新成功" if action == "updated" else "评分提交成功",
+            "action": action,
+            "score": ScoreService._to_view(record, participant["name"], judge["name"])
+        }
+
+    @staticmethod
+    def get_all_scores(storage: Storage) -> List[Dict[str, Any]]:
+        """获取所有评分（附带参赛者和评委姓名）"""
+        participant_names = {p["id"]: p["name"] for p in storage.find("participants")}
+        judge_names = JudgeService.judge_names(storage)
+        return [
+            ScoreService._to_view(score, participant_names.get(score["participant_id"]),
+                                  judge_names.get(score["judge_id"]))
+            for score in storage.find("scores")
+        ]
+
+    @staticmethod
+    def get_participant_average(storage: Storage, participant_id: int) -> Dict[str, Any]:
+        """参赛者的平均分和评分数量"""
+        scores = [s["score"] for s in storage.find("scores", participant_id=participant_id)]
+        return {
+            "average_score": sum(scores) / len(scores) if scores else 0,
+            "score_count": len(scores)
+        }
+
+    @staticmethod
+    def get_judge_participants(storage: Storage, judge_id: int, round_number: int = 1) -> Dict[str, Any]:
+        """评委的打分列表：已签到的参赛者及该评委的打分状态"""
+        judge_scores = {
+            s["participant_id"]: s["score"]
+            for s in storage.find("scores", judge_id=judge_id, round_number=round_number)
+        }
+        group_names = ParticipantService.group_names(storage)
+        participants = [
+            RecordView(
+                participant,
+                group_name=group_names.get(participant["group_id"]),
+                scored=participant["id"] in judge_scores,
+                score=judge_scores.get(participant["id"])
+            )
+            for participant in storage.find("participants", is_checked_in=True)
+        ]
+
+        scored_count = sum(1 for p in participants if p["scored"])
+        return {
+            "participants": participants,
+            "total_participants": len(participants),
+            "scored_count": scored_count,
+            "pending_count": len(participants) - scored_count
+        }
+
+    @staticmethod
+    def get_rankings(storage: Storage) -> Dict[str, Any]:
+        """按平均分排名（只包含有评分的参赛者）"""
+        scores = storage.find("scores")
+        by_participant: Dict[int, List[float]] = {}
+        for score in scores:
+            by_participant.setdefault(score["participant_id"], []).append(score["score"])
+
+        group_names = ParticipantService.group_names(storage)
+        rankings = []
+        for participant in storage.find("participants"):
+            values = by_participant.get(participant["id"])
+            if values:
+                rankings.append({
+                    "participant": ParticipantService.to_view(participant, group_names),
+                    "average_score": round(sum(values) / len(values), 2),
+                    "score_count": len(values)
+                })
+        rankings.sort(key=lambda item: item["average_score"], reverse=True)
+        return {
+            "total_scores": len(scores),
+            "participants_scored": len(by_participant),
+            "rankings": rankings
+        }
+
+    @staticmethod
+    def _to_view(score: Mapping, participant_name: Optional[str], judge_name: Optional[str]) -> RecordView:
+        return RecordView(score, participant_name=participant_name, judge_name=judge_name)
+
+
+class StatisticsService:
+    """统计服务"""
+
+    @staticmethod
+    def get_checkin_statistics(storage: Storage) -> Dict[str, Any]:
+        """签到总体统计"""
+        total = storage.count("participants")
+        checked_in = storage.count("participants", is_checked_in=True)
+        return {
+            "total_participants": total,
+            "checked_in": checked_in,
+            "not_checked_in": total - checked_in,
+            "checkin_rate": round(checked_in / total * 100, 2) if total > 0 else 0
+        }
+
+    @staticmethod
+    def get_organization_statistics(storage: Storage) -> List[Dict[str, Any]]:
+        """按单位统计签到情况"""
+        totals: Counter = Counter()
+        checked_in: Counter = Counter()
+        for participant in storage.find("participants"):
+            totals[participant["organization"]] += 1
+            if participant["is_checked_in"]:
+                checked_in[participant["organization"]] += 1
+        return [
+            {
+                "organization": organization,
+                "total": total,
+                "checked_in": checked_in[organization],
+                "rate": checked_in[organization] / total * 100
+            }
+            for organization, total in totals.items()
+        ]
+
+    @staticmethod
+    def get_checkin_timeline(storage: Storage) -> List[Dict[str, Any]]:
+        """按分钟统计签到日志数量"""
+        counts = Counter(log["checkin_time"][:16] for log in storage.find("checkin_logs"))
+        return [{"time": time, "count": count} for time, count in counts.items()]
+
+    @staticmethod
+    def get_hourly_checkins(storage: Storage) -> Dict[str, Any]:
+        """按小时统计签到人数"""
+        counts = {f"{hour:02d}": 0 for hour in range(24)}
+        for participant in storage.find("participants", is_checked_in=True):
+            if participant["checkin_time"]:
+                counts[participant["checkin_time"][11:13]] += 1
+        return {"hours": list(counts), "counts": list(counts.values())}
+
+    @staticmethod
+    def get_score_distribution(scores: List[float]) -> List[Dict[str, Any]]:
+        """评分分布（每2分一个区间）"""
+        ranges = [(0, 2), (2, 4), (4, 6), (6, 8), (8, 10)]
+        return [
+            {
+                "range": f"{low}-{high}",
+                "count": sum(1 for s in scores if low <= s < high or (high == 10 and s == 10))
+            }
+            for low, high in ranges
+        ]
+
+    @staticmethod
+    def get_overview(storage: Storage) -> Dict[str, Any]:
+        """总览统计"""
+        checkin = StatisticsService.get_checkin_statistics(storage)
+        scores = [s["score"] for s in storage.find("scores")]
+        return {
+            "total_participants": checkin["total_participants"],
+            "checked_in_count": checkin["checked_in"],
+            "checkin_rate": checkin["checkin_rate"],
+            "total_groups": storage.count("groups"),
+            "total_judges": storage.count("judges"),
+            "total_scores": len(scores),
+            "avg_score": sum(scores) / len(scores) if scores else 0,
+            "checkin_by_organization": StatisticsService.get_organization_statistics(storage),
+            "checkin_timeline": StatisticsService.get_checkin_timeline(storage),
+            "score_distribution": StatisticsService.get_score_distribution(scores)
+        }
@@ -0,0 +1,193 @@
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from .base import Storage, StorageError, DuplicateKeyError
+from .records import Record
+from .schema import TableSchema, SCHEMAS, INT, STR, FLOAT, BOOL, DATETIME
+
+_COLUMN_TYPES = {INT: "INTEGER", STR: "VARCHAR", FLOAT: "FLOAT", BOOL: "BOOLEAN", DATETIME: "DATETIME"}
+
+# 只有主应用（app/）会建的表，用来识别主应用的数据库文件
+_MAIN_APP_TABLES = ("score_changes", "score_sync_ops", "score_aggregates")
+
+
+class SQLiteStorage(Storage):
+    """
+    SQLite 存储后端（标准库 sqlite3，不依赖 SQLAlchemy）
+
+    表不存在时按 TableSchema 建表，已存在时直接使用。
+    SQLite 中日期时间按 SQLAlchemy 的格式（空格分隔）保存，读出时转换回 ISO 格式。
+
+    不能与主应用（app/）共用数据库文件：这里的写入只改原始表，不会更新主应用的
+    评分汇总、评分变更日志和进程内的排名、签到索引、统计快照，主应用会读到过期数据。
+    打开的文件中有主应用专有的表时直接报错。
+    """
+
+    def __init__(self, path: str, schemas: Dict[str, TableSchema] = None, fsync: bool = False):
+        """
+        Args:
+            path: 数据库文件路径
+            fsync: 每次提交都同步到磁盘（synchronous=FULL），为 False 时使用 WAL 下的 NORMAL
+        """
+        self.path = path
+        self._schemas = schemas or SCHEMAS
+        self._lock = threading.RLock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 自动提交模式：每条写语句单独成为一个事务
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._check_not_main_app_database()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if fsync else 'NORMAL'}")
+        self._create_tables()
+
+    def _check_not_main_app_database(self):
+        placeholders = ", ".join("?" * len(_MAIN_APP_TABLES))
+        found = self._conn.execute(
+            f"SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+            _MAIN_APP_TABLES
+        ).fetchall()
+        if found:
+            self._conn.close()
+            raise StorageError(f"{self.path} 是主应用的数据库，不能作为 simple_app / app_fixed 的存储文件，请使用单独的 STORAGE_PATH")
+
+    def _create_tables(self):
+        with self._lock:
+            for schema in self._schemas.values():
+                columns = ", ".join(
+                    f"{name} {_COLUMN_TYPES[field_type]}" for name, field_type in schema.fields.items()
+                )
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {schema.name} (id INTEGER PRIMARY KEY, {columns})"
+                )
+                for key in schema.unique:
+                    self._conn.execute(
+                        f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{schema.name}_{'_'.join(key)} "
+                        f"ON {schema.name} ({', '.join(key)})"
+                    )
+                for key in schema.indexes:
+                    self._conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS ix_{schema.name}_{'_'.join(key)} "
+                        f"ON {schema.name} ({', '.join(key)})"
+                    )
+
+    def _schema(self, table: str) -> TableSchema:
+        try:
+            return self._schemas[table]
+        except KeyError:
+            raise StorageError(f"表不存在: {table}")
+
+    def _where(self, schema: TableSchema, criteria: Dict[str, Any]):
+        schema.check_fields(criteria)
+        if not criteria:
+            return "", []
+        clauses, params = [], []
+        for name, value in criteria.items():
+            if value is None:
+                clauses.append(f"{name} IS NULL")
+            else:
+                clauses.append(f"{name} = ?")
+                params.append(_to_sql(schema, name, value))
+        return " WHERE " + " AND ".join(clauses), params
+
+    def _row(self, schema: TableSchema, row: sqlite3.Row) -> Record:
+        return schema.record_type({name: _from_sql(schema, name, row[name]) for name in schema.columns})
+
+    def get(self, table: str, record_id: int) -> Optional[Record]:
+        return self.find_one(table, id=record_id)
+
+    def find(self, table: str, **criteria) -> List[Record]:
+        schema = self._schema(table)
+        where, params = self._where(schema, criteria)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(schema.columns)} FROM {table}{where} ORDER BY id", params
+            ).fetchall()
+        return [self._row(schema, row) for row in rows]
+
+    def count(self, table: str, **criteria) -> int:
+        schema = self._schema(table)
+        where, params = self._where(schema, criteria)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {table}{where}", params).fetchone()[0]
+
+    def insert(self, table: str, values: Dict[str, Any]) -> Record:
+        schema = self._schema(table)
+        row = schema.new_row(values)
+        if values.get("id"):
+            row = {"id": values["id"], **row}
+        names = list(row)
+        with self._lock:
+            try:
+                cursor = self._conn.execute(
+                    f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                    [_to_sql(schema, name, row[name]) for name in names]
+                )
+            except sqlite3.IntegrityError as e:
+                raise _duplicate_error(schema, row, e)
+        return schema.record_type({**row, "id": cursor.lastrowid})
+
+    def update(self, table: str, record_id: int, values: Dict[str, Any],
+               expect: Optional[Dict[str, Any]] = None) -> Optional[Record]:
+        schema = self._schema(table)
+        changes = schema.changes(values)
+        where, params = self._where(schema, {"id": record_id, **(expect or {})})
+        assignments = ", ".join(f"{name} = ?" for name in changes)
+        with self._lock:
+            try:
+                cursor = self._conn.execute(
+                    f"UPDATE {table} SET {assignments}{where}",
+                    [_to_sql(schema, name, value) for name, value in changes.items()] + params
+                )
+            except sqlite3.IntegrityError as e:
+                raise _duplicate_error(schema, changes, e)
+            if cursor.rowcount == 0:
+                return None
+            return self.get(table, record_id)
+
+    def delete(self, table: str, record_id: int) -> bool:
+        self._schema(table)
+        with self._lock:
+            return self._conn.execute(f"DELETE FROM {table} WHERE id = ?", [record_id]).rowcount > 0
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return not any(
+                self._conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone()
+                for table in self._schemas
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _to_sql(schema: TableSchema, name: str, value: Any) -> Any:
+    if value is not None and schema.fields.get(name) == DATETIME and isinstance(value, str):
+        return value.replace("T", " ", 1)
+    return value
+
+
+def _from_sql(schema: TableSchema, name: str, value: Any) -> Any:
+    if value is None:
+        return None
+    field_type = schema.fields.get(name)
+    if field_type == BOOL:
+        return bool(value)
+    if field_type == DATETIME and isinstance(value, str):
+        return value.replace(" ", "T", 1)
+    return value
+
+
+def _duplicate_error(schema: TableSchema, row: Dict[str, Any], error: sqlite3.IntegrityError) -> StorageError:
+    # 从错误信息中找出冲突的唯一键，例如 "UNIQUE constraint failed: judges.username"
+    message = str(error)
+    for key in schema.unique:
+        if all(f"{schema.name}.{name}" in message for name in key):
+            return DuplicateKeyError(schema.name, key, schema.key_of(key, row))
+    if f"{schema.name}.id" in message:
+        return DuplicateKeyError(schema.name, ("id",), (row.get("id"),))
+    return StorageError(message)
@@ -1,7 +1,7 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 import os
 
 # 密码加密上下文
@@ -12,18 +12,25 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
     """
     对密码进行哈希加密
     
     Args:
         password: 原始密码
+        rounds: bcrypt 成本因子，默认使用 passlib 的默认值
     
     Returns:
         加密后的密码哈希
     """
+    if rounds:
+        return pwd_context.hash(password, rounds=rounds)
     return pwd_context.hash(password)
 
+def hash_passwords_batch(passwords: List[str], rounds: Optional[int] = None) -> List[str]:
+    """批量哈希密码（在进程池中执行，必须是模块级函数）"""
+    return [hash_password(password, rounds) for password in passwords]
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     验证密码
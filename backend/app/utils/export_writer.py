@@ -0,0 +1,102 @@
+import csv
+import io
+import os
+import tempfile
+from typing import Iterable, Iterator, Sequence, Tuple
+import openpyxl
+
+# 流式导出：数据逐行写出，内存占用与行数无关
+
+CSV_MEDIA_TYPE = "text/csv"  # StreamingResponse 会自动补上 charset=utf-8
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def iter_csv(headers: Sequence[str], rows: Iterable[Sequence], rows_per_chunk: int = 500) -> Iterator[bytes]:
+    """
+    按块生成CSV内容
+
+    开头写入 UTF-8 BOM，Excel 直接打开时中文不乱码。
+
+    Args:
+        headers: 标题行
+        rows: 数据行（可以是查询结果的迭代器）
+        rows_per_chunk: 每块包含的行数
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(headers)
+
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count >= rows_per_chunk:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def write_xlsx(title: str, headers: Sequence[str], rows: Iterable[Sequence],
+               output_dir: str = "data/exports") -> str:
+    """
+    以 write-only 模式把数据写入临时Excel文件（行写出后即释放，不在内存中保留整个工作表）
+
+    Args:
+        title: 工作表名称
+        headers: 标题行
+        rows: 数据行
+
+    Returns:
+        临时文件路径，由调用方负责删除（iter_file(delete=True)）
+    """
+    return write_xlsx_sheets([(title, headers, rows)], output_dir)
+
+
+def write_xlsx_sheets(sheets: Iterable[Tuple[str, Sequence[str], Iterable[Sequence]]],
+                      output_dir: str = "data/exports") -> str:
+    """
+    以 write-only 模式写入多工作表的临时Excel文件
+
+    Args:
+        sheets: (工作表名称, 标题行, 数据行)
+
+    Returns:
+        临时文件路径，由调用方负责删除
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=".xlsx", dir=output_dir)
+    os.close(fd)
+    try:
+        workbook = openpyxl.Workbook(write_only=True)
+        for title, headers, rows in sheets:
+            sheet = workbook.create_sheet(title)
+            sheet.append(list(headers))
+            for row in rows:
+                sheet.append(list(row))
+        workbook.save(path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def iter_file(path: str, chunk_size: int = 64 * 1024, delete: bool = False) -> Iterator[bytes]:
+    """按块读取文件，delete=True 时读完（或客户端中断）后删除文件"""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if delete:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -2,6 +2,7 @@ import os
 import shutil
 from typing import Optional
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
 import uuid
 from PIL import Image
 import io
@@ -63,6 +64,27 @@ async def save_uploaded_file(file: UploadFile, upload_dir: str = "data/photos")
     
     return file_path
 
+async def save_upload_to_temp(file: UploadFile, upload_dir: str = "data/imports") -> str:
+    """
+    把上传文件原样保存到临时目录（导入等后台任务使用，请求结束后上传对象会被关闭）
+    
+    上传内容本身已由 FastAPI 暂存在 SpooledTemporaryFile 中，这里在线程池里分块复制到磁盘，
+    不把整个文件读进内存，也不阻塞事件循环。
+    
+    Returns:
+        保存的文件路径，任务完成后由调用方删除
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    file_path = os.path.join(upload_dir, generate_unique_filename(file.filename))
+    
+    def _copy():
+        file.file.seek(0)
+        with open(file_path, "wb") as f:
+            shutil.copyfileobj(file.file, f, 1024 * 1024)
+    
+    await run_in_threadpool(_copy)
+    return file_path
+
 def save_participant_photo(file: UploadFile, participant_id: int, 
                           upload_dir: str = "data/photos") -> str:
     """
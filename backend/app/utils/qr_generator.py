@@ -2,9 +2,48 @@ import qrcode
 from qrcode.image.styledpil import StyledPilImage
 from qrcode.image.styles.moduledrawers import RoundedModuleDrawer
 from PIL import Image, ImageDraw, ImageFont
+from functools import lru_cache
+import hashlib
 import io
+import json
 import os
-from typing import Optional
+import zipfile
+from typing import Iterator, List, Optional, Tuple
+
+# 参赛者二维码图片样式；修改样式时递增 version，批量生成会据此判断需要重新渲染
+PARTICIPANT_QR_STYLE = {
+    "version": 1,
+    "box_size": 8,
+    "border": 2,
+    "title": "签到二维码",
+    "font": "arial.ttf",
+    "title_font_size": 16,
+    "name_font_size": 12
+}
+
+@lru_cache(maxsize=None)
+def get_font(size: int, font_name: str = "arial.ttf"):
+    """
+    获取字体（每个进程只从磁盘加载一次）
+    
+    找不到字体文件时使用PIL默认字体
+    """
+    try:
+        return ImageFont.truetype(font_name, size)
+    except OSError:
+        return ImageFont.load_default()
+
+def participant_qr_data(participant_id: int, qr_code_id: str) -> str:
+    """参赛者二维码内容，格式：checkin:qr_code_id:participant_id"""
+    return f"checkin:{qr_code_id}:{participant_id}"
+
+def participant_qr_hash(participant_id: int, qr_code_id: str, participant_name: str = "") -> str:
+    """参赛者二维码图片的内容哈希（二维码内容 + 姓名 + 样式），内容不变则图片不变"""
+    payload = json.dumps(
+        [participant_qr_data(participant_id, qr_code_id), participant_name or "", PARTICIPANT_QR_STYLE],
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
 
 def generate_qr_code(data: str, size: int = 10, border: int = 4) -> Image.Image:
     """
@@ -35,28 +74,29 @@ def generate_qr_code(data: str, size: int = 10, border: int = 4) -> Image.Image:
         module_drawer=RoundedModuleDrawer()
     )
     
-    return img
+    # make_image 返回的是包装对象，取出内部的 PIL 图片才能粘贴、缩放
+    return img.get_image()
 
-def generate_participant_qr(participant_id: int, qr_code_id: str, 
-                          participant_name: str = "", 
-                          save_path: Optional[str] = None) -> str:
+def render_participant_qr(participant_id: int, qr_code_id: str,
+                          participant_name: str = "") -> Image.Image:
     """
-    为参赛者生成专属二维码
+    渲染参赛者专属二维码图片（带标题和姓名）
     
     Args:
         participant_id: 参赛者ID
         qr_code_id: 二维码标识
         participant_name: 参赛者姓名
-        save_path: 保存路径
     
     Returns:
-        二维码文件路径
+        PIL Image对象
     """
-    # 二维码数据格式：checkin:qr_code_id:participant_id
-    qr_data = f"checkin:{qr_code_id}:{participant_id}"
+    style = PARTICIPANT_QR_STYLE
     
     # 生成基础二维码
-    qr_img = generate_qr_code(qr_data, size=8, border=2)
+    qr_img = generate_qr_code(
+        participant_qr_data(participant_id, qr_code_id),
+        size=style["box_size"], border=style["border"]
+    )
     
     # 创建带标题的图片
     img_width = qr_img.width
@@ -70,18 +110,11 @@ def generate_participant_qr(participant_id: int, qr_code_id: str,
     
     # 添加标题文字
     draw = ImageDraw.Draw(final_img)
-    
-    try:
-        # 尝试使用系统字体
-        font_title = ImageFont.truetype("arial.ttf", 16)
-        font_subtitle = ImageFont.truetype("arial.ttf", 12)
-    except:
-        # 如果没有找到字体，使用默认字体
-        font_title = ImageFont.load_default()
-        font_subtitle = ImageFont.load_default()
+    font_title = get_font(style["title_font_size"], style["font"])
+    font_subtitle = get_font(style["name_font_size"], style["font"])
     
     # 绘制标题
-    title_text = "签到二维码"
+    title_text = style["title"]
     title_bbox = draw.textbbox((0, 0), title_text, font=font_title)
     title_width = title_bbox[2] - title_bbox[0]
     title_x = (img_width - title_width) // 2
@@ -94,9 +127,28 @@ def generate_participant_qr(participant_id: int, qr_code_id: str,
         name_x = (img_width - name_width) // 2
         draw.text((name_x, 35), participant_name, fill='black', font=font_subtitle)
     
+    return final_img
+
+def generate_participant_qr(participant_id: int, qr_code_id: str, 
+                          participant_name: str = "", 
+                          save_path: Optional[str] = None) -> str:
+    """
+    为参赛者生成专属二维码
+    
+    Args:
+        participant_id: 参赛者ID
+        qr_code_id: 二维码标识
+        participant_name: 参赛者姓名
+        save_path: 保存路径
+    
+    Returns:
+        二维码文件路径
+    """
+    final_img = render_participant_qr(participant_id, qr_code_id, participant_name)
+    
     # 保存文件
     if save_path is None:
-        save_path = f"data/qrcodes/participant_{participant_id}_{qr_code_id}.png"
+        save_path = participant_qr_path(participant_id, qr_code_id)
     
     # 确保目录存在
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
@@ -106,6 +158,36 @@ def generate_participant_qr(participant_id: int, qr_code_id: str,
     
     return save_path
 
+def participant_qr_path(participant_id: int, qr_code_id: str, output_dir: str = "data/qrcodes") -> str:
+    """参赛者二维码文件路径"""
+    return os.path.join(output_dir, f"participant_{participant_id}_{qr_code_id}.png")
+
+def init_qr_worker():
+    """二维码渲染进程池的初始化函数：预先加载字体，之后每张图不再读字体文件"""
+    style = PARTICIPANT_QR_STYLE
+    get_font(style["title_font_size"], style["font"])
+    get_font(style["name_font_size"], style["font"])
+
+def render_participant_qr_batch(tasks: List[Tuple[int, str, str, str]]) -> List[Tuple[int, Optional[str], Optional[str]]]:
+    """
+    渲染一批参赛者二维码并保存（在进程池中执行，参数和返回值都是可序列化的普通数据）
+    
+    Args:
+        tasks: (参赛者ID, 二维码标识, 姓名, 保存路径)
+    
+    Returns:
+        (参赛者ID, 文件路径, 错误信息)，成功时错误信息为None，失败时文件路径为None
+    """
+    results = []
+    for participant_id, qr_code_id, participant_name, save_path in tasks:
+        try:
+            results.append((participant_id, generate_participant_qr(
+                participant_id, qr_code_id, participant_name, save_path
+            ), None))
+        except Exception as e:
+            results.append((participant_id, None, str(e)))
+    return results
+
 def generate_batch_qr_codes(participants: list, output_dir: str = "data/qrcodes") -> list:
     """
     批量生成参赛者二维码
@@ -121,85 +203,170 @@ def generate_batch_qr_codes(participants: list, output_dir: str = "data/qrcodes"
     file_paths = []
     
     for participant in participants:
-        save_path = os.path.join(
-            output_dir, 
-            f"participant_{participant.id}_{participant.qr_code_id}.png"
-        )
-        
         file_path = generate_participant_qr(
             participant_id=participant.id,
             qr_code_id=participant.qr_code_id,
             participant_name=participant.name,
-            save_path=save_path
+            save_path=participant_qr_path(participant.id, participant.qr_code_id, output_dir)
         )
         
         file_paths.append(file_path)
     
     return file_paths
 
-def create_qr_code_sheet(participants: list, output_path: str = "data/exports/qr_codes_sheet.png") -> str:
+# 打印表格中二维码小图的样式；修改时递增 version，磁盘上缓存的小图随之失效
+SHEET_TILE_STYLE = {"version": 1, "box_size": 6, "border": 1}
+
+# A4 纸尺寸（毫米）
+A4_SIZE_MM = (210, 297)
+
+class QRSheetLayout:
+    """
+    二维码打印表格版式：A4 纸按 dpi 换算成像素，每页 columns × rows 个格子，
+    每个格子上方是二维码，下方两行文字（姓名、单位）
     """
-    创建二维码打印表格
     
-    Args:
-        participants: 参赛者列表
-        output_path: 输出文件路径
+    def __init__(self, columns: int = 4, rows: int = 5, dpi: int = 150,
+                 margin_mm: float = 10, text_height_mm: float = 10, font_size: int = 14):
+        if columns < 1 or rows < 1:
+            raise ValueError("每页行数和列数必须大于0")
+        self.columns = columns
+        self.rows = rows
+        self.dpi = dpi
+        self.font_size = font_size
+        self.page_size = (self._px(A4_SIZE_MM[0]), self._px(A4_SIZE_MM[1]))
+        self.margin = self._px(margin_mm)
+        self.text_height = self._px(text_height_mm)
+        self.cell_width = (self.page_size[0] - 2 * self.margin) // columns
+        self.cell_height = (self.page_size[1] - 2 * self.margin) // rows
+        # 二维码取格子内去掉文字区和间距后能放下的最大正方形
+        self.tile_size = min(self.cell_width, self.cell_height - self.text_height) - self.margin // 2
+        if self.tile_size <= 0:
+            raise ValueError("每页格子过多，放不下二维码")
     
-    Returns:
-        生成的文件路径
-    """
-    # 每行显示的二维码数量
-    codes_per_row = 4
-    qr_size = 200
-    margin = 20
-    text_height = 40
+    @property
+    def per_page(self) -> int:
+        """每页二维码数量"""
+        return self.columns * self.rows
     
-    # 计算总行数
-    total_rows = (len(participants) + codes_per_row - 1) // codes_per_row
+    def page_count(self, total: int) -> int:
+        """total 个二维码需要的页数"""
+        return (total + self.per_page - 1) // self.per_page
     
-    # 计算图片尺寸
-    sheet_width = codes_per_row * (qr_size + margin) + margin
-    sheet_height = total_rows * (qr_size + text_height + margin) + margin
+    def _px(self, mm: float) -> int:
+        return int(round(mm / 25.4 * self.dpi))
+
+def get_sheet_tile(participant_id: int, qr_code_id: str, tile_size: int,
+                   cache_dir: str = "data/qrcodes/tiles") -> Image.Image:
+    """
+    获取打印表格用的二维码小图（灰度）
     
-    # 创建画布
-    sheet_img = Image.new('RGB', (sheet_width, sheet_height), 'white')
+    小图按内容哈希（二维码内容 + 尺寸 + 样式）缓存在磁盘上，重复打印时直接读取，不再重新渲染。
+    """
+    qr_data = participant_qr_data(participant_id, qr_code_id)
+    key = hashlib.sha1(
+        json.dumps([qr_data, tile_size, SHEET_TILE_STYLE], sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    tile_path = os.path.join(cache_dir, f"{key}.png")
     
-    # 生成每个二维码并放置到画布上
-    for i, participant in enumerate(participants):
-        row = i // codes_per_row
-        col = i % codes_per_row
-        
-        # 生成二维码
-        qr_data = f"checkin:{participant.qr_code_id}:{participant.id}"
-        qr_img = generate_qr_code(qr_data, size=6, border=1)
-        qr_img = qr_img.resize((qr_size, qr_size))
-        
-        # 计算位置
-        x = col * (qr_size + margin) + margin
-        y = row * (qr_size + text_height + margin) + margin
-        
-        # 粘贴二维码
-        sheet_img.paste(qr_img, (x, y))
-        
-        # 添加文字
-        draw = ImageDraw.Draw(sheet_img)
+    if os.path.exists(tile_path):
         try:
-            font = ImageFont.truetype("arial.ttf", 14)
-        except:
-            font = ImageFont.load_default()
+            with Image.open(tile_path) as cached:
+                return cached.convert("L")
+        except OSError:
+            pass  # 缓存文件损坏时重新渲染
+    
+    tile = generate_qr_code(
+        qr_data, size=SHEET_TILE_STYLE["box_size"], border=SHEET_TILE_STYLE["border"]
+    ).convert("L").resize((tile_size, tile_size), Image.NEAREST)
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{tile_path}.{os.getpid()}.tmp"
+    tile.save(tmp_path, "PNG")
+    os.replace(tmp_path, tile_path)
+    return tile
+
+def iter_qr_sheet_pages(participants: List[Tuple[int, str, str, str]], layout: QRSheetLayout,
+                        cache_dir: str = "data/qrcodes/tiles") -> Iterator[Image.Image]:
+    """
+    逐页生成二维码打印表格，每次只在内存中保留一页
+    
+    Args:
+        participants: (参赛者ID, 二维码标识, 姓名, 单位)
+        layout: 页面版式
+        cache_dir: 二维码小图缓存目录
+    
+    Yields:
+        每一页的灰度图片
+    """
+    font = get_font(layout.font_size)
+    
+    for start in range(0, len(participants), layout.per_page):
+        page = Image.new('L', layout.page_size, 255)
+        draw = ImageDraw.Draw(page)
         
-        text = f"{participant.name}\n{participant.organization}"
-        text_bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = text_bbox[2] - text_bbox[0]
-        text_x = x + (qr_size - text_width) // 2
-        text_y = y + qr_size + 5
+        for i, (participant_id, qr_code_id, name, organization) in enumerate(
+                participants[start:start + layout.per_page]):
+            row, col = divmod(i, layout.columns)
+            cell_x = layout.margin + col * layout.cell_width
+            cell_y = layout.margin + row * layout.cell_height
+            
+            # 粘贴二维码（格子内水平居中）
+            x = cell_x + (layout.cell_width - layout.tile_size) // 2
+            page.paste(get_sheet_tile(participant_id, qr_code_id, layout.tile_size, cache_dir), (x, cell_y))
+            
+            # 添加文字
+            text = f"{name}\n{organization or ''}"
+            text_bbox = draw.multiline_textbbox((0, 0), text, font=font)
+            text_width = text_bbox[2] - text_bbox[0]
+            text_x = cell_x + (layout.cell_width - text_width) // 2
+            draw.multiline_text((text_x, cell_y + layout.tile_size + 5), text, fill=0, font=font, align="center")
         
-        draw.text((text_x, text_y), text, fill='black', font=font)
+        yield page
+
+def create_qr_code_sheet(participants: List[Tuple[int, str, str, str]], output_path: Optional[str] = None,
+                         output_format: str = "pdf", layout: Optional[QRSheetLayout] = None) -> str:
+    """
+    创建二维码打印表格（A4 分页）
+    
+    页面逐页生成、逐页写入文件，内存占用与参赛者人数无关。
+    
+    Args:
+        participants: (参赛者ID, 二维码标识, 姓名, 单位)
+        output_path: 输出文件路径，默认 data/exports/qr_codes_sheet.<pdf|zip>
+        output_format: pdf（多页PDF）或 zip（每页一张PNG）
+        layout: 页面版式，默认每页 4 × 5
+    
+    Returns:
+        生成的文件路径
+    """
+    if output_format not in ("pdf", "zip"):
+        raise ValueError(f"不支持的格式: {output_format}")
+    if not participants:
+        raise ValueError("没有参赛者数据")
+    
+    layout = layout or QRSheetLayout()
+    if output_path is None:
+        output_path = f"data/exports/qr_codes_sheet.{output_format}"
     
     # 确保目录存在
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    # 保存文件
-    sheet_img.save(output_path, 'PNG', quality=95)
+    # 先写临时文件，完成后再替换，避免下载到写了一半的文件
+    tmp_path = f"{output_path}.tmp"
+    pages = iter_qr_sheet_pages(participants, layout)
+    
+    if output_format == "pdf":
+        # 每页以追加方式写入同一个PDF，不需要把所有页面同时放在内存里
+        for page_number, page in enumerate(pages):
+            page.save(tmp_path, "PDF", resolution=layout.dpi, append=page_number > 0)
+    else:
+        # PNG 本身已压缩，zip 内不再压缩
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED) as archive:
+            for page_number, page in enumerate(pages, 1):
+                buffer = io.BytesIO()
+                page.save(buffer, "PNG")
+                archive.writestr(f"qr_codes_page_{page_number:03d}.png", buffer.getvalue())
     
-    return output_path
\ No newline at end of file
+    os.replace(tmp_path, output_path)
+    return output_path
@@ -3,9 +3,9 @@
 联盟杯内训师大赛管理系统 - 修复版后端应用
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 from typing import List, Optional
 from contextlib import asynccontextmanager
@@ -14,24 +14,44 @@ import os
 from datetime import datetime
 import qrcode
 from io import BytesIO
-import base64
 
 # 导入配置
 from config import settings, get_checkin_url, get_mobile_base_url, is_development, get_cors_origins
+from app.cache.qr_image import QRImageCache
+from app.storage import Storage, create_storage
+from app.storage.responses import RecordJSONResponse
+from app.storage.services import (
+    ParticipantService, GroupService, JudgeService, CheckinService, ScoreService, StatisticsService
+)
 
-# 数据存储
-participants_data = []
-groups_data = []
-judges_data = []
-scores_data = []
-checkin_logs = []
+# 数据存储（启动时按配置创建，默认使用内存后端，重启后恢复为示例数据）
+storage: Optional[Storage] = None
 
 def load_data():
-    """加载示例数据"""
-    global participants_data, groups_data, judges_data
+    """打开存储，存储为空时写入示例数据"""
+    global storage
+    storage = create_storage(
+        settings.storage_backend or "memory",
+        settings.storage_path or None,
+        name="fixed_data",
+        data_dir=settings.data_dir,
+        fsync=settings.storage_fsync,
+        compact_threshold=settings.storage_compact_threshold
+    )
+    if storage.is_empty():
+        init_sample_data()
+
+def init_sample_data():
+    """写入示例数据"""
+    # 示例分组数据
+    for group in [
+        {"id": 1, "name": "第1组", "created_at": "2024-09-20T10:00:00"},
+        {"id": 2, "name": "第2组", "created_at": "2024-09-20T10:00:00"}
+    ]:
+        storage.insert("groups", group)
     
     # 示例参赛者数据
-    participants_data = [
+    for participant in [
         {
             "id": 1,
             "name": "张三",
@@ -40,10 +60,7 @@ def load_data():
             "phone_last4": "5678",
             "photo_path": "/photos/zhangsan.jpg",
             "group_id": 1,
-            "group_name": "第1组",
             "qr_code_id": "QR001",
-            "is_checked_in": False,
-            "checkin_time": None,
             "created_at": "2024-09-20T10:00:00"
         },
         {
@@ -54,10 +71,7 @@ def load_data():
             "phone_last4": "4321",
             "photo_path": "/photos/lisi.jpg",
             "group_id": 1,
-            "group_name": "第1组",
             "qr_code_id": "QR002",
-            "is_checked_in": False,
-            "checkin_time": None,
             "created_at": "2024-09-20T10:00:00"
         },
         {
@@ -68,71 +82,74 @@ def load_data():
             "phone_last4": "1111",
             "photo_path": "/photos/wangwu.jpg",
             "group_id": 2,
-            "group_name": "第2组",
             "qr_code_id": "QR003",
-            "is_checked_in": False,
-            "checkin_time": None,
-            "created_at": "2024-09-20T10:00:00"
-        }
-    ]
-    
-    # 示例分组数据
-    groups_data = [
-        {
-            "id": 1,
-            "name": "第1组",
-            "organizations": ["工商银行", "建设银行"],
-            "member_count": 2,
-            "draw_order": None,
-            "created_at": "2024-09-20T10:00:00"
-        },
-        {
-            "id": 2,
-            "name": "第2组",
-            "organizations": ["农业银行"],
-            "member_count": 1,
-            "draw_order": None,
-            "created_at": "2024-09-20T10:00:00"
-        }
-    ]
-    
-    # 示例评委数据
-    judges_data = [
-        {
-            "id": 1,
-            "name": "评委一",
-            "judge_code": "judge01",
-            "password": "123456",
-            "is_active": True,
-            "created_at": "2024-09-20T10:00:00"
-        },
-        {
-            "id": 2,
-            "name": "评委二",
-            "judge_code": "judge02",
-            "password": "123456",
-            "is_active": True,
             "created_at": "2024-09-20T10:00:00"
         }
-    ]
-
-def generate_qr_code(data: str) -> str:
-    """生成二维码并返回base64编码"""
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    ]:
+        storage.insert("participants", participant)
+    
+    # 示例评委数据（评委编号即用户名）
+    for name, judge_code in [("评委一", "judge01"), ("评委二", "judge02")]:
+        JudgeService.create_judge(
+            storage, name, judge_code, "123456", rounds=settings.judge_import_bcrypt_rounds
+        )
+
+def judge_view(judge: dict) -> dict:
+    """评委响应数据，保留旧接口的 judge_code 字段"""
+    return {**judge, "judge_code": judge["username"]}
+
+def score_error(result: dict):
+    """把评分服务的错误结果转换为HTTP异常"""
+    status_code = 404 if result["error_code"] in ("PARTICIPANT_NOT_FOUND", "JUDGE_NOT_FOUND") else 400
+    raise HTTPException(status_code=status_code, detail=result["message"])
+
+def render_qr_png(data: str, box_size: int = 10, border: int = 5) -> bytes:
+    """渲染二维码PNG"""
+    qr = qrcode.QRCode(version=1, box_size=box_size, border=border)
     qr.add_data(data)
     qr.make(fit=True)
     
     img = qr.make_image(fill_color="black", back_color="white")
     buffer = BytesIO()
     img.save(buffer, format='PNG')
-    img_str = base64.b64encode(buffer.getvalue()).decode()
-    return f"data:image/png;base64,{img_str}"
+    return buffer.getvalue()
+
+# 二维码图片缓存：签到链接和渲染参数不变时直接复用已渲染的图片
+qr_images = QRImageCache(render_qr_png, cache_dir="data/qrcodes/cache")
+QR_RENDER_OPTIONS = {"box_size": settings.qr_code_box_size, "border": settings.qr_code_border}
+# 二维码图片的浏览器缓存时间（秒），过期后凭 ETag 重新验证
+QR_IMAGE_MAX_AGE = 86400
+
+def generate_qr_code(data: str) -> str:
+    """生成二维码并返回base64编码"""
+    return qr_images.get(data, **QR_RENDER_OPTIONS).data_url
+
+def qr_code_response(checkin_url: str, format: str, if_none_match: Optional[str], **extra):
+    """
+    返回二维码
+    
+    format=png（默认）直接返回图片，带 ETag 和缓存头，内容未变时返回 304；
+    format=json 返回 base64 data URL（旧格式）。
+    """
+    if format not in ("png", "json"):
+        raise HTTPException(status_code=400, detail="format 只支持 png、json")
+    
+    image = qr_images.get(checkin_url, **QR_RENDER_OPTIONS)
+    if format == "json":
+        return {"qr_code_data": image.data_url, "checkin_url": checkin_url, **extra}
+    
+    headers = {"ETag": image.etag, "Cache-Control": f"public, max-age={QR_IMAGE_MAX_AGE}"}
+    if image.matches(if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=image.body, media_type=image.media_type, headers=headers)
 
 # 使用lifespan替代on_event
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 启动时执行
     load_data()
+    # 预先渲染公共签到二维码
+    qr_images.get(get_checkin_url(), **QR_RENDER_OPTIONS)
     print("=" * 60)
     print(f"{settings.app_title} - 修复版")
     print("=" * 60)
@@ -152,6 +169,7 @@ async def lifespan(app: FastAPI):
     yield
     # 关闭时执行
     print("服务正在关闭...")
+    storage.close()
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -231,12 +249,12 @@ async def root():
 @app.get("/api/participants", response_model=List[Participant])
 async def get_participants():
     """获取所有参赛者"""
-    return participants_data
+    return ParticipantService.get_participants(storage)
 
 @app.get("/api/participants/{participant_id}")
 async def get_participant(participant_id: int):
     """获取单个参赛者信息"""
-    participant = next((p for p in participants_data if p["id"] == participant_id), None)
+    participant = ParticipantService.get_participant(storage, participant_id)
     if not participant:
         raise HTTPException(status_code=404, detail="参赛者不存在")
     return participant
@@ -244,175 +262,104 @@ async def get_participant(participant_id: int):
 @app.post("/api/checkin/verify")
 async def verify_checkin(request: CheckinRequest):
     """验证签到信息"""
-    # 查找参赛者
-    participant = next((p for p in participants_data if p["qr_code_id"] == request.qr_code_id), None)
-    if not participant:
-        raise HTTPException(status_code=404, detail="无效的二维码")
-    
-    # 验证信息
-    if participant["phone_last4"] != request.phone_last4 or participant["name"] != request.name:
+    # 验证二维码和身份信息
+    result = CheckinService.verify_identity(storage, request.qr_code_id, request.phone_last4, request.name)
+    if not result["success"]:
+        if result["error_code"] == "INVALID_QR_CODE":
+            raise HTTPException(status_code=404, detail="无效的二维码")
         raise HTTPException(status_code=400, detail="验证信息不匹配")
     
-    # 检查是否已签到
-    if participant["is_checked_in"]:
-        return {"success": False, "message": "您已经签到过了", "participant": participant}
-    
-    # 完成签到
-    participant["is_checked_in"] = True
-    participant["checkin_time"] = datetime.now().isoformat()
-    
-    # 记录签到日志
-    checkin_logs.append({
-        "participant_id": participant["id"],
-        "checkin_time": participant["checkin_time"],
-        "ip_address": "127.0.0.1"
-    })
+    # 完成签到（同时记录签到日志）
+    result = CheckinService.checkin(storage, result["participant"]["id"], ip_address="127.0.0.1")
+    if not result["success"]:
+        return {"success": False, "message": "您已经签到过了", "participant": result["participant"]}
     
-    return {"success": True, "message": "签到成功!", "participant": participant}
+    return {"success": True, "message": "签到成功!", "participant": result["participant"]}
 
 @app.get("/api/groups")
 async def get_groups():
     """获取所有分组"""
-    return groups_data
+    return RecordJSONResponse(GroupService.get_all_groups(storage))
 
 @app.get("/api/groups/{group_id}/members")
 async def get_group_members(group_id: int):
     """获取分组成员"""
-    group = next((g for g in groups_data if g["id"] == group_id), None)
+    group = GroupService.get_group(storage, group_id)
     if not group:
         raise HTTPException(status_code=404, detail="分组不存在")
     
-    members = [p for p in participants_data if p["group_id"] == group_id]
-    return {"group": group, "members": members}
+    members = GroupService.get_group_members(storage, group_id)
+    return RecordJSONResponse({"group": group, "members": members})
 
 @app.post("/api/judges/login")
 async def judge_login(request: JudgeLogin):
     """评委登录"""
-    judge = next((j for j in judges_data if j["judge_code"] == request.judge_code), None)
-    if not judge or judge["password"] != request.password:
+    judge = JudgeService.authenticate_judge(storage, request.judge_code, request.password)
+    if not judge:
         raise HTTPException(status_code=401, detail="评委编号或密码错误")
     
-    return {"success": True, "judge": judge, "token": f"judge_token_{judge['id']}"}
+    return {"success": True, "judge": judge_view(judge), "token": f"judge_token_{judge['id']}"}
 
 @app.post("/api/scores/submit")
 async def submit_score(request: ScoreSubmit):
     """提交评分"""
-    # 验证参赛者存在
-    participant = next((p for p in participants_data if p["id"] == request.participant_id), None)
-    if not participant:
-        raise HTTPException(status_code=404, detail="参赛者不存在")
-    
-    # 验证评委存在
-    judge = next((j for j in judges_data if j["id"] == request.judge_id), None)
-    if not judge:
-        raise HTTPException(status_code=404, detail="评委不存在")
-    
-    # 验证分数范围
-    if not (settings.min_score <= request.score <= settings.max_score):
-        raise HTTPException(status_code=400, detail=f"分数必须在{settings.min_score}-{settings.max_score}之间")
-    
-    # 检查是否已评分
-    existing_score = next((s for s in scores_data if s["participant_id"] == request.participant_id and s["judge_id"] == request.judge_id), None)
-    if existing_score:
-        existing_score["score"] = request.score
-        existing_score["updated_at"] = datetime.now().isoformat()
-    else:
-        scores_data.append({
-            "id": len(scores_data) + 1,
-            "participant_id": request.participant_id,
-            "judge_id": request.judge_id,
-            "score": request.score,
-            "created_at": datetime.now().isoformat()
-        })
+    result = ScoreService.submit_score(
+        storage, request.participant_id, request.judge_id, request.score,
+        min_score=settings.min_score, max_score=settings.max_score
+    )
+    if not result["success"]:
+        score_error(result)
     
     return {"success": True, "message": "评分提交成功"}
 
 @app.get("/api/statistics/checkin")
 async def get_checkin_statistics():
     """获取签到统计"""
-    total_participants = len(participants_data)
-    checked_in = len([p for p in participants_data if p["is_checked_in"]])
-    checkin_rate = (checked_in / total_participants * 100) if total_participants > 0 else 0
-    
-    return {
-        "total_participants": total_participants,
-        "checked_in": checked_in,
-        "not_checked_in": total_participants - checked_in,
-        "checkin_rate": round(checkin_rate, 2)
-    }
+    return StatisticsService.get_checkin_statistics(storage)
 
 @app.get("/api/statistics/scores")
 async def get_score_statistics():
     """获取评分统计"""
-    # 计算每个参赛者的平均分
-    participant_scores = {}
-    for score in scores_data:
-        pid = score["participant_id"]
-        if pid not in participant_scores:
-            participant_scores[pid] = []
-        participant_scores[pid].append(score["score"])
-    
-    # 计算平均分并排序
-    rankings = []
-    for pid, scores in participant_scores.items():
-        participant = next((p for p in participants_data if p["id"] == pid), None)
-        if participant:
-            avg_score = sum(scores) / len(scores)
-            rankings.append({
-                "participant": participant,
-                "average_score": round(avg_score, 2),
-                "score_count": len(scores)
-            })
-    
-    rankings.sort(key=lambda x: x["average_score"], reverse=True)
-    
-    return {
-        "total_scores": len(scores_data),
-        "participants_scored": len(participant_scores),
-        "rankings": rankings
-    }
+    return RecordJSONResponse(ScoreService.get_rankings(storage))
 
 @app.get("/api/participants/{participant_id}/qrcode")
-async def get_participant_qrcode(participant_id: int):
-    """获取参赛者二维码"""
-    participant = next((p for p in participants_data if p["id"] == participant_id), None)
+async def get_participant_qrcode(
+    participant_id: int,
+    format: str = "png",
+    if_none_match: Optional[str] = Header(None)
+):
+    """获取参赛者二维码（format=png 返回图片，format=json 返回 base64）"""
+    participant = storage.get("participants", participant_id)
     if not participant:
         raise HTTPException(status_code=404, detail="参赛者不存在")
     
     # 生成签到链接
     checkin_url = get_checkin_url(participant['qr_code_id'])
-    qr_code_data = generate_qr_code(checkin_url)
-    
-    return {"qr_code_data": qr_code_data, "checkin_url": checkin_url}
+    return qr_code_response(checkin_url, format, if_none_match)
 
 # 生成公共签到二维码
 @app.get("/api/qrcode/public")
-async def get_public_qrcode():
-    """获取公共签到二维码"""
-    checkin_url = get_checkin_url()
-    qr_code_data = generate_qr_code(checkin_url)
-    
-    return {
-        "qr_code_data": qr_code_data,
-        "checkin_url": checkin_url,
-        "description": "参赛者扫描此二维码进行签到"
-    }
+async def get_public_qrcode(format: str = "png", if_none_match: Optional[str] = Header(None)):
+    """获取公共签到二维码（format=png 返回图片，format=json 返回 base64）"""
+    return qr_code_response(
+        get_checkin_url(), format, if_none_match,
+        description="参赛者扫描此二维码进行签到"
+    )
 
 # 移动端签到验证
 @app.post("/api/mobile/checkin")
 async def mobile_checkin(request: CheckinRequest):
     """移动端签到验证"""
     # 根据手机后四位和姓名查找参赛者
-    participant = None
-    for p in participants_data:
-        if p["phone_last4"] == request.phone_last4 and p["name"] == request.name:
-            participant = p
-            break
+    participant = ParticipantService.find_by_phone_name(storage, request.phone_last4, request.name)
     
-    if not participant:
+    if participant is None:
         raise HTTPException(status_code=404, detail="未找到匹配的参赛者信息，请检查手机号后四位和姓名")
     
-    if participant["is_checked_in"]:
+    # 执行签到（同时记录签到日志）
+    result = CheckinService.checkin(storage, participant["id"])
+    participant = result["participant"]
+    if not result["success"]:
         return {
             "success": False, 
             "message": "您已经签到过了", 
@@ -420,21 +367,6 @@ async def mobile_checkin(request: CheckinRequest):
             "checkin_time": participant["checkin_time"]
         }
     
-    # 执行签到
-    participant["is_checked_in"] = True
-    participant["checkin_time"] = datetime.now().isoformat()
-    
-    # 记录签到日志
-    checkin_log = {
-        "id": len(checkin_logs) + 1,
-        "participant_id": participant["id"],
-        "participant_name": participant["name"],
-        "organization": participant["organization"],
-        "checkin_time": participant["checkin_time"],
-        "checkin_method": "mobile_qr"
-    }
-    checkin_logs.append(checkin_log)
-    
     return {
         "success": True, 
         "message": "签到成功！", 
@@ -454,18 +386,14 @@ async def mobile_checkin(request: CheckinRequest):
 @app.post("/api/mobile/judge/login")
 async def mobile_judge_login(request: JudgeLogin):
     """评委端登录"""
-    judge = None
-    for j in judges_data:
-        if j["judge_code"] == request.judge_code and j["password"] == request.password:
-            judge = j
-            break
+    judge = JudgeService.authenticate_judge(storage, request.judge_code, request.password)
     
     if not judge:
         raise HTTPException(status_code=401, detail="评委编号或密码错误")
     
     return {
         "success": True, 
-        "judge": judge, 
+        "judge": judge_view(judge), 
         "token": f"judge_token_{judge['id']}",
         "message": "登录成功"
     }
@@ -474,337 +402,53 @@ async def mobile_judge_login(request: JudgeLogin):
 @app.get("/api/mobile/judge/{judge_id}/participants")
 async def get_judge_participants(judge_id: int):
     """获取评委需要打分的参赛者列表"""
-    # 获取已签到的参赛者
-    checked_in_participants = [p.copy() for p in participants_data if p["is_checked_in"]]
-    
-    # 获取该评委已打分的记录
-    judge_scores = [s for s in scores_data if s["judge_id"] == judge_id]
-    scored_participant_ids = [s["participant_id"] for s in judge_scores]
-    
-    # 为每个参赛者添加打分状态
-    for participant in checked_in_participants:
-        participant["scored"] = participant["id"] in scored_participant_ids
-        if participant["scored"]:
-            score_record = next(s for s in judge_scores if s["participant_id"] == participant["id"])
-            participant["score"] = score_record["score"]
-        else:
-            participant["score"] = None
-    
-    return {
-        "participants": checked_in_participants,
-        "total_participants": len(checked_in_participants),
-        "scored_count": len([p for p in checked_in_participants if p["scored"]]),
-        "pending_count": len([p for p in checked_in_participants if not p["scored"]])
-    }
+    return RecordJSONResponse(ScoreService.get_judge_participants(storage, judge_id))
 
 # 移动端提交分数
 @app.post("/api/mobile/scores/submit")
 async def mobile_submit_score(request: ScoreSubmit):
-    """移动端提交分数"""
-    if not (settings.min_score <= request.score <= settings.max_score):
-        raise HTTPException(status_code=400, detail=f"分数必须在{settings.min_score}-{settings.max_score}之间")
-    
-    # 检查参赛者是否存在且已签到
-    participant = next((p for p in participants_data if p["id"] == request.participant_id), None)
-    if not participant:
-        raise HTTPException(status_code=404, detail="参赛者不存在")
-    
-    if not participant["is_checked_in"]:
-        raise HTTPException(status_code=400, detail="该参赛者尚未签到，无法打分")
-    
-    # 检查是否已经打过分
-    existing_score = next((s for s in scores_data if s["participant_id"] == request.participant_id and s["judge_id"] == request.judge_id), None)
-    
-    if existing_score:
-        # 更新分数
-        existing_score["score"] = request.score
-        existing_score["updated_at"] = datetime.now().isoformat()
-        message = "分数更新成功"
-    else:
-        # 新增分数
-        new_score = {
-            "id": len(scores_data) + 1,
-            "participant_id": request.participant_id,
-            "judge_id": request.judge_id,
-            "score": request.score,
-            "created_at": datetime.now().isoformat()
-        }
-        scores_data.append(new_score)
-        message = "评分提交成功"
+    """移动端提交分数（只能给已签到的参赛者打分）"""
+    result = ScoreService.submit_score(
+        storage, request.participant_id, request.judge_id, request.score,
+        min_score=settings.min_score, max_score=settings.max_score, require_checkin=True
+    )
+    if not result["success"]:
+        score_error(result)
     
     return {
         "success": True, 
-        "message": message,
+        "message": result["message"],
         "score": request.score,
-        "participant_name": participant["name"]
-    }
-
-# 生成公共签到二维码（重复接口，已在上面定义）
-# @app.get("/api/qrcode/public")
-# async def get_public_qrcode():
-#     """获取公共签到二维码"""
-#     checkin_url = get_checkin_url()
-#     qr_code_data = generate_qr_code(checkin_url)
-#     
-#     return {
-#         "qr_code_data": qr_code_data,
-#         "checkin_url": checkin_url,
-#         "description": "参赛者扫描此二维码进行签到"
-#     }
-
-# 移动端签到验证
-@app.post("/api/mobile/checkin")
-async def mobile_checkin(request: CheckinRequest):
-    """移动端签到验证"""
-    # 根据手机后四位和姓名查找参赛者
-    participant = None
-    for p in participants_data:
-        if p["phone_last4"] == request.phone_last4 and p["name"] == request.name:
-            participant = p
-            break
-    
-    if not participant:
-        raise HTTPException(status_code=404, detail="未找到匹配的参赛者信息，请检查手机号后四位和姓名")
-    
-    if participant["is_checked_in"]:
-        return {
-            "success": False, 
-            "message": "您已经签到过了", 
-            "participant": participant,
-            "checkin_time": participant["checkin_time"]
-        }
-    
-    # 执行签到
-    participant["is_checked_in"] = True
-    participant["checkin_time"] = datetime.now().isoformat()
-    
-    # 记录签到日志
-    checkin_log = {
-        "id": len(checkin_logs) + 1,
-        "participant_id": participant["id"],
-        "participant_name": participant["name"],
-        "organization": participant["organization"],
-        "checkin_time": participant["checkin_time"],
-        "checkin_method": "mobile_qr"
-    }
-    checkin_logs.append(checkin_log)
-    
-    return {
-        "success": True, 
-        "message": "签到成功！", 
-        "participant": participant,
-        "group_info": {
-            "group_id": participant["group_id"],
-            "group_name": participant["group_name"]
-        },
-        "competition_info": {
-            "name": "联盟杯内训师大赛",
-            "date": "2024年9月24日",
-            "location": "比赛现场"
-        }
-    }
-
-# 评委端登录
-@app.post("/api/mobile/judge/login")
-async def mobile_judge_login(request: JudgeLogin):
-    """评委端登录"""
-    judge = None
-    for j in judges_data:
-        if j["judge_code"] == request.judge_code and j["password"] == request.password:
-            judge = j
-            break
-    
-    if not judge:
-        raise HTTPException(status_code=401, detail="评委编号或密码错误")
-    
-    return {
-        "success": True, 
-        "judge": judge, 
-        "token": f"judge_token_{judge['id']}",
-        "message": "登录成功"
-    }
-
-# 获取评委的打分列表
-@app.get("/api/mobile/judge/{judge_id}/participants")
-async def get_judge_participants(judge_id: int):
-    """获取评委需要打分的参赛者列表"""
-    # 获取已签到的参赛者
-    checked_in_participants = [p.copy() for p in participants_data if p["is_checked_in"]]
-    
-    # 获取该评委已打分的记录
-    judge_scores = [s for s in scores_data if s["judge_id"] == judge_id]
-    scored_participant_ids = [s["participant_id"] for s in judge_scores]
-    
-    # 为每个参赛者添加打分状态
-    for participant in checked_in_participants:
-        participant["scored"] = participant["id"] in scored_participant_ids
-        if participant["scored"]:
-            score_record = next(s for s in judge_scores if s["participant_id"] == participant["id"])
-            participant["score"] = score_record["score"]
-        else:
-            participant["score"] = None
-    
-    return {
-        "participants": checked_in_participants,
-        "total_participants": len(checked_in_participants),
-        "scored_count": len([p for p in checked_in_participants if p["scored"]]),
-        "pending_count": len([p for p in checked_in_participants if not p["scored"]])
-    }
-
-# 移动端提交分数
-@app.post("/api/mobile/scores/submit")
-async def mobile_submit_score(request: ScoreSubmit):
-    """移动端提交分数"""
-    if not (0 <= request.score <= 10):
-        raise HTTPException(status_code=400, detail="分数必须在0-10之间")
-    
-    # 检查参赛者是否存在且已签到
-    participant = next((p for p in participants_data if p["id"] == request.participant_id), None)
-    if not participant:
-        raise HTTPException(status_code=404, detail="参赛者不存在")
-    
-    if not participant["is_checked_in"]:
-        raise HTTPException(status_code=400, detail="该参赛者尚未签到，无法打分")
-    
-    # 检查是否已经打过分
-    existing_score = next((s for s in scores_data if s["participant_id"] == request.participant_id and s["judge_id"] == request.judge_id), None)
-    
-    if existing_score:
-        # 更新分数
-        existing_score["score"] = request.score
-        existing_score["updated_at"] = datetime.now().isoformat()
-        message = "分数更新成功"
-    else:
-        # 新增分数
-        new_score = {
-            "id": len(scores_data) + 1,
-            "participant_id": request.participant_id,
-            "judge_id": request.judge_id,
-            "score": request.score,
-            "created_at": datetime.now().isoformat()
-        }
-        scores_data.append(new_score)
-        message = "评分提交成功"
-    
-    return {
-        "success": True, 
-        "message": message,
-        "score": request.score,
-        "participant_name": participant["name"]
+        "participant_name": result["score"]["participant_name"]
     }
 
 # 获取分组统计
 @app.get("/api/statistics/groups")
 async def get_group_statistics():
     """获取分组统计信息"""
-    group_stats = []
-    for group in groups_data:
-        group_participants = [p for p in participants_data if p["group_id"] == group["id"]]
-        checked_in_count = len([p for p in group_participants if p["is_checked_in"]])
-        
-        group_stats.append({
-            "group_name": group["name"],
-            "total": len(group_participants),
-            "checked_in": checked_in_count
-        })
-    
-    return group_stats
+    return GroupService.get_group_statistics(storage)
 
 # 获取最近签到记录
 @app.get("/api/checkins/recent")
 async def get_recent_checkins(limit: int = 10):
     """获取最近的签到记录"""
-    # 获取已签到的参赛者，按签到时间倒序
-    checked_in_participants = [p for p in participants_data if p["is_checked_in"] and p.get("checkin_time")]
-    checked_in_participants.sort(key=lambda x: x["checkin_time"], reverse=True)
-    
-    recent_checkins = []
-    for participant in checked_in_participants[:limit]:
-        recent_checkins.append({
-            "id": participant["id"],
-            "name": participant["name"],
-            "organization": participant["organization"],
-            "checkin_time": participant["checkin_time"]
-        })
-    
-    return recent_checkins
+    return CheckinService.get_recent_checkins(storage, limit)
 
 # 获取签到时间分布统计
 @app.get("/api/statistics/checkin-timeline")
 async def get_checkin_timeline():
     """获取签到时间分布"""
-    from datetime import datetime
-    
-    # 统计每小时的签到数量
-    hourly_counts = {}
-    for i in range(24):
-        hourly_counts[f"{i:02d}"] = 0
-    
-    # 统计实际签到数据
-    for participant in participants_data:
-        if participant["is_checked_in"] and participant.get("checkin_time"):
-            try:
-                checkin_dt = datetime.fromisoformat(participant["checkin_time"].replace('Z', '+00:00'))
-                hour = f"{checkin_dt.hour:02d}"
-                hourly_counts[hour] += 1
-            except:
-                continue
-    
-    return {
-        "hours": list(hourly_counts.keys()),
-        "counts": list(hourly_counts.values())
-    }
+    return StatisticsService.get_hourly_checkins(storage)
 
 # 获取参赛者详细信息
 @app.get("/api/participants/{participant_id}/detail")
 async def get_participant_detail(participant_id: int):
     """获取参赛者详细信息"""
-    participant = next((p for p in participants_data if p["id"] == participant_id), None)
-    if not participant:
+    participant_detail = ParticipantService.get_participant_detail(storage, participant_id)
+    if not participant_detail:
         raise HTTPException(status_code=404, detail="参赛者不存在")
-    
-    # 获取分组信息
-    group = next((g for g in groups_data if g["id"] == participant["group_id"]), None)
-    group_name = group["name"] if group else "未分组"
-    
-    # 获取评分信息
-    participant_scores = [s for s in scores_data if s["participant_id"] == participant_id]
-    
-    # 计算平均分
-    avg_score = 0
-    if participant_scores:
-        avg_score = sum(s["score"] for s in participant_scores) / len(participant_scores)
-    
-    # 获取评委信息
-    detailed_scores = []
-    for score in participant_scores:
-        judge = next((j for j in judges_data if j["id"] == score["judge_id"]), None)
-        detailed_scores.append({
-            "score": score["score"],
-            "created_at": score["created_at"],
-            "judge_name": judge["name"] if judge else "未知评委"
-        })
-    
-    participant_detail = {
-        **participant,
-        "group_name": group_name,
-        "score_count": len(participant_scores),
-        "avg_score": round(avg_score, 2),
-        "scores": detailed_scores
-    }
-    
     return participant_detail
 
-# 添加额外的API接口（如果存在）
-try:
-    try:
-        from .app_additional_apis import add_additional_apis
-    except ImportError:
-        from app_additional_apis import add_additional_apis
-    add_additional_apis(app, participants_data, groups_data, scores_data, judges_data)
-except ImportError:
-    print("app_additional_apis 模块不存在，跳过额外API加载")
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -35,8 +35,30 @@ class Settings(BaseSettings):
     photos_dir: str = "./data/photos"
     exports_dir: str = "./data/exports"
     
-    # 数据库配置（如果使用数据库）
-    database_url: str = "sqlite:///./data/signSystem.db"
+    # simple_app / app_fixed 的存储后端：memory（内存）、log（内存 + 追加日志）、sqlite
+    # 留空时 simple_app 使用 log，app_fixed 使用 memory；storage_path 留空时使用 data_dir 下的默认文件
+    storage_backend: str = ""
+    storage_path: str = ""
+    storage_fsync: bool = False  # 每次写入都同步到磁盘，断电也不丢数据，但写入变慢
+    storage_compact_threshold: int = 10000  # log 后端日志达到该条数（且不少于记录总数）时写快照并清空日志
+    
+    # 数据库配置
+    database_url: str = "sqlite:///./data/database.db"
+    database_echo: bool = False  # 设置为True可以看到SQL语句
+    db_max_connections: int = 20  # 所有 worker 合计的常驻连接数，按 worker 数平分
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    web_concurrency: int = 1  # uvicorn worker 数，与 WEB_CONCURRENCY 环境变量一致
+    db_execution_mode: str = "threadpool"  # threadpool: 同步引擎+有界线程池; async: aiosqlite 异步引擎
+    db_thread_pool_size: int = 0  # threadpool 模式下同时执行数据库操作的线程数，0 表示取连接池大小 + db_max_overflow（也是上限）
+    db_raise_on_lazy_load: bool = False  # 调试用：列表查询中出现意外的懒加载时直接报错
+    
+    # SQLite 调优（每个连接建立时通过 PRAGMA 设置）
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kb: int = 20000
+    sqlite_mmap_size: int = 268435456
     
     # 比赛信息配置
     competition_name: str = "联盟杯内训师大赛"
@@ -50,15 +72,22 @@ class Settings(BaseSettings):
     # 安全配置
     secret_key: str = "your-secret-key-here"
     access_token_expire_minutes: int = 30
+    judge_import_bcrypt_rounds: int = 0  # 导入和示例评委的 bcrypt 成本因子，0 表示使用 passlib 默认值（12）；调低会削弱密码强度，需显式开启
+    password_hash_workers: int = 0  # 批量哈希密码的进程数，0 表示使用 CPU 核数
     
     # 评分配置
     min_score: float = 0.0
     max_score: float = 10.0
+    ranking_cache_ttl: float = 0  # 实时排名缓存有效秒数，0 表示一直有效；多 worker 部署时建议设为几秒
+    
+    # 统计快照配置
+    stats_snapshot_ttl: float = 0  # 统计快照有效秒数，0 表示只在数据变化时重算；多 worker 部署时建议设为几秒
     
     # 二维码配置
     qr_code_version: int = 1
     qr_code_box_size: int = 10
     qr_code_border: int = 5
+    qr_render_workers: int = 0  # 批量生成二维码的进程数，0 表示使用 CPU 核数
     
     # 环境配置
     environment: str = "development"  # development, production, testing
@@ -105,6 +134,17 @@ def is_development() -> bool:
     """判断是否为开发环境"""
     return settings.environment == "development"
 
+def get_db_pool_size() -> int:
+    """每个 worker 进程的连接池大小"""
+    return max(2, settings.db_max_connections // max(1, settings.web_concurrency))
+
+def get_db_thread_pool_size() -> int:
+    """每个 worker 进程同时执行数据库操作的线程数，不超过连接池能借出的连接数"""
+    max_connections = get_db_pool_size() + settings.db_max_overflow
+    if settings.db_thread_pool_size <= 0:
+        return max_connections
+    return min(settings.db_thread_pool_size, max_connections)
+
 def get_cors_origins() -> List[str]:
     """获取CORS配置列表"""
     if isinstance(settings.cors_origins, str):
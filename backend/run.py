@@ -27,12 +27,16 @@ def main():
             print("警告: 数据库文件不存在，请先运行 python init_db.py 初始化数据库")
             return
         
-        # 启动服务器
+        from config import settings
+        
+        # 启动服务器（多 worker 时不能使用 reload）
+        workers = max(1, settings.web_concurrency)
         uvicorn.run(
             "app.main:app",
             host="0.0.0.0",
             port=8000,
-            reload=True,
+            reload=workers == 1,
+            workers=workers,
             log_level="info",
             access_log=True
         )
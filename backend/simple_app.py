@@ -3,17 +3,25 @@
 简化版后端应用 - 用于快速启动和测试
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 from typing import List, Optional
 import json
 import os
+import secrets
 from datetime import datetime
 import qrcode
 from io import BytesIO
-import base64
+from config import settings
+from app.cache.qr_image import QRImageCache
+from app.storage import Storage, SCHEMAS, create_storage
+from app.storage.responses import RecordJSONResponse
+from app.storage.services import (
+    ParticipantService, GroupService, JudgeService, CheckinService, ScoreService, StatisticsService
+)
+from app.utils.auth import hash_password
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -85,89 +93,120 @@ class ScoreRequest(BaseModel):
     participant_id: int
     score: float
 
-# 内存数据存储
-data_store = {
-    "participants": [],
-    "groups": [],
-    "judges": [],
-    "scores": [],
-    "checkin_logs": []
-}
+# 数据存储（启动时按配置创建，默认使用追加日志后端）
+storage: Optional[Storage] = None
+
+# 旧版数据文件（每次写入整体重写的 JSON），存储为空时导入一次
+LEGACY_DATA_FILE = "data/simple_data.json"
+
+# 示例评委的初始密码
+DEFAULT_PASSWORDS = {"admin": "admin123", "judge01": "123456", "judge02": "123456"}
 
-# 数据文件路径
-DATA_FILE = "data/simple_data.json"
+# 简化版提交评分时使用的默认评委
+DEFAULT_JUDGE_ID = 1
 
 def load_data():
-    """加载数据"""
-    global data_store
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                data_store = json.load(f)
-        except Exception as e:
-            print(f"加载数据失败: {e}")
+    """打开存储，首次启动时导入旧版数据或初始化示例数据"""
+    global storage
+    storage = create_storage(
+        settings.storage_backend or "log",
+        settings.storage_path or None,
+        name="simple_data",
+        data_dir=settings.data_dir,
+        fsync=settings.storage_fsync,
+        compact_threshold=settings.storage_compact_threshold
+    )
+    if storage.is_empty():
+        if os.path.exists(LEGACY_DATA_FILE):
+            import_legacy_data(LEGACY_DATA_FILE)
+        else:
             init_sample_data()
-    else:
-        init_sample_data()
 
-def save_data():
-    """保存数据"""
-    os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data_store, f, ensure_ascii=False, indent=2)
+def import_legacy_data(path: str):
+    """导入旧版 JSON 数据文件（保留原有ID，分组成员数、分组名称等派生字段不再保存）"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"加载数据失败: {e}")
+        init_sample_data()
+        return
+    
+    def pick(table: str, record: dict) -> dict:
+        fields = SCHEMAS[table].fields
+        return {k: v for k, v in record.items() if k == "id" or k in fields}
+    
+    for group in data.get("groups", []):
+        storage.insert("groups", pick("groups", group))
+    for participant in data.get("participants", []):
+        storage.insert("participants", pick("participants", participant))
+    for judge in data.get("judges", []):
+        # 旧版不保存密码，没有默认密码的评委设置随机密码（旧版同样无法登录）
+        password = DEFAULT_PASSWORDS.get(judge["username"]) or secrets.token_urlsafe()
+        storage.insert("judges", {
+            **pick("judges", judge),
+            "password": hash_password(password, settings.judge_import_bcrypt_rounds)
+        })
+    # 旧版重复提交会追加多条评分，同一参赛者和评委只保留最后一条
+    scores = {}
+    for score in data.get("scores", []):
+        scores[(score["participant_id"], score["judge_id"])] = score
+    for score in scores.values():
+        storage.insert("scores", pick("scores", score))
+    for log in data.get("checkin_logs", []):
+        storage.insert("checkin_logs", pick("checkin_logs", log))
 
 def init_sample_data():
     """初始化示例数据"""
-    global data_store
-    
-    # 创建示例分组
     groups = [
-        {"id": 1, "name": "第1组", "description": "XX银行", "member_count": 0, "organizations": ["XX银行"], "created_at": datetime.now().isoformat()},
-        {"id": 2, "name": "第2组", "description": "YY银行", "member_count": 0, "organizations": ["YY银行"], "created_at": datetime.now().isoformat()},
-        {"id": 3, "name": "第3组", "description": "ZZ银行", "member_count": 0, "organizations": ["ZZ银行"], "created_at": datetime.now().isoformat()},
+        {"id": 1, "name": "第1组", "description": "XX银行"},
+        {"id": 2, "name": "第2组", "description": "YY银行"},
+        {"id": 3, "name": "第3组", "description": "ZZ银行"},
     ]
     
-    # 创建示例参赛者
     participants = [
-        {"id": 1, "name": "张三", "organization": "XX银行", "phone": "13812345678", "phone_last4": "5678", "group_id": 1, "group_name": "第1组", "qr_code_id": "QR001", "is_checked_in": False, "created_at": datetime.now().isoformat()},
-        {"id": 2, "name": "李四", "organization": "XX银行", "phone": "13887654321", "phone_last4": "4321", "group_id": 1, "group_name": "第1组", "qr_code_id": "QR002", "is_checked_in": False, "created_at": datetime.now().isoformat()},
-        {"id": 3, "name": "王五", "organization": "YY银行", "phone": "13911111111", "phone_last4": "1111", "group_id": 2, "group_name": "第2组", "qr_code_id": "QR003", "is_checked_in": False, "created_at": datetime.now().isoformat()},
-        {"id": 4, "name": "赵六", "organization": "YY银行", "phone": "13922222222", "phone_last4": "2222", "group_id": 2, "group_name": "第2组", "qr_code_id": "QR004", "is_checked_in": False, "created_at": datetime.now().isoformat()},
-        {"id": 5, "name": "孙七", "organization": "ZZ银行", "phone": "13933333333", "phone_last4": "3333", "group_id": 3, "group_name": "第3组", "qr_code_id": "QR005", "is_checked_in": False, "created_at": datetime.now().isoformat()},
+        {"id": 1, "name": "张三", "organization": "XX银行", "phone": "13812345678", "phone_last4": "5678", "group_id": 1, "qr_code_id": "QR001"},
+        {"id": 2, "name": "李四", "organization": "XX银行", "phone": "13887654321", "phone_last4": "4321", "group_id": 1, "qr_code_id": "QR002"},
+        {"id": 3, "name": "王五", "organization": "YY银行", "phone": "13911111111", "phone_last4": "1111", "group_id": 2, "qr_code_id": "QR003"},
+        {"id": 4, "name": "赵六", "organization": "YY银行", "phone": "13922222222", "phone_last4": "2222", "group_id": 2, "qr_code_id": "QR004"},
+        {"id": 5, "name": "孙七", "organization": "ZZ银行", "phone": "13933333333", "phone_last4": "3333", "group_id": 3, "qr_code_id": "QR005"},
     ]
     
-    # 创建示例评委
     judges = [
-        {"id": 1, "name": "系统管理员", "username": "admin", "organization": "管理组", "is_active": True, "created_at": datetime.now().isoformat()},
-        {"id": 2, "name": "张评委", "username": "judge01", "organization": "评委组", "is_active": True, "created_at": datetime.now().isoformat()},
-        {"id": 3, "name": "李评委", "username": "judge02", "organization": "评委组", "is_active": True, "created_at": datetime.now().isoformat()},
+        {"name": "系统管理员", "username": "admin", "organization": "管理组"},
+        {"name": "张评委", "username": "judge01", "organization": "评委组"},
+        {"name": "李评委", "username": "judge02", "organization": "评委组"},
     ]
     
-    # 更新分组成员数量
     for group in groups:
-        group["member_count"] = len([p for p in participants if p["group_id"] == group["id"]])
-    
-    data_store = {
-        "participants": participants,
-        "groups": groups,
-        "judges": judges,
-        "scores": [],
-        "checkin_logs": []
-    }
-    
-    save_data()
+        storage.insert("groups", group)
+    for participant in participants:
+        storage.insert("participants", participant)
+    for judge in judges:
+        JudgeService.create_judge(
+            storage, password=DEFAULT_PASSWORDS[judge["username"]],
+            rounds=settings.judge_import_bcrypt_rounds, **judge
+        )
 
-def generate_qr_code(data: str) -> str:
-    """生成二维码并返回base64编码"""
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+def render_qr_png(data: str, box_size: int = 10, border: int = 5) -> bytes:
+    """渲染二维码PNG"""
+    qr = qrcode.QRCode(version=1, box_size=box_size, border=border)
     qr.add_data(data)
     qr.make(fit=True)
     
     img = qr.make_image(fill_color="black", back_color="white")
     buffer = BytesIO()
     img.save(buffer, format='PNG')
-    img_str = base64.b64encode(buffer.getvalue()).decode()
-    return f"data:image/png;base64,{img_str}"
+    return buffer.getvalue()
+
+# 二维码图片缓存：签到链接不变时直接复用已渲染的图片
+qr_images = QRImageCache(render_qr_png, cache_dir="data/qrcodes/cache")
+# 二维码图片的浏览器缓存时间（秒），过期后凭 ETag 重新验证
+QR_IMAGE_MAX_AGE = 86400
+
+def generate_qr_code(data: str) -> str:
+    """生成二维码并返回base64编码"""
+    return qr_images.get(data).data_url
 
 # API路由
 @app.get("/")
@@ -176,79 +215,62 @@ async def root():
 
 @app.get("/api/participants")
 async def get_participants():
-    return {
-        "items": data_store["participants"],
-        "total": len(data_store["participants"]),
+    participants = ParticipantService.get_participants(storage)
+    return RecordJSONResponse({
+        "items": participants,
+        "total": len(participants),
         "page": 1,
         "size": 100,
         "pages": 1
-    }
+    })
 
 @app.get("/api/participants/{participant_id}")
 async def get_participant(participant_id: int):
-    participant = next((p for p in data_store["participants"] if p["id"] == participant_id), None)
+    participant = ParticipantService.get_participant(storage, participant_id)
     if not participant:
         raise HTTPException(status_code=404, detail="参赛者不存在")
     return participant
 
 @app.get("/api/participants/qr/{qr_id}")
 async def get_participant_by_qr(qr_id: str):
-    participant = next((p for p in data_store["participants"] if p["qr_code_id"] == qr_id), None)
+    participant = ParticipantService.get_participant_by_qr_code(storage, qr_id)
     if not participant:
         raise HTTPException(status_code=404, detail="二维码无效")
     return participant
 
 @app.post("/api/checkin/verify")
 async def verify_checkin(request: CheckinRequest):
-    # 查找参赛者
-    participant = next((p for p in data_store["participants"] if p["qr_code_id"] == request.qr_code_id), None)
-    if not participant:
-        return {"success": False, "message": "二维码无效"}
+    # 验证二维码和身份信息
+    result = CheckinService.verify_identity(storage, request.qr_code_id, request.phone_last4, request.name)
+    if not result["success"]:
+        return {"success": False, "message": result["message"]}
     
-    # 验证信息
-    if participant["phone_last4"] != request.phone_last4 or participant["name"] != request.name:
-        return {"success": False, "message": "验证信息不匹配"}
-    
-    # 检查是否已签到
-    if participant["is_checked_in"]:
+    # 完成签到（同时记录签到日志）
+    result = CheckinService.checkin(storage, result["participant"]["id"])
+    if not result["success"]:
         return {"success": False, "message": "已经签到过了"}
     
-    # 完成签到
-    participant["is_checked_in"] = True
-    participant["checkin_time"] = datetime.now().isoformat()
-    
-    # 记录签到日志
-    checkin_log = {
-        "id": len(data_store["checkin_logs"]) + 1,
-        "participant_id": participant["id"],
-        "participant_name": participant["name"],
-        "organization": participant["organization"],
-        "checkin_time": participant["checkin_time"]
-    }
-    data_store["checkin_logs"].append(checkin_log)
-    
-    save_data()
-    
-    return {"success": True, "participant": participant}
+    return {"success": True, "participant": result["participant"]}
 
 @app.get("/api/groups")
 async def get_groups():
-    return data_store["groups"]
+    return RecordJSONResponse(GroupService.get_all_groups(storage))
 
 @app.get("/api/groups/{group_id}")
 async def get_group(group_id: int):
-    group = next((g for g in data_store["groups"] if g["id"] == group_id), None)
+    group = GroupService.get_group(storage, group_id)
     if not group:
         raise HTTPException(status_code=404, detail="分组不存在")
     
-    members = [p for p in data_store["participants"] if p["group_id"] == group_id]
-    return {**group, "members": members}
+    members = GroupService.get_group_members(storage, group_id)
+    return RecordJSONResponse({**group, "members": members})
 
 @app.get("/api/judges")
 async def get_judges():
+    judges = JudgeService.get_all_judges(storage)
     return {
-        "items": data_store["judges"],
-        "total": len(data_store["judges"]),
+        "items": judges,
+        "total": len(judges),
         "page": 1,
         "size": 100,
         "pages": 1
@@ -256,16 +278,10 @@ async def get_judges():
 
 @app.post("/api/judges/login")
 async def judge_login(request: LoginRequest):
-    # 简单的登录验证
-    judge = next((j for j in data_store["judges"] if j["username"] == request.username), None)
+    judge = JudgeService.authenticate_judge(storage, request.username, request.password)
     if not judge:
         raise HTTPException(status_code=401, detail="用户名或密码错误")
     
-    # 简化密码验证（实际应用中应该使用哈希验证）
-    valid_passwords = {"admin": "admin123", "judge01": "123456", "judge02": "123456"}
-    if request.password != valid_passwords.get(request.username):
-        raise HTTPException(status_code=401, detail="用户名或密码错误")
-    
     return {
         "success": True,
         "judge": judge,
@@ -275,115 +291,62 @@ async def judge_login(request: LoginRequest):
 
 @app.get("/api/scores")
 async def get_scores():
-    return {
-        "items": data_store["scores"],
-        "total": len(data_store["scores"]),
+    scores = ScoreService.get_all_scores(storage)
+    return RecordJSONResponse({
+        "items": scores,
+        "total": len(scores),
         "page": 1,
         "size": 100,
         "pages": 1
-    }
+    })
 
 @app.post("/api/scores")
 async def submit_score(request: ScoreRequest):
-    # 查找参赛者
-    participant = next((p for p in data_store["participants"] if p["id"] == request.participant_id), None)
-    if not participant:
-        raise HTTPException(status_code=404, detail="参赛者不存在")
-    
-    # 创建评分记录（简化版，不验证评委）
-    score = {
-        "id": len(data_store["scores"]) + 1,
-        "participant_id": request.participant_id,
-        "participant_name": participant["name"],
-        "judge_id": 1,  # 简化为默认评委
-        "judge_name": "系统评委",
-        "score": request.score,
-        "created_at": datetime.now().isoformat()
-    }
-    
-    data_store["scores"].append(score)
-    save_data()
-    
-    # 计算平均分
-    participant_scores = [s for s in data_store["scores"] if s["participant_id"] == request.participant_id]
-    avg_score = sum(s["score"] for s in participant_scores) / len(participant_scores)
+    # 简化版不验证评委，使用默认评委；重复提交时覆盖原分数
+    result = ScoreService.submit_score(
+        storage, request.participant_id, DEFAULT_JUDGE_ID, request.score,
+        min_score=settings.min_score, max_score=settings.max_score
+    )
+    if not result["success"]:
+        status_code = 400 if result["error_code"] == "INVALID_SCORE_RANGE" else 404
+        raise HTTPException(status_code=status_code, detail=result["message"])
     
+    average = ScoreService.get_participant_average(storage, request.participant_id)
     return {
         "success": True,
-        "score": score,
-        "participant_avg_score": avg_score,
-        "total_scores": len(participant_scores)
+        "score": result["score"],
+        "participant_avg_score": average["average_score"],
+        "total_scores": average["score_count"]
     }
 
 @app.get("/api/statistics/overview")
 async def get_statistics():
-    participants = data_store["participants"]
-    checked_in = [p for p in participants if p["is_checked_in"]]
-    scores = data_store["scores"]
-    
-    # 按单位统计签到情况
-    org_stats = {}
-    for p in participants:
-        org = p["organization"]
-        if org not in org_stats:
-            org_stats[org] = {"total": 0, "checked_in": 0}
-        org_stats[org]["total"] += 1
-        if p["is_checked_in"]:
-            org_stats[org]["checked_in"] += 1
-    
-    checkin_by_organization = [
-        {
-            "organization": org,
-            "total": stats["total"],
-            "checked_in": stats["checked_in"],
-            "rate": (stats["checked_in"] / stats["total"] * 100) if stats["total"] > 0 else 0
-        }
-        for org, stats in org_stats.items()
-    ]
-    
-    # 签到时间线
-    checkin_timeline = []
-    for log in data_store["checkin_logs"]:
-        time_str = log["checkin_time"][:16]  # 精确到分钟
-        existing = next((item for item in checkin_timeline if item["time"] == time_str), None)
-        if existing:
-            existing["count"] += 1
-        else:
-            checkin_timeline.append({"time": time_str, "count": 1})
-    
-    # 评分分布
-    score_distribution = [
-        {"range": "0-2", "count": len([s for s in scores if 0 <= s["score"] < 2])},
-        {"range": "2-4", "count": len([s for s in scores if 2 <= s["score"] < 4])},
-        {"range": "4-6", "count": len([s for s in scores if 4 <= s["score"] < 6])},
-        {"range": "6-8", "count": len([s for s in scores if 6 <= s["score"] < 8])},
-        {"range": "8-10", "count": len([s for s in scores if 8 <= s["score"] <= 10])},
-    ]
-    
-    return {
-        "total_participants": len(participants),
-        "checked_in_count": len(checked_in),
-        "checkin_rate": (len(checked_in) / len(participants) * 100) if participants else 0,
-        "total_groups": len(data_store["groups"]),
-        "total_judges": len(data_store["judges"]),
-        "total_scores": len(scores),
-        "avg_score": (sum(s["score"] for s in scores) / len(scores)) if scores else 0,
-        "checkin_by_organization": checkin_by_organization,
-        "checkin_timeline": checkin_timeline,
-        "score_distribution": score_distribution
-    }
+    return StatisticsService.get_overview(storage)
 
 @app.get("/api/participants/{participant_id}/qrcode")
-async def get_participant_qrcode(participant_id: int):
-    participant = next((p for p in data_store["participants"] if p["id"] == participant_id), None)
+async def get_participant_qrcode(
+    participant_id: int,
+    format: str = "png",
+    if_none_match: Optional[str] = Header(None)
+):
+    """获取参赛者二维码（format=png 返回图片，format=json 返回 base64）"""
+    if format not in ("png", "json"):
+        raise HTTPException(status_code=400, detail="format 只支持 png、json")
+    
+    participant = storage.get("participants", participant_id)
     if not participant:
         raise HTTPException(status_code=404, detail="参赛者不存在")
     
     # 生成签到链接
     checkin_url = f"http://localhost:3000/mobile/checkin/{participant['qr_code_id']}"
-    qr_code_data = generate_qr_code(checkin_url)
+    image = qr_images.get(checkin_url)
+    if format == "json":
+        return {"qr_code_data": image.data_url, "checkin_url": checkin_url}
     
-    return {"qr_code_data": qr_code_data, "checkin_url": checkin_url}
+    headers = {"ETag": image.etag, "Cache-Control": f"public, max-age={QR_IMAGE_MAX_AGE}"}
+    if image.matches(if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=image.body, media_type=image.media_type, headers=headers)
 
 # 启动时加载数据
 @app.on_event("startup")
@@ -402,6 +365,10 @@ async def startup_event():
     print("- 评委: judge01 / 123456")
     print("=" * 60)
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    storage.close()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
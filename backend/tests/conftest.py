@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+# 测试从 backend 目录导入 config 和 app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+import app.models  # noqa: F401  注册全部模型
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """临时文件上的 SQLite 数据库，返回会话工厂（多个会话可以各自持有连接，模拟并发请求）"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    try:
+        yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture(params=[True, False], ids=["returning", "no-returning"])
+def returning(request, session_factory, monkeypatch):
+    """
+    参数化数据库能力：支持 INSERT ... RETURNING / ON CONFLICT（SQLite、PostgreSQL），
+    或都不支持（按 MySQL 的方言能力关掉，走各服务的退回路径）
+    """
+    if not request.param:
+        from app.services import score_service
+        dialect = session_factory.kw["bind"].dialect
+        for flag in ("insert_returning", "insert_executemany_returning",
+                     "insert_executemany_returning_sort_by_parameter_order"):
+            monkeypatch.setattr(dialect, flag, False)
+        monkeypatch.setattr(score_service, "_UPSERT_INSERTS", {})
+    return request.param
@@ -0,0 +1,57 @@
+"""
+签到身份索引：并发扫码只有一次签到生效、条目修改和删除后辅助索引同步
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.cache.identity_index import CheckinIdentityIndex, IdentityEntry
+
+
+def _index(count: int = 5) -> CheckinIdentityIndex:
+    index = CheckinIdentityIndex()
+    index.load(IdentityEntry(i, f"QR{i}", f"参赛者{i}", f"{i:04d}") for i in range(1, count + 1))
+    return index
+
+
+def test_concurrent_scans_check_in_once():
+    index = _index()
+    barrier = threading.Barrier(16)
+
+    def scan(_):
+        barrier.wait()
+        return index.mark_checked_in(3, "2026-01-01T09:00:00")
+
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(scan, range(16)))
+
+    assert results.count(True) == 1
+    assert index.get("QR3").is_checked_in
+
+    # 写库失败回滚后可以再次签到
+    index.mark_not_checked_in(3)
+    assert index.mark_checked_in(3, "2026-01-01T09:01:00")
+
+
+def test_verify_requires_all_three_fields():
+    index = _index()
+
+    assert index.verify("QR2", "0002", "参赛者2").id == 2
+    assert index.verify("QR2", "0002", "参赛者3") is None
+    assert index.verify("QR2", "0003", "参赛者2") is None
+    assert index.verify("QR9", "0002", "参赛者2") is None
+
+
+def test_upsert_and_remove_keep_secondary_keys_in_sync():
+    index = _index()
+
+    index.upsert(IdentityEntry(2, "QR2-new", "改名", "9999"))
+    assert index.get("QR2") is None
+    assert index.find_by_phone_name("0002", "参赛者2") is None
+    assert index.verify("QR2-new", "9999", "改名").id == 2
+
+    assert index.remove(2)
+    assert not index.remove(2)
+    assert index.get("QR2-new") is None
+    assert index.find_by_phone_name("9999", "改名") is None
+    assert len(index) == 4
@@ -0,0 +1,145 @@
+"""
+签到组提交写入器：合并提交、队列满背压、确认超时、整批失败逐条重试、停止时清空队列
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import StatementError
+from app.models import CheckinLog, Participant
+from app.services.checkin_writer import CheckinQueueFull, CheckinWrite, CheckinWriteBatcher
+
+
+class _CountingFactory:
+    """记录写入线程打开的会话数（每批一个）；gate 未放行时写入线程在取会话处等待"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.sessions = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self):
+        self.gate.wait()
+        self.sessions += 1
+        return self.session_factory()
+
+
+@pytest.fixture
+def factory(session_factory):
+    db = session_factory()
+    db.add_all(
+        Participant(name=f"参赛者{i}", organization="单位", phone=f"138{i:08d}",
+                    phone_last4=f"{i:04d}", qr_code_id=f"QR{i:06d}")
+        for i in range(1, 41)
+    )
+    db.commit()
+    db.close()
+    return _CountingFactory(session_factory)
+
+
+@pytest.fixture
+def make_batcher(factory):
+    batchers = []
+
+    def make(**kwargs):
+        batcher = CheckinWriteBatcher(session_factory=factory, **kwargs)
+        batcher.start()
+        batchers.append(batcher)
+        return batcher
+
+    yield make
+    factory.gate.set()
+    for batcher in batchers:
+        batcher.stop()
+
+
+def _write(participant_id: int, checkin_time=None) -> CheckinWrite:
+    return CheckinWrite(participant_id, checkin_time or datetime(2026, 1, 1, 9, 0), "127.0.0.1", "pytest")
+
+
+def _checked_in(factory):
+    db = factory.session_factory()
+    try:
+        return (db.query(Participant).filter(Participant.is_checked_in == True).count(),
+                db.query(CheckinLog).count())
+    finally:
+        db.close()
+
+
+def test_concurrent_checkins_share_a_commit(factory, make_batcher):
+    batcher = make_batcher(max_delay_ms=100)
+    barrier = threading.Barrier(20)
+
+    def scan(participant_id):
+        barrier.wait()
+        return batcher.write(None, _write(participant_id))
+
+    with ThreadPoolExecutor(20) as pool:
+        results = list(pool.map(scan, [1 + i % 10 for i in range(20)]))
+
+    # 同一参赛者重复扫码只有一次生效
+    assert sorted(results) == [False] * 10 + [True] * 10
+    assert _checked_in(factory) == (10, 10)
+    assert factory.sessions < 20
+
+
+def test_full_queue_raises_checkin_queue_full(factory, make_batcher):
+    batcher = make_batcher(max_queue_size=1, max_delay_ms=1, submit_timeout=0.05)
+    factory.gate.clear()
+    first = batcher.submit(_write(1))
+    # 等写入线程取走第一条、凑批结束后停在 gate 上，再占满只有一个位置的队列
+    while batcher._queue.qsize():
+        time.sleep(0.001)
+    time.sleep(0.05)
+    second = batcher.submit(_write(2))
+
+    with pytest.raises(CheckinQueueFull):
+        batcher.submit(_write(3))
+
+    factory.gate.set()
+    assert first.result(timeout=5) is True
+    assert second.result(timeout=5) is True
+
+
+def test_write_times_out_when_not_acknowledged(factory, make_batcher):
+    batcher = make_batcher(ack_timeout=0.05)
+    factory.gate.clear()
+
+    with pytest.raises(FutureTimeoutError):
+        batcher.write(None, _write(1))
+
+    # 超时只影响等待方，签到随后仍会落库
+    factory.gate.set()
+    batcher.stop()
+    assert _checked_in(factory) == (1, 1)
+
+
+def test_failed_batch_is_retried_item_by_item(factory, make_batcher):
+    batcher = make_batcher(max_batch_size=3, max_delay_ms=1000)
+    # SQLite 的 DateTime 列只接受 datetime，这一条会让整批失败
+    futures = [batcher.submit(_write(1)), batcher.submit(_write(2, checkin_time="bad")), batcher.submit(_write(3))]
+
+    assert futures[0].result(timeout=5) is True
+    with pytest.raises(StatementError):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) is True
+    assert _checked_in(factory) == (2, 2)
+    # 一批失败后逐条重试：整批一个会话，重试复用同一个会话
+    assert factory.sessions == 1
+
+
+def test_stop_drains_queued_checkins(factory, make_batcher):
+    batcher = make_batcher()
+    factory.gate.clear()
+    futures = [batcher.submit(_write(participant_id)) for participant_id in range(1, 41)]
+
+    threading.Timer(0.05, factory.gate.set).start()
+    batcher.stop()
+
+    assert all(future.result(timeout=0) is True for future in futures)
+    assert _checked_in(factory) == (40, 40)
+    assert not batcher.running
@@ -0,0 +1,70 @@
+"""
+数据库执行器：在线程池中执行、不阻塞事件循环、并发数不超过连接池能借出的连接数
+"""
+
+import threading
+import time
+
+import anyio
+import pytest
+import app.database as database
+from config import get_db_thread_pool_size, settings
+
+
+@pytest.fixture
+def pool_settings(monkeypatch):
+    monkeypatch.setattr(settings, "db_max_connections", 4)
+    monkeypatch.setattr(settings, "web_concurrency", 1)
+    monkeypatch.setattr(settings, "db_max_overflow", 2)
+    monkeypatch.setattr(database, "_db_limiter", None)
+    yield
+    # 限流器绑定创建时的配置，恢复配置后让下次使用重新创建
+    database._db_limiter = None
+
+
+@pytest.mark.parametrize("configured, expected", [(0, 6), (3, 3), (40, 6)])
+def test_thread_pool_size_is_capped_by_the_connection_pool(pool_settings, monkeypatch, configured, expected):
+    monkeypatch.setattr(settings, "db_thread_pool_size", configured)
+    assert get_db_thread_pool_size() == expected
+
+
+def test_runner_limits_concurrency_without_blocking_the_loop(pool_settings, monkeypatch):
+    monkeypatch.setattr(settings, "db_thread_pool_size", 0)
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def query(db, value):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.02)
+        with lock:
+            state["running"] -= 1
+        return value * 2
+
+    async def main():
+        runner = database.DBRunner(session=None)
+        results = {}
+        ticks = 0
+
+        async def call(value):
+            results[value] = await runner.run(query, value)
+
+        async def heartbeat():
+            nonlocal ticks
+            while len(results) < 20:
+                ticks += 1
+                await anyio.sleep(0.005)
+
+        async with anyio.create_task_group() as group:
+            group.start_soon(heartbeat)
+            for value in range(20):
+                group.start_soon(call, value)
+        return results, ticks
+
+    results, ticks = anyio.run(main)
+
+    assert results == {value: value * 2 for value in range(20)}
+    assert state["peak"] == get_db_thread_pool_size() == 6
+    # 数据库操作在线程中执行期间事件循环仍在调度其他任务
+    assert ticks > 5
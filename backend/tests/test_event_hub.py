@@ -0,0 +1,80 @@
+"""
+实时事件中心：多线程发布按序号有序送达、断线重连补发与 resync、慢连接积压断开
+"""
+
+import asyncio
+import threading
+
+from app.services.event_hub import EventHub
+
+
+def _drain(subscription, timeout: float = 0.5) -> list:
+    async def collect():
+        events = []
+        while True:
+            event = await subscription.next_event(timeout)
+            if event is None:
+                return events
+            events.append(event)
+    return collect()
+
+
+def test_events_published_from_threads_arrive_in_order():
+    async def main():
+        hub = EventHub(queue_size=1000)
+        hub.bind_loop(asyncio.get_running_loop())
+        subscription, backlog, resync = hub.subscribe()
+
+        def publish(worker):
+            for i in range(50):
+                hub.publish("score", {"worker": worker, "i": i})
+
+        threads = [threading.Thread(target=publish, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        await asyncio.get_running_loop().run_in_executor(None, lambda: [t.join() for t in threads])
+        return backlog, resync, await _drain(subscription)
+
+    backlog, resync, events = asyncio.run(main())
+
+    assert backlog == [] and resync is False
+    assert [event["seq"] for event in events] == list(range(1, 401))
+    # 每个线程自己发布的事件保持先后顺序
+    for worker in range(8):
+        assert [e["data"]["i"] for e in events if e["data"]["worker"] == worker] == list(range(50))
+
+
+def test_reconnect_replays_missed_events_or_asks_for_resync():
+    hub = EventHub(buffer_size=5)
+    for i in range(8):
+        hub.publish("checkin", {"i": i})
+
+    _, backlog, resync = hub.subscribe(since=5)
+    assert [event["seq"] for event in backlog] == [6, 7, 8] and resync is False
+
+    # 客户端缺少的第 3 条事件已被挤出缓冲区
+    _, backlog, resync = hub.subscribe(since=2)
+    assert resync is True
+
+    # 客户端的序号比服务端还新：服务已重启
+    _, backlog, resync = hub.subscribe(since=20)
+    assert backlog == [] and resync is True
+
+
+def test_slow_subscriber_is_dropped_after_delivering_its_queue():
+    async def main():
+        hub = EventHub(queue_size=2)
+        hub.bind_loop(asyncio.get_running_loop())
+        slow, _, _ = hub.subscribe()
+        for i in range(5):
+            hub.publish("rank", {"i": i})
+        await asyncio.sleep(0)
+        return hub, slow, await _drain(slow, timeout=0.1)
+
+    hub, slow, events = asyncio.run(main())
+
+    assert slow.overflowed
+    assert hub.subscriber_count == 0
+    # 已入队的事件照常取出，之后返回 None，客户端按最后序号重连补发
+    assert [event["seq"] for event in events] == [1, 2]
+    assert slow.last_seq == 2
@@ -0,0 +1,27 @@
+"""
+评委批量导入：支持与不支持批量 INSERT ... RETURNING 的数据库都按输入顺序返回新ID
+"""
+
+import pytest
+from app.models import Judge
+from app.services.judge_service import JudgeService
+
+
+@pytest.fixture
+def db(session_factory, returning):
+    session = session_factory()
+    session.add(Judge(name="已有", username="judge0", password="x"))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_bulk_insert_judges_returns_ids_in_input_order(db):
+    rows = [{"name": f"评委{i}", "username": f"judge{i}", "password": "hash"} for i in (2, 1, 3)]
+
+    judge_ids = JudgeService.bulk_insert_judges(db, rows)
+
+    assert [db.get(Judge, judge_id).username for judge_id in judge_ids] == ["judge2", "judge1", "judge3"]
+    assert JudgeService.bulk_insert_judges(db, []) == []
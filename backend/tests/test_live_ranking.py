@@ -0,0 +1,76 @@
+"""
+实时排名：增量维护与整轮重算结果一致、加载期间的并发写入不丢失
+"""
+
+import random
+
+from app.cache.ranking import LiveRanking
+
+
+def _expected(scores: dict) -> list:
+    """按 (平均分降序, 参赛者ID) 重算整轮排名"""
+    averages = {
+        pid: sum(judges.values()) / len(judges)
+        for pid, judges in scores.items() if judges
+    }
+    order = sorted(averages, key=lambda pid: (-averages[pid], pid))
+    return [(pid, averages[pid], len(scores[pid])) for pid in order]
+
+
+def test_incremental_updates_match_a_full_recompute():
+    rng = random.Random(5)
+    ranking = LiveRanking()
+    ranking.load(1, [])
+    scores = {}
+    for _ in range(2000):
+        pid, jid = rng.randrange(1, 40), rng.randrange(1, 6)
+        if rng.random() < 0.8:
+            score = rng.randint(0, 20) / 2
+            ranking.set_score(1, pid, jid, score)
+            scores.setdefault(pid, {})[jid] = score
+        else:
+            ranking.remove_score(1, pid, jid)
+            scores.get(pid, {}).pop(jid, None)
+
+    expected = _expected(scores)
+    assert [(pid, round(avg, 9), n) for pid, avg, n in ranking.top(1)] == \
+           [(pid, round(avg, 9), n) for pid, avg, n in expected]
+    for position, (pid, _, count) in enumerate(expected, start=1):
+        assert ranking.rank_of(1, pid)[0] == position
+        assert ranking.rank_of(1, pid)[2] == count
+    assert ranking.top(1, 5) == ranking.top(1)[:5]
+
+
+def test_writes_during_load_are_replayed():
+    ranking = LiveRanking()
+    started = ranking.begin_load(1)
+    # 加载查询已经读出数据之后、load 之前提交的写入
+    ranking.set_score(1, 7, 1, 9.0)
+    ranking.remove_score(1, 1, 1)
+    ranking.load(1, [(1, 1, 5.0), (2, 1, 6.0)], started)
+
+    assert ranking.top(1) == [(7, 9.0, 1), (2, 6.0, 1)]
+    assert not ranking.needs_load(1)
+
+
+def test_stale_load_does_not_overwrite_a_newer_one():
+    ranking = LiveRanking()
+    slow = ranking.begin_load(1)
+    fast = ranking.begin_load(1)
+    ranking.load(1, [(1, 1, 8.0)], fast)
+    ranking.set_score(1, 2, 1, 9.0)
+
+    # 开始得更早的加载完成时，数据可能已经过时，不能覆盖
+    ranking.load(1, [(1, 1, 8.0)], slow)
+    assert ranking.top(1) == [(2, 9.0, 1), (1, 8.0, 1)]
+
+
+def test_remove_participant_clears_every_round():
+    ranking = LiveRanking()
+    for round_number in (1, 2):
+        ranking.load(round_number, [(1, 1, 7.0), (2, 1, 8.0)])
+
+    ranking.remove_participant(2)
+    assert ranking.top(1) == [(1, 7.0, 1)]
+    assert ranking.top(2) == [(1, 7.0, 1)]
+    assert ranking.rank_of(2, 2) is None
@@ -0,0 +1,37 @@
+"""
+参赛者批量导入：支持与不支持批量 INSERT ... RETURNING 的数据库都取回正确ID并同步签到索引
+"""
+
+import pytest
+from app.cache.identity_index import checkin_index
+from app.models import Participant
+from app.services.participant_service import ParticipantService
+
+
+@pytest.fixture
+def db(session_factory, returning):
+    checkin_index.clear()
+    session = session_factory()
+    session.add(Participant(name="已有", organization="单位", phone="13800000000",
+                            phone_last4="0000", qr_code_id="QR0"))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+        checkin_index.clear()
+
+
+def test_bulk_insert_participants_updates_the_checkin_index(db):
+    rows = [{"name": f"参赛者{i}", "organization": "单位", "phone": f"1390000{i:04d}"} for i in range(1, 4)]
+
+    assert ParticipantService.bulk_insert_participants(db, rows) == 3
+    assert ParticipantService.bulk_insert_participants(db, []) == 0
+
+    participants = db.query(Participant).filter(Participant.id > 1).order_by(Participant.id).all()
+    assert [p.name for p in participants] == ["参赛者1", "参赛者2", "参赛者3"]
+    assert len({p.qr_code_id for p in participants} | {"QR0"}) == 4
+    for participant in participants:
+        entry = checkin_index.get(participant.qr_code_id)
+        assert (entry.id, entry.name, entry.phone_last4) == (participant.id, participant.name, participant.phone[-4:])
+        assert not entry.is_checked_in
@@ -0,0 +1,72 @@
+"""
+批量评分：一次提交、同批重复键后者覆盖、atomic 整批拒绝；
+支持与不支持 INSERT ... ON CONFLICT / RETURNING 的数据库结果一致
+"""
+
+import pytest
+from app.models import Judge, Participant, Score, ScoreAggregate, ScoreChange
+from app.services.score_service import ScoreService
+
+
+@pytest.fixture
+def db(session_factory, returning):
+    session = session_factory()
+    session.add_all(
+        Participant(name=f"参赛者{i}", organization="单位", phone=f"138{i:08d}",
+                    phone_last4=f"{i:04d}", qr_code_id=f"QR{i}")
+        for i in range(3)
+    )
+    session.add_all(Judge(name=f"评委{i}", username=f"judge{i}", password="x") for i in range(2))
+    session.add(Score(participant_id=1, judge_id=1, score=5.0, round_number=1))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _item(participant_id: int, score: float, judge_id: int = 1, round_number: int = 1) -> dict:
+    return {"participant_id": participant_id, "judge_id": judge_id, "score": score, "round_number": round_number}
+
+
+def _scores(db) -> dict:
+    return {(s.participant_id, s.judge_id, s.round_number): s.score for s in db.query(Score)}
+
+
+def test_partial_batch_writes_valid_items(db):
+    result = ScoreService.batch_submit_scores(db, [
+        _item(1, 8.0), _item(2, 6.0), _item(2, 7.0), _item(99, 5.0), _item(3, 11.0), _item(3, 9.0, judge_id=2)
+    ])
+
+    assert [item.get("action") or item["error_code"] for item in result["results"]] == [
+        "updated", "superseded", "created", "PARTICIPANT_NOT_FOUND", "INVALID_SCORE_RANGE", "created"
+    ]
+    assert result["success_count"] == 4 and result["error_count"] == 2
+    assert result["results"][1]["score"] == result["results"][2]["score"]
+    assert _scores(db) == {(1, 1, 1): 8.0, (2, 1, 1): 7.0, (3, 2, 1): 9.0}
+    # 变更日志和汇总与评分在同一事务中写入
+    assert db.query(ScoreChange).count() == 3
+    aggregate = db.get(ScoreAggregate, (2, 1))
+    assert (aggregate.score_count, aggregate.score_sum) == (1, 7.0)
+
+
+def test_atomic_batch_rejects_everything_on_any_error(db):
+    result = ScoreService.batch_submit_scores(db, [_item(2, 6.0), _item(99, 5.0)], atomic=True)
+
+    assert not result["success"]
+    assert [item["error_code"] for item in result["results"]] == ["BATCH_REJECTED", "PARTICIPANT_NOT_FOUND"]
+    assert _scores(db) == {(1, 1, 1): 5.0}
+    assert db.query(ScoreChange).count() == 0
+
+
+def test_resubmitting_the_same_scores_is_idempotent(db):
+    items = [_item(1, 5.0), _item(2, 6.5, round_number=2)]
+    first = ScoreService.batch_submit_scores(db, items)
+    second = ScoreService.batch_submit_scores(db, items)
+
+    assert [item["action"] for item in first["results"]] == ["updated", "created"]
+    assert [item["action"] for item in second["results"]] == ["updated", "updated"]
+    assert [item["score"]["id"] for item in first["results"]] == [item["score"]["id"] for item in second["results"]]
+    assert _scores(db) == {(1, 1, 1): 5.0, (2, 1, 2): 6.5}
+    # 分数没有变化的不再记变更日志
+    assert db.query(ScoreChange).count() == 1
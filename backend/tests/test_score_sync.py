@@ -0,0 +1,149 @@
+"""
+离线评分同步：op_id 幂等、后写入者胜出、评委之间 op_id 隔离、并发上传同一 op_id
+"""
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from app.database import _upgrade_score_sync_ops
+from app.models import Judge, Participant, Score
+from app.models.score_sync import ScoreChange, ScoreSyncOp
+from app.services.score_service import ScoreService
+from app.services.score_sync_service import ScoreSyncService
+
+
+def _seed(db, participants: int = 3, judges: int = 2):
+    db.add_all(
+        Participant(name=f"参赛者{i}", organization="单位", phone=f"138{i:08d}",
+                    phone_last4=f"{i:04d}", qr_code_id=f"QR{i:06d}")
+        for i in range(participants)
+    )
+    db.add_all(Judge(name=f"评委{i}", username=f"judge{i}", password="x") for i in range(judges))
+    db.commit()
+
+
+def _op(op_id: str, participant_id: int, score: float, client_ts: int, round_number: int = 1):
+    return {"op_id": op_id, "participant_id": participant_id, "round_number": round_number,
+            "score": score, "client_ts": client_ts}
+
+
+def _statuses(result):
+    return [(item["op_id"], item["status"], item["duplicate"]) for item in result["results"]]
+
+
+def _score(db, participant_id: int, judge_id: int = 1):
+    return db.query(Score.score).filter_by(participant_id=participant_id, judge_id=judge_id).scalar()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    _seed(session)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_retried_op_is_not_written_twice(db):
+    first = ScoreSyncService.sync(db, 1, [_op("a1", 1, 7.5, 100)])
+    retry = ScoreSyncService.sync(db, 1, [_op("a1", 1, 7.5, 100)])
+
+    assert _statuses(first) == [("a1", "applied", False)]
+    assert _statuses(retry) == [("a1", "applied", True)]
+    assert retry["results"][0]["seq"] == first["results"][0]["seq"]
+    assert db.query(ScoreChange).count() == 1
+
+
+def test_repeated_op_id_in_one_upload_is_applied_once(db):
+    result = ScoreSyncService.sync(db, 1, [_op("a1", 1, 7.5, 100), _op("a1", 1, 7.5, 100)])
+
+    assert _statuses(result) == [("a1", "applied", False), ("a1", "applied", True)]
+    assert db.query(ScoreChange).count() == 1
+
+
+@pytest.mark.parametrize("uploads", [
+    [[_op("new", 1, 8.0, 200)], [_op("old", 1, 3.0, 100)]],
+    [[_op("old", 1, 3.0, 100)], [_op("new", 1, 8.0, 200)]],
+    [[_op("old", 1, 3.0, 100), _op("new", 1, 8.0, 200)]],
+], ids=["new-first", "old-first", "same-upload"])
+def test_last_writer_wins_whatever_the_arrival_order(db, uploads):
+    statuses = {}
+    for ops in uploads:
+        for item in ScoreSyncService.sync(db, 1, ops)["results"]:
+            statuses[item["op_id"]] = item["status"]
+
+    assert _score(db, 1) == 8.0
+    assert statuses["new"] == ScoreSyncService.APPLIED
+
+
+def test_same_op_id_from_different_judges_is_applied_for_each(db):
+    first = ScoreSyncService.sync(db, 1, [_op("shared", 1, 6.0, 100)])
+    second = ScoreSyncService.sync(db, 2, [_op("shared", 2, 9.0, 100)])
+
+    assert _statuses(first) == [("shared", "applied", False)]
+    assert _statuses(second) == [("shared", "applied", False)]
+    assert second["results"][0]["seq"] != first["results"][0]["seq"]
+    assert _score(db, 1, judge_id=1) == 6.0
+    assert _score(db, 2, judge_id=2) == 9.0
+    assert db.query(ScoreSyncOp).count() == 2
+
+
+@pytest.mark.parametrize("score", [
+    ScoreService.MIN_SCORE - 0.5, ScoreService.MIN_SCORE, ScoreService.MAX_SCORE, ScoreService.MAX_SCORE + 0.5
+])
+def test_sync_uses_the_same_score_range_as_submit(db, score):
+    submitted = ScoreService.submit_score(db, 1, 1, score)
+    synced = ScoreSyncService.sync(db, 2, [_op("r", 1, score, 100)])
+
+    assert (synced["results"][0]["status"] == ScoreSyncService.APPLIED) == submitted["success"]
+    if not submitted["success"]:
+        assert synced["results"][0]["error_code"] == submitted["error_code"] == "INVALID_SCORE_RANGE"
+
+
+def test_concurrent_upload_of_same_op_id_reports_winner_as_duplicate(session_factory, monkeypatch):
+    db_a, db_b = session_factory(), session_factory()
+    _seed(db_a)
+    get_processed = ScoreSyncService._get_processed
+    winner = {}
+
+    def racing_get_processed(db, judge_id, op_ids):
+        processed = get_processed(db, judge_id, op_ids)
+        if db is db_b and not winner:
+            # B 已确认 r1 未处理，A 在 B 写入前抢先提交同一个 op_id
+            winner.update(ScoreSyncService.sync(db_a, judge_id, [_op("r1", 1, 6.0, 100)])["results"][0])
+        return processed
+
+    monkeypatch.setattr(ScoreSyncService, "_get_processed", staticmethod(racing_get_processed))
+    try:
+        result = ScoreSyncService.sync(db_b, 1, [_op("r1", 1, 6.0, 100), _op("r2", 2, 7.0, 100)])
+
+        assert _statuses(result) == [("r1", "applied", True), ("r2", "applied", False)]
+        assert result["results"][0]["seq"] == winner["seq"]
+        assert db_b.query(ScoreChange).count() == 2
+        assert _score(db_b, 2) == 7.0
+    finally:
+        db_a.close()
+        db_b.close()
+
+
+def test_old_score_sync_ops_table_is_rekeyed_by_judge(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE score_sync_ops (op_id VARCHAR(64) PRIMARY KEY, judge_id INTEGER NOT NULL, "
+            "participant_id INTEGER NOT NULL, round_number INTEGER NOT NULL, score FLOAT NOT NULL, "
+            "client_ts BIGINT NOT NULL, status VARCHAR(20) NOT NULL, error_code VARCHAR(50), seq INTEGER, "
+            "created_at DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO score_sync_ops (op_id, judge_id, participant_id, round_number, score, client_ts, status, seq) "
+            "VALUES ('a1', 3, 1, 1, 5.0, 100, 'applied', 7)"
+        ))
+
+    _upgrade_score_sync_ops(engine)
+    _upgrade_score_sync_ops(engine)
+
+    assert inspect(engine).get_pk_constraint("score_sync_ops")["constrained_columns"] == ["judge_id", "op_id"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT judge_id, op_id, seq FROM score_sync_ops")).all() == [(3, "a1", 7)]
+    engine.dispose()
@@ -0,0 +1,92 @@
+"""
+统计接口的查询次数回归测试
+
+单位统计、分组统计、参赛者统计都是固定次数的分组查询，
+查询次数不随单位、分组、参赛者数量增长；一旦退化为逐条查询（N+1）这里会失败。
+"""
+
+import random
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from app.models import Group, Judge, Participant, Score
+from app.services.participant_service import ParticipantService
+from app.services.score_service import ScoreService
+from app.services.statistics_service import StatisticsService
+
+
+def _seed(db, organizations: int, groups: int, participants: int):
+    rng = random.Random(participants)
+    group_rows = [Group(name=f"第{i + 1}组", draw_order=i + 1) for i in range(groups)]
+    judge_rows = [Judge(name=f"评委{i}", username=f"judge{i}", password="x") for i in range(3)]
+    db.add_all(group_rows + judge_rows)
+    db.flush()
+    participant_rows = [
+        Participant(
+            name=f"参赛者{i}",
+            organization=f"单位{i % organizations}",
+            phone=f"138{i:08d}",
+            phone_last4=f"{i % 10000:04d}",
+            qr_code_id=f"QR{i:06d}",
+            group_id=group_rows[i % groups].id if i % 5 else None,
+            is_checked_in=rng.random() < 0.6
+        )
+        for i in range(participants)
+    ]
+    db.add_all(participant_rows)
+    db.flush()
+    db.add_all(
+        Score(participant_id=participant.id, judge_id=judge.id, score=rng.randint(0, 20) / 2)
+        for participant in participant_rows for judge in judge_rows if rng.random() < 0.7
+    )
+    db.commit()
+    ScoreService.rebuild_aggregates(db)
+
+
+@pytest.fixture(params=[(3, 2, 12), (20, 10, 400)], ids=["small", "large"])
+def seeded(request):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    organizations, groups, participants = request.param
+    _seed(db, organizations, groups, participants)
+    db.expunge_all()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    try:
+        yield db, statements, request.param
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def _count(statements, fn, db):
+    statements.clear()
+    result = fn(db)
+    return len(statements), result
+
+
+def test_organization_statistics_query_count(seeded):
+    db, statements, (organizations, _, participants) = seeded
+    count, result = _count(statements, StatisticsService.get_organization_statistics, db)
+    assert count == 3
+    assert len(result) == organizations
+    assert sum(item["total_participants"] for item in result) == participants
+
+
+def test_group_statistics_query_count(seeded):
+    db, statements, (_, groups, _) = seeded
+    count, result = _count(statements, StatisticsService.get_group_statistics, db)
+    assert count == 4
+    assert len(result) == groups
+
+
+def test_participants_statistics_query_count(seeded):
+    db, statements, (organizations, _, participants) = seeded
+    count, result = _count(statements, ParticipantService.get_participants_statistics, db)
+    assert count == 1
+    assert result["total_participants"] == participants
+    assert len(result["organization_stats"]) == organizations
@@ -0,0 +1,85 @@
+"""
+统计快照：有写入的提交才使快照失效、命中时不访问数据库、旧版本不会覆盖新版本
+"""
+
+import pytest
+from sqlalchemy import event
+from app.cache.data_version import data_version
+from app.cache.snapshot import SnapshotCache, etag_matches, statistics_snapshots
+from app.models import Participant
+from app.services.statistics_service import StatisticsService
+
+
+def _participant(i: int) -> Participant:
+    return Participant(name=f"参赛者{i}", organization=f"单位{i % 2}", phone=f"138{i:08d}",
+                       phone_last4=f"{i:04d}", qr_code_id=f"QR{i}")
+
+
+@pytest.fixture
+def db(session_factory):
+    statistics_snapshots.clear()
+    session = session_factory()
+    session.add_all(_participant(i) for i in range(3))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+        statistics_snapshots.clear()
+
+
+def test_snapshot_is_reused_until_a_write_commits(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    first = StatisticsService.get_snapshot(db, "organizations")
+    statements.clear()
+    assert StatisticsService.get_snapshot(db, "organizations") is first
+    assert StatisticsService.get_cached_snapshot("organizations") is first
+    assert statements == []
+
+    db.add(_participant(3))
+    db.commit()
+    assert StatisticsService.get_cached_snapshot("organizations") is None
+    second = StatisticsService.get_snapshot(db, "organizations")
+    assert second.etag != first.etag
+    assert sum(item["total_participants"] for item in second.data) == 4
+
+
+def test_reads_and_rollbacks_do_not_invalidate(db):
+    version = data_version.value
+    db.query(Participant).count()
+    db.commit()
+    assert data_version.value == version
+
+    db.add(_participant(9))
+    db.flush()
+    db.rollback()
+    db.commit()
+    assert data_version.value == version
+
+    db.query(Participant).filter(Participant.id == 1).update({"name": "改名"})
+    db.commit()
+    assert data_version.value == version + 1
+
+
+def test_older_recompute_does_not_replace_a_newer_snapshot():
+    cache = SnapshotCache()
+    newer = cache.put("dashboard", 5, {"total": 2})
+    cache.put("dashboard", 4, {"total": 1})
+
+    assert cache.get("dashboard", 5) is newer
+    assert cache.get("dashboard", 6) is None
+
+
+def test_etag_comparison():
+    cache = SnapshotCache()
+    snapshot = cache.put("summary", 1, {"a": 1})
+
+    # 内容相同 ETag 相同，重启或重算后客户端缓存仍然有效
+    assert cache.put("summary", 2, {"a": 1}).etag == snapshot.etag
+    assert snapshot.matches(snapshot.etag)
+    assert snapshot.matches(f'"other", W/{snapshot.etag}')
+    assert snapshot.matches("*")
+    assert not snapshot.matches('"other"')
+    assert not etag_matches(snapshot.etag, None)
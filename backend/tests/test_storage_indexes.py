@@ -0,0 +1,99 @@
+"""
+内存存储的唯一索引与二级索引：冲突检查、修改/删除后索引同步、按索引查询与全表扫描结果一致
+"""
+
+import random
+
+import pytest
+from app.storage import DuplicateKeyError, MemoryStorage
+
+
+def _participant(i: int, **values) -> dict:
+    return {"name": f"参赛者{i % 7}", "organization": "单位", "phone": f"138{i:08d}",
+            "phone_last4": f"{i % 3:04d}", "qr_code_id": f"QR{i}", **values}
+
+
+@pytest.fixture
+def storage():
+    return MemoryStorage()
+
+
+def test_unique_key_conflicts_on_insert_and_update(storage):
+    first = storage.insert("participants", _participant(1))
+    second = storage.insert("participants", _participant(2))
+
+    with pytest.raises(DuplicateKeyError):
+        storage.insert("participants", _participant(3, qr_code_id="QR1"))
+    with pytest.raises(DuplicateKeyError):
+        storage.update("participants", second["id"], {"qr_code_id": "QR1"})
+
+    # 原值改走后旧值可以重新使用
+    storage.update("participants", first["id"], {"qr_code_id": "QR9"})
+    storage.update("participants", second["id"], {"qr_code_id": "QR1"})
+    assert storage.find_one("participants", qr_code_id="QR1")["id"] == second["id"]
+    assert storage.find_one("participants", qr_code_id="QR9")["id"] == first["id"]
+
+
+def test_composite_unique_key_and_null_values(storage):
+    storage.insert("scores", {"participant_id": 1, "judge_id": 1, "score": 8.0, "round_number": 1})
+    storage.insert("scores", {"participant_id": 1, "judge_id": 1, "score": 8.0, "round_number": 2})
+    with pytest.raises(DuplicateKeyError):
+        storage.insert("scores", {"participant_id": 1, "judge_id": 1, "score": 9.0, "round_number": 1})
+
+    # 与 SQL 一致，含空值的键不参与唯一约束
+    storage.insert("participants", _participant(1, qr_code_id=None))
+    storage.insert("participants", _participant(2, qr_code_id=None))
+    assert storage.count("participants") == 2
+
+
+def test_secondary_index_follows_updates_and_deletes(storage):
+    rows = [storage.insert("participants", _participant(i, group_id=i % 2)) for i in range(6)]
+    table = storage._table("participants")
+
+    assert table.candidate_ids({"group_id": 1}) == [row["id"] for row in rows if row["group_id"] == 1]
+
+    storage.update("participants", rows[1]["id"], {"group_id": 0})
+    storage.delete("participants", rows[3]["id"])
+    storage.update("participants", rows[0]["id"], {"is_checked_in": True})
+
+    assert [row["id"] for row in storage.find("participants", group_id=1)] == [rows[5]["id"]]
+    assert [row["id"] for row in storage.find("participants", group_id=0)] == [
+        rows[0]["id"], rows[1]["id"], rows[2]["id"], rows[4]["id"]
+    ]
+    assert [row["id"] for row in storage.find("participants", is_checked_in=True)] == [rows[0]["id"]]
+
+
+def test_lookup_uses_the_widest_matching_index(storage):
+    for i in range(12):
+        storage.insert("participants", _participant(i, group_id=i % 3))
+    table = storage._table("participants")
+
+    ids = table.candidate_ids({"phone_last4": "0001", "name": "参赛者1", "group_id": 1})
+    assert ids == table.secondary[("phone_last4", "name")][("0001", "参赛者1")]
+    assert table.candidate_ids({"organization": "单位"}) is None
+
+
+def test_indexed_find_matches_a_full_scan(storage):
+    rng = random.Random(23)
+    for step in range(600):
+        ids = [row["id"] for row in storage.find("participants")]
+        action = rng.random()
+        if action < 0.5 or not ids:
+            storage.insert("participants", _participant(step, group_id=rng.choice([None, 1, 2, 3])))
+        elif action < 0.85:
+            storage.update("participants", rng.choice(ids), {
+                "group_id": rng.choice([None, 1, 2, 3]),
+                "is_checked_in": rng.random() < 0.5,
+                "name": f"参赛者{rng.randrange(7)}"
+            })
+        else:
+            storage.delete("participants", rng.choice(ids))
+
+    rows = storage.find("participants")
+    for criteria in (
+        {"group_id": 2}, {"group_id": None}, {"is_checked_in": True},
+        {"phone_last4": "0002", "name": "参赛者3"}, {"phone_last4": "0001", "name": "参赛者5", "group_id": 1}
+    ):
+        expected = [row["id"] for row in rows if all(row[name] == value for name, value in criteria.items())]
+        assert [row["id"] for row in storage.find("participants", **criteria)] == expected
+        assert storage.count("participants", **criteria) == len(expected)
@@ -0,0 +1,122 @@
+"""
+日志存储后端的崩溃恢复：重放、截断写了一半的尾部、拒绝中间损坏、快照替换后日志清空前崩溃
+"""
+
+import os
+import shutil
+
+import pytest
+from app.storage import LogStorage, StorageError
+
+
+def _participant(name: str, qr_code_id: str) -> dict:
+    return {"name": name, "organization": "单位", "phone": "13800000000",
+            "phone_last4": "0000", "qr_code_id": qr_code_id}
+
+
+def _crash(storage: LogStorage):
+    """模拟进程崩溃：不压缩、不做任何收尾，只释放文件句柄"""
+    storage._file.close()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "data.log")
+
+
+def test_journal_is_replayed_after_crash(path):
+    storage = LogStorage(path)
+    first = storage.insert("participants", _participant("甲", "QR1"))
+    storage.insert("participants", _participant("乙", "QR2"))
+    storage.update("participants", first["id"], {"is_checked_in": True})
+    _crash(storage)
+
+    with LogStorage(path) as reopened:
+        assert [row["name"] for row in reopened.find("participants")] == ["甲", "乙"]
+        assert reopened.get("participants", first["id"])["is_checked_in"] is True
+        assert reopened.insert("participants", _participant("丙", "QR3"))["id"] == 3
+
+
+def test_torn_tail_is_dropped_and_truncated(path):
+    storage = LogStorage(path)
+    storage.insert("participants", _participant("甲", "QR1"))
+    _crash(storage)
+    valid_size = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b'{"seq":2,"op":"insert","table":"participants","row":{"id":2,"na')
+
+    storage = LogStorage(path)
+    assert os.path.getsize(path) == valid_size
+    assert storage.count("participants") == 1
+    # 截断后追加的记录从完整记录之后开始，再次重启仍能读出
+    storage.insert("participants", _participant("乙", "QR2"))
+    _crash(storage)
+
+    with LogStorage(path) as reopened:
+        assert [row["name"] for row in reopened.find("participants")] == ["甲", "乙"]
+
+
+def test_corrupt_entry_in_the_middle_raises(path):
+    storage = LogStorage(path)
+    storage.insert("participants", _participant("甲", "QR1"))
+    storage.insert("participants", _participant("乙", "QR2"))
+    _crash(storage)
+    with open(path, "rb") as f:
+        lines = f.readlines()
+    with open(path, "wb") as f:
+        f.write(lines[0][:10] + b"\n" + lines[1])
+
+    with pytest.raises(StorageError):
+        LogStorage(path)
+
+
+def test_crash_between_snapshot_rename_and_journal_truncate(path):
+    storage = LogStorage(path)
+    kept = storage.insert("participants", _participant("甲", "QR1"))
+    removed = storage.insert("participants", _participant("乙", "QR2"))
+    storage.compact()
+    storage.update("participants", removed["id"], {"name": "乙改"})
+    storage.delete("participants", removed["id"])
+    storage.update("participants", kept["id"], {"is_checked_in": True})
+    # 快照已替换为最新数据，日志却还是压缩前的内容
+    shutil.copyfile(path, path + ".old")
+    storage.compact()
+    _crash(storage)
+    os.replace(path + ".old", path)
+
+    with LogStorage(path) as reopened:
+        # 日志中的旧记录不大于快照的 seq，全部跳过；否则会去修改快照中已删除的记录
+        assert reopened.journal_entries == 0
+        assert [row["id"] for row in reopened.find("participants")] == [kept["id"]]
+        assert reopened.get("participants", kept["id"])["is_checked_in"] is True
+        assert reopened.insert("participants", _participant("丙", "QR3"))["id"] == 3
+
+
+def test_leftover_temp_snapshot_is_ignored(path):
+    storage = LogStorage(path)
+    storage.insert("participants", _participant("甲", "QR1"))
+    storage.compact()
+    _crash(storage)
+    # 压缩写临时文件时崩溃：临时文件不完整，快照仍是完整的旧版本
+    with open(path + ".snapshot.tmp", "w", encoding="utf-8") as f:
+        f.write('{"seq":')
+
+    with LogStorage(path) as reopened:
+        assert reopened.count("participants") == 1
+    assert not os.path.exists(path + ".snapshot.tmp")
+
+
+def test_journal_is_compacted_at_the_threshold(path):
+    storage = LogStorage(path, compact_threshold=5)
+    for i in range(4):
+        storage.insert("participants", _participant(f"参赛者{i}", f"QR{i}"))
+    assert storage.journal_entries == 4
+    assert not os.path.exists(path + ".snapshot")
+
+    storage.insert("participants", _participant("参赛者4", "QR4"))
+    assert storage.journal_entries == 0
+    assert os.path.getsize(path) == 0
+    _crash(storage)
+
+    with LogStorage(path) as reopened:
+        assert reopened.count("participants") == 5
@@ -11,7 +11,7 @@ export const participantsApi = {
   getByQR: (qrId: string) => api.get(`/api/participants/qr/${qrId}`),
   
   // 获取参赛者二维码
-  getQRCode: (id: number) => api.get(`/api/participants/${id}/qrcode`),
+  getQRCode: (id: number) => api.get(`/api/participants/${id}/qrcode`, { params: { format: 'json' } }),
   
   // 创建参赛者
   create: (data: any) => api.post('/api/participants', data),